@@ -0,0 +1,115 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import ConsultaLenta, Perfilado
+
+
+@admin.register(Perfilado)
+class PerfiladoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'metodo', 'ruta', 'vista', 'estado', 'duracion_display',
+                    'memoria_display', 'descargar')
+    list_filter = ('vista', 'estado')
+    search_fields = ('ruta', 'vista', 'usuario')
+    readonly_fields = ('fecha', 'usuario', 'metodo', 'ruta', 'vista', 'estado',
+                       'duracion_ms', 'memoria_pico', 'muestras', 'resumen_display',
+                       'descargar')
+    exclude = ('resumen', 'pilas')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        # Las pilas pueden ocupar bastante, el listado no las necesita
+        return super().get_queryset(request).defer('pilas', 'resumen')
+    
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/descargar/',
+                self.admin_site.admin_view(self.descargar_pilas),
+                name='core_perfilado_descargar',
+            ),
+        ] + super().get_urls()
+    
+    def descargar_pilas(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        perfilado = get_object_or_404(Perfilado.objects.only('pk', 'pilas'), pk=pk)
+        response = HttpResponse(perfilado.pilas, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="perfilado-{pk}.folded"'
+        return response
+    
+    def descargar(self, obj):
+        return format_html(
+            '<a href="{}">Pilas (.folded)</a>',
+            reverse('admin:core_perfilado_descargar', args=[obj.pk])
+        )
+    descargar.short_description = 'Descargar'
+    
+    def duracion_display(self, obj):
+        return f"{obj.duracion_ms:.0f} ms"
+    duracion_display.short_description = 'Duración'
+    duracion_display.admin_order_field = 'duracion_ms'
+    
+    def memoria_display(self, obj):
+        return f"{obj.memoria_pico / (1024 * 1024):.1f} MiB"
+    memoria_display.short_description = 'Memoria pico'
+    memoria_display.admin_order_field = 'memoria_pico'
+    
+    def resumen_display(self, obj):
+        return format_html('<pre style="white-space: pre;">{}</pre>', obj.resumen)
+    resumen_display.short_description = 'Resumen'
+
+
+@admin.register(ConsultaLenta)
+class ConsultaLentaAdmin(admin.ModelAdmin):
+    list_display = ('sql_corto', 'total', 'promedio_display', 'maximo_display',
+                    'total_display', 'ultima_vista', 'ultima')
+    list_filter = ('alias', 'ultima_vista')
+    search_fields = ('sql', 'ultima_vista')
+    readonly_fields = ('alias', 'sql_display', 'total', 'ms_total', 'ms_max',
+                       'promedio_display', 'ultima_vista', 'pila_display', 'plan_display',
+                       'primera', 'ultima')
+    exclude = ('huella', 'sql', 'pila', 'plan')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def sql_corto(self, obj):
+        return obj.sql if len(obj.sql) <= 120 else obj.sql[:117] + '...'
+    sql_corto.short_description = 'SQL'
+    
+    def promedio_display(self, obj):
+        return f"{obj.ms_promedio:.0f} ms"
+    promedio_display.short_description = 'Promedio'
+    
+    def maximo_display(self, obj):
+        return f"{obj.ms_max:.0f} ms"
+    maximo_display.short_description = 'Máximo'
+    maximo_display.admin_order_field = 'ms_max'
+    
+    def total_display(self, obj):
+        return f"{obj.ms_total / 1000:.1f} s"
+    total_display.short_description = 'Tiempo total'
+    total_display.admin_order_field = 'ms_total'
+    
+    def sql_display(self, obj):
+        return format_html('<pre style="white-space: pre-wrap;">{}</pre>', obj.sql)
+    sql_display.short_description = 'SQL'
+    
+    def pila_display(self, obj):
+        return format_html('<pre>{}</pre>', obj.pila)
+    pila_display.short_description = 'Pila'
+    
+    def plan_display(self, obj):
+        return format_html('<pre>{}</pre>', obj.plan or 'Sin plan (no es un SELECT)')
+    plan_display.short_description = 'Plan de ejecución'
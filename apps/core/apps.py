@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    """Configuración de la app principal"""
+    
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    
+    def ready(self):
+        # Contar las consultas SQL de cada conexión para /metrics y
+        # registrar las lentas
+        from .consultas_lentas import instalar_registro
+        from .metricas import instalar_medicion
+        connection_created.connect(instalar_medicion, dispatch_uid='metricas_consultas')
+        connection_created.connect(instalar_registro, dispatch_uid='consultas_lentas')
@@ -0,0 +1,254 @@
+"""
+Backend de caché compartido entre los workers de una misma máquina.
+
+Las entradas se guardan en un archivo SQLite en modo WAL, de modo que todos
+los procesos de gunicorn leen y escriben la misma caché sin un servidor
+aparte (Redis o Memcached). Los lectores no bloquean al escritor y cada
+escritura es una transacción `BEGIN IMMEDIATE`, así que `add` e `incr` son
+atómicos entre procesos.
+
+- Cada entrada tiene su expiración (TTL) y se descarta al leerla vencida.
+- El total de bytes se mantiene con triggers; cuando supera `MAX_BYTES` se
+  borran primero las vencidas y luego las menos usadas (LRU) hasta bajar al
+  90 % del límite.
+- La hora de último acceso se actualiza como mucho una vez por segundo por
+  entrada, para que las lecturas casi nunca escriban.
+
+Uso::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.core.cache_sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/hoja-vida-cache.sqlite3',
+            'OPTIONS': {'MAX_BYTES': 64 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    id INTEGER PRIMARY KEY,
+    clave TEXT NOT NULL UNIQUE,
+    valor BLOB NOT NULL,
+    expira REAL,
+    acceso REAL NOT NULL,
+    tamano INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entradas_acceso ON entradas (acceso);
+CREATE TABLE IF NOT EXISTS total (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO total (id, bytes) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS entradas_insertar AFTER INSERT ON entradas
+BEGIN UPDATE total SET bytes = bytes + NEW.tamano; END;
+CREATE TRIGGER IF NOT EXISTS entradas_borrar AFTER DELETE ON entradas
+BEGIN UPDATE total SET bytes = bytes - OLD.tamano; END;
+CREATE TRIGGER IF NOT EXISTS entradas_actualizar AFTER UPDATE OF tamano ON entradas
+BEGIN UPDATE total SET bytes = bytes - OLD.tamano + NEW.tamano; END;
+"""
+
+GUARDAR = """
+INSERT INTO entradas (clave, valor, expira, acceso, tamano) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (clave) DO UPDATE SET
+    valor = excluded.valor, expira = excluded.expira,
+    acceso = excluded.acceso, tamano = excluded.tamano
+"""
+
+# Borra las entradas más antiguas hasta sumar los bytes indicados
+BORRAR_LRU = """
+DELETE FROM entradas WHERE id IN (
+    SELECT id FROM (
+        SELECT id, tamano, SUM(tamano) OVER (ORDER BY acceso, id) AS acumulado
+        FROM entradas
+    ) WHERE acumulado - tamano < ?
+)
+"""
+
+
+def vencida(expira, ahora):
+    return expira is not None and expira <= ahora
+
+
+class SQLiteCache(BaseCache):
+    """Caché en un archivo SQLite compartido por todos los procesos"""
+
+    # Segundos mínimos entre dos actualizaciones del último acceso
+    PRECISION_ACCESO = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.ruta = location
+        opciones = params.get('OPTIONS', {})
+        self.max_bytes = int(opciones.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._local = threading.local()
+
+    def conexion(self):
+        """Conexión del hilo actual (se abre de nuevo tras un fork)"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None or self._local.pid != os.getpid():
+            directorio = os.path.dirname(os.path.abspath(self.ruta))
+            os.makedirs(directorio, exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            conexion.executescript(ESQUEMA)
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+
+    @contextmanager
+    def escritura(self):
+        """Transacción que toma el candado de escritura desde el inicio"""
+        conexion = self.conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            yield conexion
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+        conexion.execute('COMMIT')
+
+    def serializar(self, key, value):
+        valor = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return valor, len(key) + len(valor)
+
+    def guardar(self, conexion, key, value, timeout, solo_si_falta=False):
+        """Escribe la entrada; devuelve False si no se guardó"""
+        valor, tamano = self.serializar(key, value)
+        expira = self.get_backend_timeout(timeout)
+        ahora = time.time()
+        if tamano > self.max_bytes or vencida(expira, ahora):
+            if not solo_si_falta:
+                conexion.execute('DELETE FROM entradas WHERE clave = ?', (key,))
+            return False
+        sql, parametros = GUARDAR, (key, valor, expira, ahora, tamano)
+        if solo_si_falta:
+            sql += ' WHERE entradas.expira IS NOT NULL AND entradas.expira <= ?'
+            parametros += (ahora,)
+        return conexion.execute(sql, parametros).rowcount == 1
+
+    def liberar_espacio(self, conexion):
+        total = conexion.execute('SELECT bytes FROM total').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conexion.execute(
+            'DELETE FROM entradas WHERE expira IS NOT NULL AND expira <= ?', (time.time(),)
+        )
+        total = conexion.execute('SELECT bytes FROM total').fetchone()[0]
+        exceso = total - int(self.max_bytes * 0.9)
+        if exceso > 0:
+            conexion.execute(BORRAR_LRU, (exceso,))
+
+    def leer(self, claves):
+        """{clave: valor} de las claves vigentes, marcando su acceso"""
+        conexion = self.conexion()
+        claves = list(claves)
+        filas = []
+        # SQLite limita la cantidad de parámetros por consulta
+        for inicio in range(0, len(claves), 500):
+            grupo = claves[inicio:inicio + 500]
+            marcadores = ', '.join('?' * len(grupo))
+            filas += conexion.execute(
+                f'SELECT clave, valor, expira, acceso FROM entradas WHERE clave IN ({marcadores})',
+                grupo,
+            ).fetchall()
+        ahora = time.time()
+        encontrados, accedidas = {}, []
+        for clave, valor, expira, acceso in filas:
+            if vencida(expira, ahora):
+                continue
+            encontrados[clave] = pickle.loads(valor)
+            if ahora - acceso >= self.PRECISION_ACCESO:
+                accedidas.append((ahora, clave))
+        if accedidas:
+            conexion.executemany('UPDATE entradas SET acceso = ? WHERE clave = ?', accedidas)
+        return encontrados
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.leer([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        claves = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not claves:
+            return {}
+        return {claves[clave]: valor for clave, valor in self.leer(claves).items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.escritura() as conexion:
+            self.guardar(conexion, key, value, timeout)
+            self.liberar_espacio(conexion)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.escritura() as conexion:
+            for key, value in data.items():
+                key = self.make_and_validate_key(key, version=version)
+                self.guardar(conexion, key, value, timeout)
+            self.liberar_espacio(conexion)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.escritura() as conexion:
+            guardado = self.guardar(conexion, key, value, timeout, solo_si_falta=True)
+            if guardado:
+                self.liberar_espacio(conexion)
+        return guardado
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.escritura() as conexion:
+            fila = conexion.execute(
+                'SELECT valor, expira FROM entradas WHERE clave = ?', (key,)
+            ).fetchone()
+            if fila is None or vencida(fila[1], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            nuevo = pickle.loads(fila[0]) + delta
+            valor, tamano = self.serializar(key, nuevo)
+            conexion.execute(
+                'UPDATE entradas SET valor = ?, tamano = ?, acceso = ? WHERE clave = ?',
+                (valor, tamano, time.time(), key),
+            )
+        return nuevo
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.escritura() as conexion:
+            cursor = conexion.execute(
+                'UPDATE entradas SET expira = ? WHERE clave = ? '
+                'AND (expira IS NULL OR expira > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        fila = self.conexion().execute(
+            'SELECT expira FROM entradas WHERE clave = ?', (key,)
+        ).fetchone()
+        return fila is not None and not vencida(fila[0], time.time())
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self.escritura() as conexion:
+            cursor = conexion.execute('DELETE FROM entradas WHERE clave = ?', (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        claves = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        with self.escritura() as conexion:
+            conexion.executemany('DELETE FROM entradas WHERE clave = ?', claves)
+
+    def clear(self):
+        with self.escritura() as conexion:
+            conexion.execute('DELETE FROM entradas')
@@ -0,0 +1,217 @@
+"""
+Registro de consultas SQL lentas con su plan de ejecución.
+
+Un `execute_wrapper` instalado en cada conexión mide las consultas; las que
+superan `DB_CONSULTAS_LENTAS_MS` se agrupan en memoria por su forma (el SQL
+con los literales y las listas `IN (...)` normalizados), junto con la vista
+que las originó y un resumen de la pila dentro del código del proyecto.
+
+Como en los contadores de visitas, ninguna petición escribe en la base de
+datos: un hilo vuelca cada `DB_CONSULTAS_LENTAS_INTERVALO` segundos lo
+acumulado a `ConsultaLenta`. La primera vez que aparece una forma se guarda
+su `EXPLAIN` (`EXPLAIN QUERY PLAN` en SQLite) con los parámetros de la
+ejecución más lenta, que no se guardan. Solo se analizan los SELECT.
+"""
+import atexit
+import contextvars
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import metricas
+
+logger = logging.getLogger(__name__)
+
+peticion_actual = contextvars.ContextVar('peticion_actual', default=None)
+
+RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+RE_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+# Con un solo elemento también: `IN (%s)` e `IN (%s, %s)` son la misma forma
+RE_LISTAS = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+RE_FILAS = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+RE_ESPACIOS = re.compile(r'\s+')
+
+IGNORADOS_EN_PILA = {'middleware.py', 'metricas.py', os.path.basename(__file__)}
+
+_lock = threading.Lock()
+_local = threading.local()
+# huella -> datos acumulados de la forma
+_pendientes = {}
+_hilo = None
+_pid = None
+
+
+def forma_consulta(sql):
+    """SQL sin literales y con las listas de parámetros colapsadas"""
+    forma = RE_CADENAS.sub('?', sql)
+    forma = RE_NUMEROS.sub('?', forma)
+    forma = RE_LISTAS.sub('(...)', forma)
+    forma = RE_FILAS.sub(r'\1, ...', forma)
+    return RE_ESPACIOS.sub(' ', forma).strip()
+
+
+def resumen_pila(limite=6):
+    """
+    Últimos marcos de la pila que pertenecen al proyecto (sin middlewares).
+    Las consultas del ORM asíncrono corren en un hilo de `sync_to_async`, sin
+    los marcos de la vista; para ellas queda solo `ultima_vista`.
+    """
+    base = str(settings.BASE_DIR) + os.sep
+    marcos = [
+        marco for marco in traceback.extract_stack()[:-3]
+        if marco.filename.startswith(base)
+        and 'site-packages' not in marco.filename
+        and os.path.basename(marco.filename) not in IGNORADOS_EN_PILA
+    ]
+    return '\n'.join(
+        f'{marco.filename[len(base):]}:{marco.lineno} en {marco.name}'
+        for marco in marcos[-limite:]
+    )
+
+
+def vista_actual():
+    request = peticion_actual.get()
+    coincidencia = getattr(request, 'resolver_match', None)
+    if coincidencia is None:
+        return request.path[:200] if request is not None else ''
+    return coincidencia.view_name
+
+
+def registrar_lentas(execute, sql, params, many, context):
+    """`execute_wrapper` que anota las consultas que superan el umbral"""
+    if getattr(_local, 'volcando', False):
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        if ms >= settings.DB_CONSULTAS_LENTAS_MS:
+            anotar(sql, params, many, context['connection'].alias, ms)
+
+
+def anotar(sql, params, many, alias, ms):
+    forma = forma_consulta(sql)
+    huella = hashlib.sha1(f'{alias}:{forma}'.encode()).hexdigest()
+    vista = vista_actual()
+    pila = resumen_pila()
+    metricas.incrementar('db_consultas_lentas_total', alias=alias)
+    with _lock:
+        datos = _pendientes.get(huella)
+        if datos is None:
+            datos = _pendientes[huella] = {
+                'alias': alias, 'forma': forma, 'total': 0, 'ms_total': 0.0, 'ms_max': 0.0,
+            }
+        datos['total'] += 1
+        datos['ms_total'] += ms
+        datos['vista'], datos['pila'] = vista, pila
+        if ms >= datos['ms_max']:
+            datos['ms_max'] = ms
+            # Para el EXPLAIN; solo en memoria
+            datos['sql'], datos['params'] = (None, None) if many else (sql, params)
+    iniciar_hilo()
+
+
+def instalar_registro(sender, connection, **kwargs):
+    """Receptor de `connection_created`: agrega `registrar_lentas` a la conexión"""
+    if settings.DB_CONSULTAS_LENTAS_MS and registrar_lentas not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, registrar_lentas)
+
+
+def iniciar_hilo():
+    """Arranca el hilo de volcado en este proceso si aún no existe"""
+    global _hilo, _pid
+    if _hilo is not None and _pid == os.getpid():
+        return
+    with _lock:
+        if _hilo is not None and _pid == os.getpid():
+            return
+        _pid = os.getpid()
+        _hilo = threading.Thread(
+            target=bucle_volcado, name='volcado-consultas-lentas', daemon=True
+        )
+        _hilo.start()
+
+
+def bucle_volcado():
+    while True:
+        time.sleep(settings.DB_CONSULTAS_LENTAS_INTERVALO)
+        volcar_consultas()
+
+
+def explicar(alias, sql, params):
+    """Plan de ejecución de la consulta, o '' si no es un SELECT"""
+    if not sql or not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    conexion = connections[alias]
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f'{conexion.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' | '.join(map(str, fila)) for fila in cursor.fetchall())
+    except Exception as exc:
+        return f'No se pudo obtener el plan: {exc}'
+
+
+def volcar_consultas():
+    """Escribe lo acumulado en `ConsultaLenta` y devuelve las formas guardadas"""
+    from .models import ConsultaLenta
+
+    with _lock:
+        if not _pendientes:
+            return 0
+        pendientes = dict(_pendientes)
+        _pendientes.clear()
+
+    _local.volcando = True
+    close_old_connections()
+    try:
+        ahora = timezone.now()
+        for huella, datos in pendientes.items():
+            cambios = {
+                'total': F('total') + datos['total'],
+                'ms_total': F('ms_total') + datos['ms_total'],
+                'ms_max': Greatest(F('ms_max'), datos['ms_max']),
+                'ultima_vista': datos['vista'],
+                'pila': datos['pila'],
+                'ultima': ahora,
+            }
+            if ConsultaLenta.objects.filter(huella=huella).update(**cambios):
+                continue
+            try:
+                ConsultaLenta.objects.create(
+                    huella=huella,
+                    alias=datos['alias'],
+                    sql=datos['forma'],
+                    total=datos['total'],
+                    ms_total=datos['ms_total'],
+                    ms_max=datos['ms_max'],
+                    ultima_vista=datos['vista'],
+                    pila=datos['pila'],
+                    plan=explicar(datos['alias'], datos['sql'], datos['params']),
+                    primera=ahora,
+                    ultima=ahora,
+                )
+            except IntegrityError:
+                # Otro worker la creó entre el UPDATE y el INSERT
+                ConsultaLenta.objects.filter(huella=huella).update(**cambios)
+        return len(pendientes)
+    except Exception:
+        logger.exception('No se pudieron guardar las consultas lentas')
+        return 0
+    finally:
+        close_old_connections()
+        _local.volcando = False
+
+
+atexit.register(volcar_consultas)
+
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from apps.core.cache_sqlite import SQLiteCache
+
+BACKENDS = ('locmem', 'archivos', 'sqlite')
+
+
+def crear_cache(nombre, directorio):
+    """Instancia nueva del backend (cada proceso crea la suya tras el fork)"""
+    if nombre == 'locmem':
+        return LocMemCache('benchmark', {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    if nombre == 'archivos':
+        return FileBasedCache(os.path.join(directorio, 'archivos'), {'OPTIONS': {'MAX_ENTRIES': 100000}})
+    return SQLiteCache(
+        os.path.join(directorio, 'cache.sqlite3'), {'OPTIONS': {'MAX_BYTES': 512 * 1024 * 1024}}
+    )
+
+
+def medir(funcion, repeticiones):
+    """Mediana en microsegundos de `repeticiones` llamadas a `funcion`"""
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tiempos)
+
+
+def trabajador(nombre, directorio, claves, operaciones, carga, semilla):
+    """
+    Simula un worker que sirve páginas: lee la clave y, si no está, la
+    "renderiza" y la guarda. Devuelve (renders, segundos).
+    """
+    cache = crear_cache(nombre, directorio)
+    aleatorio = random.Random(semilla)
+    renders = 0
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        clave = f'pagina:{aleatorio.randrange(claves)}'
+        if cache.get(clave) is None:
+            renders += 1
+            cache.set(clave, carga, 300)
+    return renders, time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la caché en memoria del proceso, la de archivos y la SQLite '
+        'compartida: latencia por operación y renders repetidos entre workers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=2000)
+        parser.add_argument('--bytes', type=int, default=20_000, help='Tamaño de cada valor')
+        parser.add_argument('--procesos', type=int, default=4, help='Workers simulados')
+        parser.add_argument('--claves', type=int, default=200, help='Páginas distintas')
+        parser.add_argument('--operaciones', type=int, default=2000, help='Lecturas por worker')
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        carga = os.urandom(options['bytes'])
+        directorio = tempfile.mkdtemp(prefix='benchmark-cache-')
+        contexto = multiprocessing.get_context('fork')
+
+        self.stdout.write(
+            f'{options["procesos"]} workers, {options["claves"]} claves de {len(carga)} bytes\n'
+        )
+        self.stdout.write(
+            f'{"backend":<10}{"set µs":>10}{"get µs":>10}{"incr µs":>10}'
+            f'{"ops/s":>12}{"renders":>10}'
+        )
+        try:
+            for nombre in BACKENDS:
+                cache = crear_cache(nombre, directorio)
+                cache.clear()
+                us_set = medir(lambda i: cache.set(f'k{i % 100}', carga), repeticiones)
+                us_get = medir(lambda i: cache.get(f'k{i % 100}'), repeticiones)
+                cache.set('contador', 0)
+                us_incr = medir(lambda i: cache.incr('contador'), repeticiones)
+                cache.clear()
+
+                argumentos = [
+                    (nombre, directorio, options['claves'], options['operaciones'], carga, semilla)
+                    for semilla in range(options['procesos'])
+                ]
+                with contexto.Pool(options['procesos']) as pool:
+                    resultados = pool.starmap(trabajador, argumentos)
+                renders = sum(r for r, _ in resultados)
+                ops = options['procesos'] * options['operaciones'] / max(s for _, s in resultados)
+
+                self.stdout.write(
+                    f'{nombre:<10}{us_set:>10.1f}{us_get:>10.1f}{us_incr:>10.1f}'
+                    f'{ops:>12.0f}{renders:>10}'
+                )
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        self.stdout.write(
+            '\n"renders" cuenta los fallos de caché de todos los workers: con una '
+            f'caché compartida se acerca a {options["claves"]} y con locmem se '
+            'multiplica por la cantidad de workers.'
+        )
@@ -0,0 +1,73 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Simula el arranque de un worker: configura Django y carga todas las URLs
+# (y con ellas todas las vistas), igual que en la primera petición
+CODIGO_ARRANQUE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns; '
+    'import config.wsgi'
+)
+
+CODIGO_PDF = '; from apps.perfiles.pdf import cargar_librerias; cargar_librerias()'
+
+re_linea = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Perfila el tiempo de importación del arranque de un worker usando python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Cantidad de filas a mostrar')
+        parser.add_argument(
+            '--con-pdf', action='store_true',
+            help='Incluye las librerías de PDF, que normalmente se cargan al primer render'
+        )
+        parser.add_argument(
+            '--por-modulo', action='store_true',
+            help='Muestra módulos individuales en lugar de agrupar por paquete raíz'
+        )
+
+    def handle(self, *args, **options):
+        codigo = CODIGO_ARRANQUE + (CODIGO_PDF if options['con_pdf'] else '')
+        entorno = dict(os.environ)
+        entorno.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        resultado = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+        )
+        if resultado.returncode != 0:
+            raise CommandError(resultado.stderr.strip().splitlines()[-1])
+
+        propio = defaultdict(int)
+        acumulado = defaultdict(int)
+        total = 0
+        for linea in resultado.stderr.splitlines():
+            coincidencia = re_linea.match(linea)
+            if not coincidencia:
+                continue
+            us_propio, us_acumulado, modulo = coincidencia.groups()
+            clave = modulo if options['por_modulo'] else modulo.split('.')[0]
+            propio[clave] += int(us_propio)
+            acumulado[clave] = max(acumulado[clave], int(us_acumulado))
+            total += int(us_propio)
+
+        self.stdout.write(f'Tiempo total de importación: {total / 1000:.1f} ms ({len(propio)} grupos)')
+        if options['por_modulo']:
+            self.stdout.write(f'{"módulo":<45}{"propio ms":>12}{"acumulado ms":>15}')
+        else:
+            # Agrupado, el tiempo propio sumado ya es el costo total del paquete
+            self.stdout.write(f'{"paquete":<45}{"ms":>12}{"%":>8}')
+        filas = sorted(propio, key=lambda m: propio[m], reverse=True)[:options['top']]
+        for modulo in filas:
+            if options['por_modulo']:
+                extra = f'{acumulado[modulo] / 1000:>15.1f}'
+            else:
+                extra = f'{propio[modulo] * 100 / total:>8.1f}'
+            self.stdout.write(f'{modulo:<45}{propio[modulo] / 1000:>12.1f}{extra}')
@@ -0,0 +1,302 @@
+"""
+Registro de métricas del proceso, agregadas entre workers.
+
+Contadores e histogramas identificados por nombre y etiquetas, seguros entre
+hilos. Las vistas y los middlewares los actualizan en memoria; con
+`METRICAS_DIR` configurado, un hilo en segundo plano escribe cada
+`METRICAS_INTERVALO` segundos lo acumulado por el proceso en
+`<METRICAS_DIR>/<pid>.json`, y `/metrics` suma los archivos de todos los
+workers. Los archivos de procesos que ya terminaron se fusionan en
+`historico.json` para que los contadores no retrocedan al reiniciar un worker.
+
+`exportar()` devuelve el texto en el formato de exposición de Prometheus.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CUBETAS_BYTES = (1024, 10240, 51200, 102400, 512000, 1048576, 5242880, 10485760)
+
+AYUDAS = {
+    'http_peticiones_total': 'Peticiones atendidas por vista, método y estado',
+    'http_duracion_segundos': 'Duración de las peticiones por vista',
+    'pdf_render_segundos': 'Tiempo de generación de cada PDF por motor',
+    'pdf_tamano_bytes': 'Tamaño de cada PDF generado por motor',
+    'pdf_rechazos_total': 'Peticiones de PDF rechazadas por límite',
+    'busqueda_rechazos_total': 'Búsquedas de perfiles rechazadas por límite',
+    'cache_consultas_total': 'Consultas a la caché de páginas y PDFs por resultado',
+    'coalescencia_total': 'Renders agrupados por single flight',
+    'db_consultas_total': 'Consultas SQL ejecutadas por conexión',
+    'db_consultas_segundos_total': 'Tiempo total en consultas SQL por conexión',
+    'db_consultas_lentas_total': 'Consultas SQL que superaron DB_CONSULTAS_LENTAS_MS',
+}
+
+HISTORICO = 'historico.json'
+
+_lock = threading.Lock()
+_contadores = Counter()
+# (nombre, etiquetas) -> [conteo por cubeta..., +Inf, suma]
+_histogramas = {}
+_cubetas = {}
+_hilo = None
+_pid = None
+
+
+def clave(nombre, etiquetas):
+    return (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+
+
+def incrementar(nombre, cantidad=1, **etiquetas):
+    """Suma `cantidad` al contador `nombre` con las etiquetas dadas"""
+    with _lock:
+        _contadores[clave(nombre, etiquetas)] += cantidad
+    iniciar_hilo()
+
+
+def observar(nombre, valor, cubetas=CUBETAS_SEGUNDOS, **etiquetas):
+    """Registra `valor` en el histograma `nombre`"""
+    with _lock:
+        _cubetas.setdefault(nombre, tuple(cubetas))
+        limites = _cubetas[nombre]
+        datos = _histogramas.setdefault(clave(nombre, etiquetas), [0] * (len(limites) + 1) + [0.0])
+        datos[bisect_left(limites, valor)] += 1
+        datos[-1] += valor
+    iniciar_hilo()
+
+
+def valores():
+    """Copia de todos los contadores del proceso: {(nombre, etiquetas): valor}"""
+    with _lock:
+        return dict(_contadores)
+
+
+def instantanea():
+    """Estado del proceso serializable en JSON"""
+    with _lock:
+        return {
+            'contadores': [[n, list(e), v] for (n, e), v in _contadores.items()],
+            'histogramas': [[n, list(e), list(d)] for (n, e), d in _histogramas.items()],
+            'cubetas': {n: list(c) for n, c in _cubetas.items()},
+        }
+
+
+def sumar(total, datos):
+    """Acumula en `total` una instantánea (de otro proceso o del histórico)"""
+    for nombre, etiquetas, valor in datos.get('contadores', []):
+        total['contadores'][(nombre, tuple(map(tuple, etiquetas)))] += valor
+    total['cubetas'].update({n: tuple(c) for n, c in datos.get('cubetas', {}).items()})
+    for nombre, etiquetas, datos_histograma in datos.get('histogramas', []):
+        k = (nombre, tuple(map(tuple, etiquetas)))
+        actual = total['histogramas'].get(k)
+        if actual is None or len(actual) != len(datos_histograma):
+            total['histogramas'][k] = list(datos_histograma)
+        else:
+            total['histogramas'][k] = [a + b for a, b in zip(actual, datos_histograma)]
+
+
+def a_json(total):
+    return {
+        'contadores': [[n, list(e), v] for (n, e), v in total['contadores'].items()],
+        'histogramas': [[n, list(e), d] for (n, e), d in total['histogramas'].items()],
+        'cubetas': {n: list(c) for n, c in total['cubetas'].items()},
+    }
+
+
+def vacio():
+    return {'contadores': Counter(), 'histogramas': {}, 'cubetas': {}}
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """`execute_wrapper` que cuenta las consultas SQL y su tiempo por conexión"""
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context['connection'].alias
+        incrementar('db_consultas_total', alias=alias)
+        incrementar('db_consultas_segundos_total', time.perf_counter() - inicio, alias=alias)
+
+
+def instalar_medicion(sender, connection, **kwargs):
+    """Receptor de `connection_created`: agrega `medir_consulta` a la conexión"""
+    # Al principio de la lista: `connection.execute_wrapper()` quita el último
+    # al salir, y la conexión puede abrirse dentro de uno de esos bloques
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, medir_consulta)
+
+
+# Almacenamiento entre procesos
+
+def directorio():
+    return Path(settings.METRICAS_DIR) if settings.METRICAS_DIR else None
+
+
+def escribir_json(ruta, datos):
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.metricas.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, ruta)
+
+
+def leer_json(ruta):
+    try:
+        return json.loads(ruta.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def volcar():
+    """Escribe el estado del proceso en su archivo del directorio compartido"""
+    carpeta = directorio()
+    if carpeta is None:
+        return
+    try:
+        carpeta.mkdir(parents=True, exist_ok=True)
+        escribir_json(carpeta / f'{os.getpid()}.json', instantanea())
+    except OSError:
+        logger.exception('No se pudieron guardar las métricas')
+
+
+def proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def agregar():
+    """Suma el proceso actual y los archivos de los demás workers"""
+    total = vacio()
+    sumar(total, instantanea())
+    carpeta = directorio()
+    if carpeta is None or not carpeta.exists():
+        return total
+
+    with open(carpeta / '.candado', 'w') as candado:
+        fcntl.flock(candado, fcntl.LOCK_EX)
+        historico = vacio()
+        sumar(historico, leer_json(carpeta / HISTORICO))
+        muertos = []
+        for ruta in carpeta.glob('*.json'):
+            if not ruta.stem.isdigit() or int(ruta.stem) == os.getpid():
+                continue
+            datos = leer_json(ruta)
+            if proceso_vivo(int(ruta.stem)):
+                sumar(total, datos)
+            else:
+                sumar(historico, datos)
+                muertos.append(ruta)
+        if muertos:
+            escribir_json(carpeta / HISTORICO, a_json(historico))
+            for ruta in muertos:
+                ruta.unlink(missing_ok=True)
+        sumar(total, a_json(historico))
+    return total
+
+
+def iniciar_hilo():
+    """Arranca el hilo de volcado en este proceso si hace falta"""
+    global _hilo, _pid
+    if not settings.METRICAS_DIR:
+        return
+    if _hilo is not None and _pid == os.getpid():
+        return
+    with _lock:
+        if _hilo is not None and _pid == os.getpid():
+            return
+        _pid = os.getpid()
+        _hilo = threading.Thread(target=bucle_volcado, name='volcado-metricas', daemon=True)
+        _hilo.start()
+
+
+def bucle_volcado():
+    while True:
+        time.sleep(settings.METRICAS_INTERVALO)
+        volcar()
+
+
+def reiniciar_en_hijo():
+    """Un worker recién creado no hereda lo contado por el proceso maestro"""
+    global _lock, _hilo
+    _lock = threading.Lock()
+    _hilo = None
+    _contadores.clear()
+    _histogramas.clear()
+
+
+atexit.register(volcar)
+os.register_at_fork(after_in_child=reiniciar_en_hijo)
+
+
+# Formato de exposición de Prometheus
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def etiquetas_texto(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in etiquetas) + '}'
+
+
+def numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar(medidores=None):
+    """
+    Texto de todas las métricas agregadas. `medidores` son valores calculados
+    al momento: {nombre: (ayuda, [(etiquetas, valor), ...])}.
+    """
+    total = agregar()
+    lineas = []
+
+    por_nombre = {}
+    for (nombre, etiquetas), valor in sorted(total['contadores'].items()):
+        por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+    for nombre, filas in por_nombre.items():
+        lineas.append(f'# HELP {nombre} {AYUDAS.get(nombre, nombre)}')
+        lineas.append(f'# TYPE {nombre} counter')
+        lineas += [f'{nombre}{etiquetas_texto(e)} {numero(v)}' for e, v in filas]
+
+    por_nombre = {}
+    for (nombre, etiquetas), datos in sorted(total['histogramas'].items()):
+        por_nombre.setdefault(nombre, []).append((etiquetas, datos))
+    for nombre, filas in por_nombre.items():
+        limites = total['cubetas'].get(nombre, ())
+        lineas.append(f'# HELP {nombre} {AYUDAS.get(nombre, nombre)}')
+        lineas.append(f'# TYPE {nombre} histogram')
+        for etiquetas, datos in filas:
+            acumulado = 0
+            for limite, conteo in zip(list(limites) + ['+Inf'], datos[:-1]):
+                acumulado += conteo
+                le = etiquetas + (('le', limite if limite == '+Inf' else numero(float(limite))),)
+                lineas.append(f'{nombre}_bucket{etiquetas_texto(le)} {acumulado}')
+            lineas.append(f'{nombre}_sum{etiquetas_texto(etiquetas)} {numero(float(datos[-1]))}')
+            lineas.append(f'{nombre}_count{etiquetas_texto(etiquetas)} {acumulado}')
+
+    for nombre, (ayuda, filas) in (medidores or {}).items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        lineas += [
+            f'{nombre}{etiquetas_texto(tuple(sorted(e.items())))} {numero(v)}' for e, v in filas
+        ]
+
+    return '\n'.join(lineas) + '\n'
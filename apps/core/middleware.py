@@ -0,0 +1,401 @@
+"""
+Middlewares del sitio.
+
+`CompresionMiddleware` comprime las respuestas dinámicas. WhiteNoise ya sirve los estáticos comprimidos; este middleware negocia
+Brotli o gzip para el HTML y el JSON generados por las vistas. Cuando la
+respuesta proviene de la caché de páginas (tiene `clave_cache`), la variante
+comprimida se guarda junto a ella para no recomprimir en cada acierto. Las
+respuestas con secretos (token CSRF, cookies, caché privada) no se comprimen
+para no exponerlas a ataques tipo BREACH.
+
+`MetricasMiddleware` cuenta las peticiones y mide su duración por vista.
+
+`ConsultasLentasMiddleware` deja a mano la petición en curso para asociarla a
+las consultas lentas.
+
+`PerfiladoMiddleware` perfila CPU y memoria de una petición cuando un
+usuario staff lo pide.
+
+`PaginaPublicaMiddleware` evita la sesión en las páginas públicas para los
+visitantes anónimos y las marca como cacheables por caches compartidas.
+"""
+import gzip
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.cache import has_vary_header, patch_cache_control, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metricas, perfilado
+from .consultas_lentas import peticion_actual
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional, se usa gzip en su lugar
+    brotli = None
+
+
+TIPOS_COMPRIMIBLES = (
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+)
+
+re_accept_encoding = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def codificaciones_disponibles():
+    """Codificaciones soportadas en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negociar_codificacion(accept_encoding):
+    """Elige la mejor codificación aceptada por el cliente, o None"""
+    if not accept_encoding:
+        return None
+
+    aceptadas = {}
+    for parte in accept_encoding.split(','):
+        coincidencia = re_accept_encoding.match(parte)
+        if not coincidencia:
+            continue
+        nombre, calidad = coincidencia.groups()
+        try:
+            aceptadas[nombre.lower()] = float(calidad) if calidad else 1.0
+        except ValueError:
+            continue
+
+    comodin = aceptadas.get('*', 0)
+    mejor, mejor_calidad = None, 0
+    for codificacion in codificaciones_disponibles():
+        calidad = aceptadas.get(codificacion, comodin)
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = codificacion, calidad
+    return mejor
+
+
+def comprimir(contenido, codificacion, maximo=False):
+    """
+    Comprime `contenido` con la codificación indicada.
+
+    `maximo` usa el nivel más alto, pensado para variantes que se guardan
+    en caché y se comprimen una sola vez.
+    """
+    if codificacion == 'br':
+        calidad = 11 if maximo else settings.COMPRESION_BROTLI_CALIDAD
+        return brotli.compress(contenido, quality=calidad, mode=brotli.MODE_TEXT)
+    nivel = 9 if maximo else settings.COMPRESION_GZIP_NIVEL
+    return gzip.compress(contenido, compresslevel=nivel, mtime=0)
+
+
+class CompresionMiddleware:
+    """Comprime con Brotli o gzip las respuestas HTML y JSON"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.procesar_respuesta(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        codificacion = self.negociar(request, response)
+        if codificacion is None:
+            return response
+
+        clave = getattr(response, 'clave_cache', None)
+        if not clave:
+            return self.aplicar(response, codificacion)
+
+        clave_variante = f'{clave}:{codificacion}'
+        comprimido = await cache.aget(clave_variante)
+        nuevo = comprimido is None
+        if nuevo:
+            # El nivel máximo tarda decenas de milisegundos en una página
+            # grande: se comprime fuera del event loop
+            comprimido = await sync_to_async(comprimir, thread_sensitive=False)(
+                response.content, codificacion, maximo=True
+            )
+        response = self.aplicar(response, codificacion, comprimido)
+        if nuevo and response.has_header('Content-Encoding'):
+            await cache.aset(clave_variante, response.content, settings.CACHE_PAGINAS_SEGUNDOS)
+        return response
+
+    def es_comprimible(self, response):
+        if response.streaming or response.status_code != 200:
+            return False
+        if response.has_header('Content-Encoding'):
+            return False
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if tipo not in TIPOS_COMPRIMIBLES:
+            return False
+        return len(response.content) >= settings.COMPRESION_TAMANO_MINIMO
+
+    def tiene_secretos(self, request, response):
+        """
+        La respuesta puede mezclar un secreto con texto que controla el
+        cliente (BREACH): usó el token CSRF, pone cookies o es privada.
+        """
+        if 'CSRF_COOKIE_NEEDS_UPDATE' in request.META or response.cookies:
+            return True
+        cache_control = response.get('Cache-Control', '').lower()
+        return 'private' in cache_control or 'no-store' in cache_control
+
+    def negociar(self, request, response):
+        """Codificación a usar para la respuesta, o None si no se comprime"""
+        if not self.es_comprimible(response) or self.tiene_secretos(request, response):
+            return None
+        # La respuesta varía según Accept-Encoding aunque no se comprima
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return negociar_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    def procesar_respuesta(self, request, response):
+        codificacion = self.negociar(request, response)
+        if codificacion is None:
+            return response
+
+        clave = getattr(response, 'clave_cache', None)
+        if not clave:
+            return self.aplicar(response, codificacion)
+
+        clave_variante = f'{clave}:{codificacion}'
+        comprimido = cache.get(clave_variante)
+        response = self.aplicar(response, codificacion, comprimido)
+        if comprimido is None and response.has_header('Content-Encoding'):
+            cache.set(clave_variante, response.content, settings.CACHE_PAGINAS_SEGUNDOS)
+        return response
+
+    def aplicar(self, response, codificacion, comprimido=None):
+        """
+        Reemplaza el cuerpo por su versión comprimida.
+
+        `comprimido` es la variante ya guardada en caché, si existe. Las
+        páginas cacheadas se comprimen al máximo porque se hace una sola vez.
+        """
+        if comprimido is None:
+            maximo = getattr(response, 'clave_cache', None) is not None
+            comprimido = comprimir(response.content, codificacion, maximo=maximo)
+
+        # Si no se gana nada se devuelve la respuesta original
+        if len(comprimido) >= len(response.content):
+            return response
+
+        response.content = comprimido
+        response['Content-Length'] = str(len(comprimido))
+        response['Content-Encoding'] = codificacion
+
+        # El cuerpo ya no es idéntico byte a byte, el ETag pasa a ser débil
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        return response
+
+
+class MetricasMiddleware:
+    """
+    Peticiones y duración por nombre de URL, método y estado.
+
+    Va primero en MIDDLEWARE para medir también al resto de middlewares. Las
+    peticiones que no resuelven a ninguna vista se agrupan en `sin_ruta` para
+    no crear una serie por cada URL inventada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio)
+        return response
+
+    def registrar(self, request, response, segundos):
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia is not None else 'sin_ruta'
+        metricas.incrementar(
+            'http_peticiones_total', vista=vista, metodo=request.method,
+            estado=response.status_code,
+        )
+        metricas.observar('http_duracion_segundos', segundos, vista=vista)
+
+
+class ConsultasLentasMiddleware:
+    """Guarda la petición en `peticion_actual` mientras se atiende"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = peticion_actual.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            peticion_actual.reset(token)
+
+    async def __acall__(self, request):
+        token = peticion_actual.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            peticion_actual.reset(token)
+
+
+class PerfiladoMiddleware:
+    """
+    Perfila la petición con `?perfilar=1` o la cabecera `X-Perfilar: 1`.
+
+    Solo para usuarios staff y con `PERFILADO_ACTIVO`. El resultado se guarda
+    en `Perfilado` (se conservan los últimos `PERFILADO_CONSERVAR`) y su id se
+    devuelve en la cabecera `X-Perfilado`; si ya se está perfilando otra
+    petición en el proceso, la cabecera vale `ocupado`. En las respuestas
+    streaming solo se mide la vista, no la generación del cuerpo.
+
+    Va después de AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def solicitado(self, request):
+        valores = (request.GET.get('perfilar', ''), request.META.get('HTTP_X_PERFILAR', ''))
+        return settings.PERFILADO_ACTIVO and any(
+            valor.strip().lower() in ('1', 'true') for valor in valores
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.solicitado(request) or not request.user.is_staff:
+            return self.get_response(request)
+
+        captura = perfilado.iniciar_captura()
+        if captura is None:
+            response = self.get_response(request)
+            response['X-Perfilado'] = 'ocupado'
+            return response
+        try:
+            response = self.get_response(request)
+        finally:
+            perfilado.terminar_captura(captura)
+        response['X-Perfilado'] = str(self.guardar(request, response, captura))
+        return response
+
+    async def __acall__(self, request):
+        if not self.solicitado(request):
+            return await self.get_response(request)
+        if not await sync_to_async(lambda: request.user.is_staff)():
+            return await self.get_response(request)
+
+        captura = perfilado.iniciar_captura()
+        if captura is None:
+            response = await self.get_response(request)
+            response['X-Perfilado'] = 'ocupado'
+            return response
+        try:
+            response = await self.get_response(request)
+        finally:
+            perfilado.terminar_captura(captura)
+        response['X-Perfilado'] = str(
+            await sync_to_async(self.guardar)(request, response, captura)
+        )
+        return response
+
+    def guardar(self, request, response, captura):
+        """Guarda la captura, descarta las más antiguas y devuelve su id"""
+        from .models import Perfilado
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        registro = Perfilado.objects.create(
+            usuario=request.user.get_username(),
+            metodo=request.method,
+            ruta=request.get_full_path()[:500],
+            vista=coincidencia.view_name if coincidencia is not None else '',
+            estado=response.status_code,
+            duracion_ms=captura.duracion * 1000,
+            memoria_pico=captura.memoria_pico,
+            muestras=captura.muestreador.muestras,
+            resumen=captura.resumen(),
+            pilas=captura.pilas_folded(),
+        )
+        antiguos = list(
+            Perfilado.objects.values_list('pk', flat=True)[settings.PERFILADO_CONSERVAR:]
+        )
+        if antiguos:
+            Perfilado.objects.filter(pk__in=antiguos).delete()
+        return registro.pk
+
+
+class PaginaPublicaMiddleware(MiddlewareMixin):
+    """
+    Páginas públicas (`PAGINAS_PUBLICAS`) sin sesión para visitantes anónimos.
+    
+    Si la petición no trae la cookie de sesión, se fija `request.user` como
+    anónimo antes de la vista, de modo que nada carga la sesión: no hay
+    consultas a la tabla de sesiones ni `Vary: Cookie`. La respuesta se marca
+    `Cache-Control: public` salvo que algo haya usado la sesión o puesto una
+    cookie de todos modos, o que la vista ya haya definido su caché.
+    
+    Debe ir antes de SessionMiddleware para ver la respuesta final.
+    """
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        coincidencia = request.resolver_match
+        if (
+            coincidencia is not None
+            and coincidencia.namespace in settings.PAGINAS_PUBLICAS
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        ):
+            request.user = AnonymousUser()
+            request.pagina_publica = True
+        return None
+    
+    def process_response(self, request, response):
+        if not getattr(request, 'pagina_publica', False):
+            return response
+        if response.status_code != 200 or response.has_header('Cache-Control'):
+            return response
+        if response.cookies or has_vary_header(response, 'Cookie'):
+            return response
+        patch_cache_control(response, public=True, max_age=settings.PAGINAS_PUBLICAS_MAX_AGE)
+        return response
@@ -0,0 +1,79 @@
+from django.db import models
+
+
+class Perfilado(models.Model):
+    """Perfil de CPU y memoria de una petición, capturado a pedido del staff"""
+    
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    
+    usuario = models.CharField(max_length=150, verbose_name='Usuario')
+    
+    metodo = models.CharField(max_length=10, verbose_name='Método')
+    
+    ruta = models.CharField(max_length=500, verbose_name='Ruta')
+    
+    vista = models.CharField(max_length=200, blank=True, verbose_name='Vista')
+    
+    estado = models.PositiveSmallIntegerField(verbose_name='Estado HTTP')
+    
+    duracion_ms = models.FloatField(verbose_name='Duración (ms)')
+    
+    memoria_pico = models.PositiveBigIntegerField(
+        verbose_name='Memoria pico (bytes)',
+        help_text='Memoria asignada por encima de la inicial durante la petición'
+    )
+    
+    muestras = models.PositiveIntegerField(verbose_name='Muestras')
+    
+    resumen = models.TextField(verbose_name='Resumen')
+    
+    pilas = models.TextField(
+        verbose_name='Pilas',
+        help_text='Formato folded (speedscope, flamegraph.pl)'
+    )
+    
+    class Meta:
+        verbose_name = 'Perfilado'
+        verbose_name_plural = 'Perfilados'
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        return f"{self.metodo} {self.ruta} ({self.fecha:%Y-%m-%d %H:%M:%S})"
+
+
+class ConsultaLenta(models.Model):
+    """Forma de consulta SQL que superó el umbral de lentitud, con su plan"""
+    
+    huella = models.CharField(max_length=40, unique=True, verbose_name='Huella')
+    
+    alias = models.CharField(max_length=50, verbose_name='Base de datos')
+    
+    sql = models.TextField(verbose_name='SQL', help_text='Con los literales reemplazados por ?')
+    
+    total = models.PositiveIntegerField(default=0, verbose_name='Veces')
+    
+    ms_total = models.FloatField(default=0, verbose_name='Tiempo total (ms)')
+    
+    ms_max = models.FloatField(default=0, verbose_name='Tiempo máximo (ms)')
+    
+    ultima_vista = models.CharField(max_length=200, blank=True, verbose_name='Última vista')
+    
+    pila = models.TextField(blank=True, verbose_name='Pila (código del proyecto)')
+    
+    plan = models.TextField(blank=True, verbose_name='Plan de ejecución')
+    
+    primera = models.DateTimeField(verbose_name='Primera vez')
+    
+    ultima = models.DateTimeField(verbose_name='Última vez')
+    
+    class Meta:
+        verbose_name = 'Consulta Lenta'
+        verbose_name_plural = 'Consultas Lentas'
+        ordering = ['-ms_total']
+    
+    def __str__(self):
+        return self.sql[:80]
+    
+    @property
+    def ms_promedio(self):
+        return self.ms_total / self.total if self.total else 0
@@ -0,0 +1,176 @@
+"""
+Perfilado bajo demanda de una petición (CPU y memoria).
+
+Las vistas asíncronas corren en el hilo del event loop y el PDF se genera en
+`ejecutor_pdf`, así que `cProfile` (que solo ve el hilo que lo activa) se
+perdería la mayor parte del trabajo. En su lugar se usa un muestreador: un
+hilo que cada `PERFILADO_INTERVALO` segundos lee la pila de todos los demás
+hilos con `sys._current_frames()` y cuenta cada pila. Se descartan los hilos
+en espera (locks, colas, selectores) y los hilos de volcado del propio sitio.
+
+La memoria se mide con `tracemalloc`: pico durante la petición y las líneas
+con más memoria asignada y aún viva al terminar.
+
+Solo se perfila una petición a la vez por proceso (`tracemalloc` es global).
+En un worker con varios hilos las muestras pueden incluir otras peticiones
+que corrían al mismo tiempo.
+
+El resultado incluye las pilas en formato "folded" (una pila por línea,
+funciones separadas por `;` y la cantidad de muestras), que abren speedscope
+o `flamegraph.pl`.
+"""
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+
+# Módulos cuya función más interna indica que el hilo está esperando
+MODULOS_EN_ESPERA = {
+    'threading',
+    'selectors',
+    'queue',
+    'socket',
+    'socketserver',
+    'concurrent.futures.thread',
+}
+
+HILOS_IGNORADOS = ('volcado-',)
+
+FILTROS_MEMORIA = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, __file__),
+)
+
+_ocupado = threading.Lock()
+
+
+def nombre_funcion(frame):
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+
+class Muestreador(threading.Thread):
+    """Hilo que acumula las pilas de los demás hilos"""
+
+    def __init__(self, intervalo):
+        super().__init__(name='perfilado-muestreador', daemon=True)
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self.detener = threading.Event()
+
+    def run(self):
+        propio = threading.get_ident()
+        while not self.detener.wait(self.intervalo):
+            ignorados = {
+                hilo.ident for hilo in threading.enumerate()
+                if hilo.name.startswith(HILOS_IGNORADOS)
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or ident in ignorados:
+                    continue
+                if frame.f_globals.get('__name__') in MODULOS_EN_ESPERA:
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(nombre_funcion(frame))
+                    frame = frame.f_back
+                self.pilas[';'.join(reversed(pila))] += 1
+            self.muestras += 1
+
+
+class Captura:
+    """Perfil de CPU y memoria entre `iniciar()` y `terminar()`"""
+
+    def __init__(self):
+        self.muestreador = Muestreador(settings.PERFILADO_INTERVALO)
+        self.tracemalloc_propio = False
+
+    def iniciar(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.PERFILADO_MARCOS)
+            self.tracemalloc_propio = True
+        tracemalloc.reset_peak()
+        self.memoria_inicial = tracemalloc.get_traced_memory()[0]
+        self.inicio = time.perf_counter()
+        self.muestreador.start()
+
+    def terminar(self):
+        self.duracion = time.perf_counter() - self.inicio
+        self.muestreador.detener.set()
+        self.muestreador.join()
+        try:
+            actual, pico = tracemalloc.get_traced_memory()
+            self.memoria_pico = max(0, pico - self.memoria_inicial)
+            self.memoria_retenida = max(0, actual - self.memoria_inicial)
+            instantanea = tracemalloc.take_snapshot().filter_traces(FILTROS_MEMORIA)
+            self.asignaciones = instantanea.statistics('lineno')[:settings.PERFILADO_TOP]
+        finally:
+            if self.tracemalloc_propio:
+                tracemalloc.stop()
+
+    def pilas_folded(self):
+        return ''.join(
+            f'{pila} {total}\n' for pila, total in self.muestreador.pilas.most_common()
+        )
+
+    def resumen(self):
+        """Informe de texto: funciones con más muestras y mayores asignaciones"""
+        pilas = self.muestreador.pilas
+        propias, incluidas = Counter(), Counter()
+        for pila, total in pilas.items():
+            funciones = pila.split(';')
+            propias[funciones[-1]] += total
+            for funcion in set(funciones):
+                incluidas[funcion] += total
+        total_muestras = sum(pilas.values()) or 1
+
+        lineas = [
+            f'Duración: {self.duracion * 1000:.1f} ms',
+            f'Muestras: {self.muestreador.muestras} cada {self.muestreador.intervalo * 1000:g} ms '
+            f'({sum(pilas.values())} pilas activas)',
+            f'Memoria pico: {self.memoria_pico / 1024:.1f} KiB, '
+            f'retenida al terminar: {self.memoria_retenida / 1024:.1f} KiB',
+            '',
+            'Funciones con más muestras propias:',
+        ]
+        lineas += [
+            f'{total:>7} {100 * total / total_muestras:5.1f}%  {funcion}'
+            for funcion, total in propias.most_common(settings.PERFILADO_TOP)
+        ]
+        lineas += ['', 'Funciones con más muestras acumuladas (incluye llamadas):']
+        lineas += [
+            f'{total:>7} {100 * total / total_muestras:5.1f}%  {funcion}'
+            for funcion, total in incluidas.most_common(settings.PERFILADO_TOP)
+        ]
+        lineas += ['', 'Líneas con más memoria asignada aún viva:']
+        lineas += [
+            f'{estadistica.size / 1024:>10.1f} KiB {estadistica.count:>7} bloques  '
+            f'{estadistica.traceback[0].filename}:{estadistica.traceback[0].lineno}'
+            for estadistica in self.asignaciones
+        ]
+        return '\n'.join(lineas) + '\n'
+
+
+def iniciar_captura():
+    """Captura en curso, o None si ya se está perfilando otra petición"""
+    if not _ocupado.acquire(blocking=False):
+        return None
+    captura = Captura()
+    try:
+        captura.iniciar()
+    except BaseException:
+        _ocupado.release()
+        raise
+    return captura
+
+
+def terminar_captura(captura):
+    try:
+        captura.terminar()
+    finally:
+        _ocupado.release()
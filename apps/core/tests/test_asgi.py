@@ -0,0 +1,80 @@
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import override_settings
+
+from apps.perfiles import media
+from apps.perfiles.tests.base import PruebaBase
+from config.asgi import application
+
+
+class ASGIStreamingTests(PruebaBase):
+    """Las descargas grandes llegan por bloques a través de `config.asgi`"""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ajustes = override_settings(MEDIA_ROOT=directorio, MEDIA_DESCARGA='')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.contenido = b'%PDF' * 1000
+        (Path(directorio) / 'certificado.pdf').write_bytes(self.contenido)
+
+        # Como el cliente de pruebas: el handler no debe cerrar la conexión
+        # de la transacción de la prueba
+        for senal in (request_started, request_finished):
+            senal.disconnect(close_old_connections)
+            self.addCleanup(senal.connect, close_old_connections)
+
+    async def llamar(self, ruta, cabeceras=()):
+        """Mensajes ASGI enviados por la aplicación, en orden"""
+        # https: la aplicación ya cargó sus middlewares con la redirección a HTTPS
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'https', 'path': ruta, 'raw_path': ruta.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), *cabeceras],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 443),
+        }
+        pedido = asyncio.Queue()
+        pedido.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+        mensajes = []
+
+        async def enviar(mensaje):
+            mensajes.append((mensaje, len(self.leidos)))
+
+        await application(scope, pedido.get, enviar)
+        return mensajes
+
+    def contar_lecturas(self):
+        """Envuelve `leer_intervalo` para saber cuántos bloques se leyeron"""
+        self.leidos = []
+        original = media.leer_intervalo
+
+        def leer_intervalo(*args):
+            for bloque in original(*args):
+                self.leidos.append(bloque)
+                yield bloque
+
+        return mock.patch.object(media, 'leer_intervalo', leer_intervalo)
+
+    async def test_cada_bloque_se_envia_antes_de_leer_el_siguiente(self):
+        casos = (((), self.contenido), (((b'range', b'bytes=0-2499'),), self.contenido[:2500]))
+        for cabeceras, esperado in casos:
+            with self.subTest(cabeceras=cabeceras):
+                with mock.patch.object(media, 'TAMANO_BLOQUE', 1000), self.contar_lecturas():
+                    mensajes = await self.llamar('/media/certificado.pdf', cabeceras)
+
+                inicio, _ = mensajes[0]
+                self.assertEqual(inicio['type'], 'http.response.start')
+                cuerpos = [(m['body'], leidos) for m, leidos in mensajes[1:] if m.get('body')]
+                self.assertEqual(b''.join(body for body, _ in cuerpos), esperado)
+                # Con el cuerpo en memoria el primer envío llegaría tras leerlo todo
+                self.assertEqual([leidos for _, leidos in cuerpos], list(range(1, len(cuerpos) + 1)))
+                self.assertGreater(len(cuerpos), 2)
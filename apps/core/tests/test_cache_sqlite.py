@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.core import cache_sqlite
+from apps.core.cache_sqlite import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.ruta = os.path.join(carpeta.name, 'cache.sqlite3')
+        self.cache = self.nueva_cache()
+
+    def nueva_cache(self, **opciones):
+        """Otra instancia sobre el mismo archivo, como la de otro worker"""
+        cache = SQLiteCache(self.ruta, {'OPTIONS': opciones})
+        self.addCleanup(self.cerrar, cache)
+        return cache
+
+    def cerrar(self, cache):
+        conexion = getattr(cache._local, 'conexion', None)
+        if conexion is not None:
+            conexion.close()
+
+    def reloj(self, ahora):
+        return mock.patch.object(cache_sqlite.time, 'time', return_value=ahora)
+
+    def total_bytes(self, cache):
+        conexion = cache.conexion()
+        total = conexion.execute('SELECT bytes FROM total').fetchone()[0]
+        suma = conexion.execute('SELECT COALESCE(SUM(tamano), 0) FROM entradas').fetchone()[0]
+        self.assertEqual(total, suma)
+        return total
+
+    def test_expiracion(self):
+        ahora = time.time()
+        with self.reloj(ahora):
+            self.cache.set('corta', 'valor', timeout=10)
+            self.cache.set('sin_fin', 'valor', timeout=None)
+        with self.reloj(ahora + 5):
+            self.assertEqual(self.cache.get('corta'), 'valor')
+            self.assertTrue(self.cache.touch('corta', timeout=10))
+        with self.reloj(ahora + 12):
+            self.assertEqual(self.cache.get('corta'), 'valor')
+        with self.reloj(ahora + 20):
+            self.assertIsNone(self.cache.get('corta'))
+            self.assertFalse(self.cache.has_key('corta'))
+            self.assertFalse(self.cache.touch('corta'))
+            self.assertEqual(self.cache.get_many(['corta', 'sin_fin']), {'sin_fin': 'valor'})
+
+    def test_desalojo_lru_bajo_max_bytes(self):
+        cache = self.nueva_cache(MAX_BYTES=1000)
+        ahora = time.time()
+        for numero, clave in enumerate('abcd'):
+            with self.reloj(ahora + numero):
+                cache.set(clave, 'x' * 200)
+        # Leer 'a' la vuelve la más reciente
+        with self.reloj(ahora + 10):
+            self.assertEqual(cache.get('a'), 'x' * 200)
+        with self.reloj(ahora + 11):
+            cache.set('e', 'x' * 200)
+
+        self.assertLessEqual(self.total_bytes(cache), 1000)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_many('acde').keys(), {'a', 'c', 'd', 'e'})
+
+    def test_desalojo_empieza_por_las_vencidas(self):
+        cache = self.nueva_cache(MAX_BYTES=1000)
+        ahora = time.time()
+        with self.reloj(ahora):
+            cache.set('vieja', 'x' * 200)
+            cache.set('vence', 'x' * 200, timeout=5)
+            cache.set('otra', 'x' * 200)
+            cache.set('mas', 'x' * 200)
+        with self.reloj(ahora + 10):
+            cache.set('nueva', 'x' * 200)
+
+        claves = ['vieja', 'vence', 'otra', 'mas', 'nueva']
+        self.assertEqual(cache.get_many(claves).keys(), {'vieja', 'otra', 'mas', 'nueva'})
+        self.assertLessEqual(self.total_bytes(cache), 1000)
+
+    def test_valor_mayor_que_el_limite_no_se_guarda(self):
+        cache = self.nueva_cache(MAX_BYTES=100)
+        cache.set('grande', 'chico')
+        cache.set('grande', 'x' * 200)
+        self.assertIsNone(cache.get('grande'))
+        self.assertEqual(self.total_bytes(cache), 0)
+
+    def test_add_sobre_clave_existente(self):
+        ahora = time.time()
+        with self.reloj(ahora):
+            self.assertTrue(self.cache.add('clave', 'primero', timeout=10))
+            self.assertFalse(self.cache.add('clave', 'segundo'))
+            self.assertEqual(self.cache.get('clave'), 'primero')
+        # Una entrada vencida cuenta como ausente
+        with self.reloj(ahora + 20):
+            self.assertTrue(self.cache.add('clave', 'tercero'))
+            self.assertEqual(self.cache.get('clave'), 'tercero')
+
+    def test_incr_sin_clave(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('falta')
+        self.cache.set('contador', 1)
+        self.assertEqual(self.cache.incr('contador', 4), 5)
+        self.assertEqual(self.cache.decr('contador'), 4)
+        self.assertEqual(self.total_bytes(self.cache), self.cache.serializar(':1:contador', 4)[1])
+
+        ahora = time.time()
+        with self.reloj(ahora):
+            self.cache.set('vencido', 1, timeout=1)
+        with self.reloj(ahora + 5), self.assertRaises(ValueError):
+            self.cache.incr('vencido')
+
+    def test_dos_conexiones(self):
+        otra = self.nueva_cache()
+        self.cache.set('compartida', {'valor': 1})
+        self.assertEqual(otra.get('compartida'), {'valor': 1})
+        otra.delete('compartida')
+        self.assertIsNone(self.cache.get('compartida'))
+
+        # `add` e `incr` son atómicos entre conexiones de distintos hilos
+        self.cache.set('contador', 0)
+        agregados = []
+
+        def trabajar(cache):
+            for _ in range(50):
+                cache.incr('contador')
+            agregados.append(cache.add('unica', threading.get_ident()))
+            cache._local.conexion.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(c,)) for c in (self.cache, otra)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(otra.get('contador'), 100)
+        self.assertEqual(sorted(agregados), [False, True])
@@ -0,0 +1,59 @@
+import brotli
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+
+from apps.core.middleware import CompresionMiddleware
+from apps.perfiles.tests.base import PruebaBase, crear_perfil
+
+
+class CompresionTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def test_pagina_publica_se_comprime(self):
+        response = self.client.get('/perfil/0102030405/', HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('José', brotli.decompress(response.content).decode())
+
+    async def test_variante_cacheada_en_asincrono(self):
+        cliente = AsyncClient()
+        primera = await cliente.get('/perfil/0102030405/', ACCEPT_ENCODING='gzip')
+        segunda = await cliente.get('/perfil/0102030405/', ACCEPT_ENCODING='gzip')
+        self.assertEqual(primera['Content-Encoding'], 'gzip')
+        self.assertEqual(primera.content, segunda.content)
+
+    def test_admin_con_busqueda_no_se_comprime(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        response = self.client.get(
+            '/admin/perfiles/datospersonales/', {'q': 'jos'}, HTTP_ACCEPT_ENCODING='br, gzip'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_respuestas_con_secretos_no_se_comprimen(self):
+        cuerpo = 'x' * 1000
+        casos = []
+
+        con_cookie = HttpResponse(cuerpo)
+        con_cookie.set_cookie('sesion', 'abc')
+        casos.append(({}, con_cookie))
+
+        privada = HttpResponse(cuerpo)
+        privada['Cache-Control'] = 'private, max-age=0'
+        casos.append(({}, privada))
+
+        casos.append(({'CSRF_COOKIE_NEEDS_UPDATE': False}, HttpResponse(cuerpo)))
+
+        for meta, respuesta in casos:
+            request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+            request.META.update(meta)
+            middleware = CompresionMiddleware(lambda request, respuesta=respuesta: respuesta)
+            self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompresionMiddleware(lambda request: HttpResponse(cuerpo))
+        self.assertEqual(middleware(request)['Content-Encoding'], 'gzip')
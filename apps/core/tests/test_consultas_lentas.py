@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+
+from apps.core import consultas_lentas
+from apps.core.models import ConsultaLenta
+from apps.perfiles.models import DatosPersonales
+from apps.perfiles.tests.base import PruebaBase, crear_perfil
+
+
+class ConsultasLentasTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        # Todas las consultas cuentan como lentas, solo durante la prueba: las
+        # del cierre de la transacción quedarían pendientes hasta el atexit
+        ajustes = override_settings(DB_CONSULTAS_LENTAS_MS=0)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Sin hilo de volcado y sin cerrar la conexión de la prueba
+        for nombre in ('iniciar_hilo', 'close_old_connections'):
+            parche = mock.patch.object(consultas_lentas, nombre)
+            parche.start()
+            self.addCleanup(parche.stop)
+        consultas_lentas.instalar_registro(sender=None, connection=connection)
+        consultas_lentas._pendientes.clear()
+        self.addCleanup(consultas_lentas._pendientes.clear)
+
+    def test_forma_normalizada_con_su_plan(self):
+        list(DatosPersonales.objects.filter(pk__in=[1, 2, 3], nombres='Ana'))
+        list(DatosPersonales.objects.filter(pk__in=[4, 5], nombres='Luis'))
+        self.assertEqual(consultas_lentas.volcar_consultas(), 1)
+
+        consulta = ConsultaLenta.objects.get()
+        self.assertEqual(consulta.total, 2)
+        self.assertEqual(consulta.alias, 'default')
+        self.assertIn('IN (...)', consulta.sql)
+        self.assertNotIn('Ana', consulta.sql)
+        self.assertTrue(consulta.sql.startswith('SELECT'))
+        self.assertGreaterEqual(consulta.ms_total, consulta.ms_max)
+        self.assertIn('test_consultas_lentas.py', consulta.pila)
+        # EXPLAIN QUERY PLAN en SQLite, EXPLAIN en PostgreSQL
+        self.assertTrue(consulta.plan)
+        self.assertNotIn('No se pudo obtener el plan', consulta.plan)
+
+        # Una nueva ejecución suma al registro sin volver a explicarla
+        consultas_lentas._pendientes.clear()
+        list(DatosPersonales.objects.filter(pk__in=[6], nombres='Eva'))
+        with mock.patch.object(consultas_lentas, 'explicar') as explicar:
+            consultas_lentas.volcar_consultas()
+        explicar.assert_not_called()
+        self.assertEqual(ConsultaLenta.objects.get(pk=consulta.pk).total, 3)
+
+    def test_solo_se_explican_los_select(self):
+        DatosPersonales.objects.filter(pk=self.perfil.pk).update(nombres='Ana')
+        consultas_lentas.volcar_consultas()
+        consulta = ConsultaLenta.objects.get()
+        self.assertTrue(consulta.sql.startswith('UPDATE'))
+        self.assertEqual(consulta.plan, '')
+
+    def test_vista_que_la_origino(self):
+        self.client.get('/perfil/0102030405/')
+        consultas_lentas.volcar_consultas()
+        self.assertIn(
+            'perfiles:perfil_por_cedula',
+            ConsultaLenta.objects.values_list('ultima_vista', flat=True),
+        )
+
+    @override_settings(DB_CONSULTAS_LENTAS_MS=10 ** 6)
+    def test_bajo_el_umbral_no_se_registra(self):
+        list(DatosPersonales.objects.all())
+        self.assertEqual(consultas_lentas.volcar_consultas(), 0)
+        self.assertFalse(ConsultaLenta.objects.exists())
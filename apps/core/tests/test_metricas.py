@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core import metricas
+
+
+class MetricasDirTests(SimpleTestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.carpeta.cleanup)
+
+    @override_settings(METRICAS_DIR='')
+    def test_sin_directorio_no_escribe(self):
+        metricas.incrementar('prueba_total')
+        metricas.volcar()
+        self.assertIsNone(metricas.directorio())
+        self.assertEqual(os.listdir(self.carpeta.name), [])
+
+    def test_con_directorio_vuelca_y_agrega(self):
+        with override_settings(METRICAS_DIR=self.carpeta.name):
+            metricas.incrementar('prueba_total', 2, origen='local')
+            metricas.volcar()
+            self.assertTrue(os.path.exists(os.path.join(self.carpeta.name, f'{os.getpid()}.json')))
+
+            # Archivo de un worker que ya terminó: pasa al histórico
+            with open(os.path.join(self.carpeta.name, '999999999.json'), 'w') as archivo:
+                json.dump({'contadores': [['prueba_total', [['origen', 'otro']], 5]]}, archivo)
+            total = metricas.agregar()
+
+        self.assertEqual(total['contadores'][('prueba_total', (('origen', 'otro'),))], 5)
+        self.assertGreaterEqual(total['contadores'][('prueba_total', (('origen', 'local'),))], 2)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.perfiles.models import VentaGarage
+from apps.perfiles.tests.base import PruebaBase, crear_perfil
+
+
+class PaginaPublicaTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        perfil = crear_perfil()
+        VentaGarage.objects.create(
+            perfil=perfil, nombre_producto='Bicicleta', estado_producto='Bueno',
+            descripcion='Rodado 26', valor_del_bien=80,
+        )
+
+    def consultas_de_sesion(self, consultas):
+        return [c['sql'] for c in consultas if 'django_session' in c['sql']]
+
+    def test_anonimo_sin_sesion(self):
+        for ruta in ('/perfil/0102030405/', '/perfil/0102030405/garage/'):
+            with self.subTest(ruta=ruta):
+                self.client.cookies.clear()
+                with CaptureQueriesContext(connection) as consultas:
+                    response = self.client.get(ruta)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.consultas_de_sesion(consultas), [])
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn(f'max-age={settings.PAGINAS_PUBLICAS_MAX_AGE}', response['Cache-Control'])
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_acierto_de_cache_sin_consultas(self):
+        self.client.get('/perfil/0102030405/')
+        with self.assertNumQueries(1):
+            # Solo la consulta del perfil; la página sale de la caché
+            self.client.get('/perfil/0102030405/')
+
+    def test_con_cookie_de_sesion_no_es_publica(self):
+        sesion = SessionStore()
+        sesion['tema'] = 'oscuro'
+        sesion.create()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = sesion.session_key
+
+        for ruta in ('/perfil/0102030405/', '/perfil/0102030405/garage/'):
+            with self.subTest(ruta=ruta):
+                response = self.client.get(ruta)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('public', response.get('Cache-Control', ''))
+                self.assertNotIn('max-age', response.get('Cache-Control', ''))
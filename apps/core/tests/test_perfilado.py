@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+
+from apps.core.models import Perfilado
+from apps.perfiles.tests.base import PruebaBase, crear_perfil
+
+
+class PerfiladoTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        crear_perfil()
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+
+    def test_perfilar_uno(self):
+        response = self.client.get('/perfil/0102030405/', {'perfilar': '1'})
+        self.assertEqual(response['X-Perfilado'], str(Perfilado.objects.get().pk))
+
+    def test_cabecera(self):
+        response = self.client.get('/perfil/0102030405/', HTTP_X_PERFILAR='1')
+        self.assertTrue(response.has_header('X-Perfilado'))
+
+    def test_valores_falsos_no_perfilan(self):
+        for valor in ('0', 'false', ''):
+            with self.subTest(valor=valor):
+                response = self.client.get('/perfil/0102030405/', {'perfilar': valor})
+                self.assertFalse(response.has_header('X-Perfilado'))
+        response = self.client.get('/perfil/0102030405/', HTTP_X_PERFILAR='0')
+        self.assertFalse(response.has_header('X-Perfilado'))
+        self.assertFalse(Perfilado.objects.exists())
+
+    def test_anonimo_no_perfila(self):
+        self.client.logout()
+        response = self.client.get('/perfil/0102030405/', {'perfilar': '1'})
+        self.assertFalse(response.has_header('X-Perfilado'))
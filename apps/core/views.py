@@ -1,17 +1,71 @@
+import hmac
+import ipaddress
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 from django.views import View
+from apps.perfiles.limites import ip_cliente
 from apps.perfiles.models import DatosPersonales
 
+from . import metricas
+
 
 class HomeView(View):
     """Vista principal del sitio"""
     
-    def get(self, request):
+    async def get(self, request):
         # Obtener el primer perfil activo
-        perfil = DatosPersonales.objects.filter(perfil_activo=True).first()
+        perfil = await DatosPersonales.objects.filter(perfil_activo=True).afirst()
         
         context = {
             'perfil': perfil,
         }
         
         return render(request, 'core/home.html', context)
+
+
+class MetricasView(View):
+    """
+    Métricas de todos los workers en el formato de texto de Prometheus.
+    
+    Acepta `Authorization: Bearer <METRICAS_TOKEN>` o una IP de cliente dentro
+    de `METRICAS_IPS`; sin ninguna de las dos configuradas el endpoint no existe.
+    """
+    
+    def get(self, request):
+        if not self.autorizado(request):
+            raise Http404
+        response = HttpResponse(
+            metricas.exportar(self.medidores()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
+    
+    def autorizado(self, request):
+        if settings.METRICAS_TOKEN:
+            cabecera = request.META.get('HTTP_AUTHORIZATION', '')
+            if hmac.compare_digest(cabecera.encode(), f'Bearer {settings.METRICAS_TOKEN}'.encode()):
+                return True
+        if settings.METRICAS_IPS:
+            try:
+                ip = ipaddress.ip_address(ip_cliente(request))
+            except ValueError:
+                return False
+            return any(
+                ip in ipaddress.ip_network(red.strip(), strict=False)
+                for red in settings.METRICAS_IPS if red.strip()
+            )
+        return False
+    
+    def medidores(self):
+        """Valores que se calculan en cada consulta"""
+        perfiles = DatosPersonales.objects.aggregate(
+            total=Count('pk'), activos=Count('pk', filter=Q(perfil_activo=True))
+        )
+        return {
+            'perfiles_total': ('Perfiles registrados', [({}, perfiles['total'])]),
+            'perfiles_activos': ('Perfiles activos', [({}, perfiles['activos'])]),
+        }
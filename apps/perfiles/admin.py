@@ -1,57 +1,168 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Length
+from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html
 from .models import (
     DatosPersonales, ExperienciaLaboral, Reconocimiento,
-    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage
+    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage, PerfilArchivado
 )
+from .busqueda import indice
+from .signals import SECCION_POR_MODELO, invalidacion_agrupada, perfiles_modificados
 
 
-class ExperienciaLaboralInline(admin.TabularInline):
-    model = ExperienciaLaboral
+class AccionesMasivasMixin:
+    """
+    Acciones masivas que se ejecutan con un solo UPDATE o DELETE.
+    
+    `queryset.update()` no dispara señales, así que la caché de los perfiles
+    afectados se invalida aquí en un único lote. En el borrado, las señales de
+    cada fila se agrupan igualmente en una sola invalidación.
+    """
+    campo_perfil = 'perfil_id'
+    
+    def delete_queryset(self, request, queryset):
+        with invalidacion_agrupada():
+            super().delete_queryset(request, queryset)
+    
+    def actualizar_en_lote(self, request, queryset, mensaje, **valores):
+        with transaction.atomic():
+            perfil_ids = set(queryset.values_list(self.campo_perfil, flat=True).distinct())
+            total = queryset.update(**valores)
+            perfiles_modificados(
+                perfil_ids, SECCION_POR_MODELO.get(self.model),
+                datos_personales=self.model is DatosPersonales,
+                sin_pdf=valores.get('perfil_activo') is False,
+            )
+        self.message_user(request, mensaje.format(total=total), messages.SUCCESS)
+
+
+class VisibilidadMasivaMixin(AccionesMasivasMixin):
+    """Acciones para mostrar u ocultar registros en el sitio público"""
+    actions = ['mostrar_en_front', 'ocultar_en_front']
+    
+    @admin.action(description='Mostrar en el sitio público', permissions=['change'])
+    def mostrar_en_front(self, request, queryset):
+        self.actualizar_en_lote(
+            request, queryset, '{total} registros ahora se muestran en el sitio.',
+            activar_para_que_se_vea_en_front=True
+        )
+    
+    @admin.action(description='Ocultar del sitio público', permissions=['change'])
+    def ocultar_en_front(self, request, queryset):
+        self.actualizar_en_lote(
+            request, queryset, '{total} registros ocultos del sitio.',
+            activar_para_que_se_vea_en_front=False
+        )
+
+
+class PaginadoInlineFormSet(BaseInlineFormSet):
+    """
+    Formset de inline que solo carga una página de registros.
+    
+    La página se lee del parámetro `<prefijo>-pagina` de la URL, que el
+    formulario del admin conserva al guardar. Solo las filas de esa página se
+    muestran, se envían y se vinculan al formulario; de ellas, las que no se
+    modificaron no se validan (`empty_permitted`) ni se guardan
+    (`save_existing_objects` ya salta los formularios sin cambios).
+    """
+    request = None
+    por_pagina = 20
+    
+    @property
+    def parametro_pagina(self):
+        return f'{self.prefix}-pagina'
+    
+    def get_queryset(self):
+        if not hasattr(self, 'pagina'):
+            queryset = super().get_queryset()
+            numero = self.request.GET.get(self.parametro_pagina) if self.request else None
+            self.paginator = Paginator(queryset, self.por_pagina)
+            self.pagina = self.paginator.get_page(numero)
+            self._queryset = self.pagina.object_list
+        return self._queryset
+    
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if i < self.initial_form_count():
+            # Sin cambios, el formulario se da por válido sin revisar sus campos
+            form.empty_permitted = True
+        return form
+    
+    def enlaces_paginas(self):
+        """Números de página con su querystring (None para los puntos suspensivos)"""
+        self.get_queryset()
+        enlaces = []
+        for numero in self.paginator.get_elided_page_range(self.pagina.number):
+            if numero == self.paginator.ELLIPSIS:
+                enlaces.append((numero, None))
+                continue
+            parametros = self.request.GET.copy() if self.request else {}
+            parametros[self.parametro_pagina] = numero
+            enlaces.append((numero, f'?{parametros.urlencode()}'))
+        return enlaces
+
+
+class PaginadoInline(admin.TabularInline):
+    """Inline tabular paginado (ver `PaginadoInlineFormSet`)"""
+    formset = PaginadoInlineFormSet
+    template = 'admin/perfiles/inline_paginado.html'
     extra = 0
+    por_pagina = 20
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        # La fábrica crea una clase nueva en cada llamada
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        formset.por_pagina = self.por_pagina
+        return formset
+
+
+class ExperienciaLaboralInline(PaginadoInline):
+    model = ExperienciaLaboral
     fields = ('cargo_desempenado', 'nombre_empresa', 'fecha_inicio_gestion', 
               'fecha_fin_gestion', 'activar_para_que_se_vea_en_front')
 
 
-class ReconocimientoInline(admin.TabularInline):
+class ReconocimientoInline(PaginadoInline):
     model = Reconocimiento
-    extra = 0
     fields = ('tipo_reconocimiento', 'entidad_patrocinadora', 
               'fecha_reconocimiento', 'activar_para_que_se_vea_en_front')
 
 
-class CursoRealizadoInline(admin.TabularInline):
+class CursoRealizadoInline(PaginadoInline):
     model = CursoRealizado
-    extra = 0
     fields = ('nombre_curso', 'entidad_patrocinadora', 'fecha_inicio', 
               'fecha_fin', 'total_horas', 'activar_para_que_se_vea_en_front')
 
 
-class ProductoAcademicoInline(admin.TabularInline):
+class ProductoAcademicoInline(PaginadoInline):
     model = ProductoAcademico
-    extra = 0
     fields = ('nombre_recurso', 'clasificador', 'activar_para_que_se_vea_en_front')
 
 
-class ProductoLaboralInline(admin.TabularInline):
+class ProductoLaboralInline(PaginadoInline):
     model = ProductoLaboral
-    extra = 0
     fields = ('nombre_producto', 'fecha_producto', 'activar_para_que_se_vea_en_front')
 
 
-class VentaGarageInline(admin.TabularInline):
+class VentaGarageInline(PaginadoInline):
     model = VentaGarage
-    extra = 0
     fields = ('nombre_producto', 'estado_producto', 'valor_del_bien', 
               'activar_para_que_se_vea_en_front')
 
 
 @admin.register(DatosPersonales)
-class DatosPersonalesAdmin(admin.ModelAdmin):
+class DatosPersonalesAdmin(AccionesMasivasMixin, admin.ModelAdmin):
     list_display = ('nombre_completo', 'numero_cedula', 'edad_display', 
-                    'perfil_activo', 'ver_foto')
+                    'perfil_activo', 'visitas_perfil', 'visitas_garage',
+                    'descargas_pdf', 'ver_foto')
     list_filter = ('perfil_activo', 'sexo', 'estado_civil', 'nacionalidad')
     search_fields = ('nombres', 'apellidos', 'numero_cedula')
+    actions = ['activar_perfiles', 'desactivar_perfiles']
+    campo_perfil = 'pk'
     
     fieldsets = (
         ('Información del Perfil', {
@@ -80,10 +191,56 @@ class DatosPersonalesAdmin(admin.ModelAdmin):
         VentaGarageInline,
     ]
     
+    def get_queryset(self, request):
+        # Totales de visitas en la misma consulta del listado
+        return super().get_queryset(request).annotate(
+            total_visitas_perfil=Sum('visitas__total', filter=Q(visitas__tipo='perfil')),
+            total_visitas_garage=Sum('visitas__total', filter=Q(visitas__tipo='garage')),
+            total_descargas_pdf=Sum('visitas__total', filter=Q(visitas__tipo='pdf')),
+        )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # La búsqueda por subcadena de siempre, más los perfiles cuyo nombre,
+        # apellido o cédula empiezan con lo escrito sin importar las tildes
+        # (índice en memoria; si coinciden demasiados no aporta nada)
+        resultados, duplicados = super().get_search_results(request, queryset, search_term)
+        if search_term.strip():
+            ids = indice.ids(search_term, self.list_per_page * 10)
+            if ids:
+                resultados |= queryset.filter(pk__in=ids)
+        return resultados, duplicados
+    
+    @admin.action(description='Activar perfiles seleccionados', permissions=['change'])
+    def activar_perfiles(self, request, queryset):
+        self.actualizar_en_lote(
+            request, queryset, '{total} perfiles activados.', perfil_activo=True
+        )
+    
+    @admin.action(description='Desactivar perfiles seleccionados', permissions=['change'])
+    def desactivar_perfiles(self, request, queryset):
+        self.actualizar_en_lote(
+            request, queryset, '{total} perfiles desactivados.', perfil_activo=False
+        )
+    
     def nombre_completo(self, obj):
         return f"{obj.nombres} {obj.apellidos}"
     nombre_completo.short_description = 'Nombre Completo'
     
+    def visitas_perfil(self, obj):
+        return obj.total_visitas_perfil or 0
+    visitas_perfil.short_description = 'Visitas'
+    visitas_perfil.admin_order_field = 'total_visitas_perfil'
+    
+    def visitas_garage(self, obj):
+        return obj.total_visitas_garage or 0
+    visitas_garage.short_description = 'Visitas garage'
+    visitas_garage.admin_order_field = 'total_visitas_garage'
+    
+    def descargas_pdf(self, obj):
+        return obj.total_descargas_pdf or 0
+    descargas_pdf.short_description = 'Descargas PDF'
+    descargas_pdf.admin_order_field = 'total_descargas_pdf'
+    
     def edad_display(self, obj):
         return f"{obj.get_edad()} años"
     edad_display.short_description = 'Edad'
@@ -99,7 +256,7 @@ class DatosPersonalesAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExperienciaLaboral)
-class ExperienciaLaboralAdmin(admin.ModelAdmin):
+class ExperienciaLaboralAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('cargo_desempenado', 'nombre_empresa', 'perfil',
                     'fecha_inicio_gestion', 'fecha_fin_gestion', 
                     'activar_para_que_se_vea_en_front')
@@ -130,7 +287,7 @@ class ExperienciaLaboralAdmin(admin.ModelAdmin):
 
 
 @admin.register(Reconocimiento)
-class ReconocimientoAdmin(admin.ModelAdmin):
+class ReconocimientoAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('tipo_reconocimiento', 'entidad_patrocinadora', 
                     'perfil', 'fecha_reconocimiento',
                     'activar_para_que_se_vea_en_front')
@@ -155,7 +312,7 @@ class ReconocimientoAdmin(admin.ModelAdmin):
 
 
 @admin.register(CursoRealizado)
-class CursoRealizadoAdmin(admin.ModelAdmin):
+class CursoRealizadoAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('nombre_curso', 'entidad_patrocinadora', 'perfil',
                     'fecha_inicio', 'fecha_fin', 'total_horas',
                     'activar_para_que_se_vea_en_front')
@@ -182,7 +339,7 @@ class CursoRealizadoAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductoAcademico)
-class ProductoAcademicoAdmin(admin.ModelAdmin):
+class ProductoAcademicoAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('nombre_recurso', 'clasificador', 'perfil',
                     'ver_imagen', 'activar_para_que_se_vea_en_front')
     list_filter = ('clasificador', 'activar_para_que_se_vea_en_front')
@@ -210,7 +367,7 @@ class ProductoAcademicoAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductoLaboral)
-class ProductoLaboralAdmin(admin.ModelAdmin):
+class ProductoLaboralAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('nombre_producto', 'perfil', 'fecha_producto',
                     'activar_para_que_se_vea_en_front')
     list_filter = ('activar_para_que_se_vea_en_front', 'perfil')
@@ -230,7 +387,7 @@ class ProductoLaboralAdmin(admin.ModelAdmin):
 
 
 @admin.register(VentaGarage)
-class VentaGarageAdmin(admin.ModelAdmin):
+class VentaGarageAdmin(VisibilidadMasivaMixin, admin.ModelAdmin):
     list_display = ('nombre_producto', 'perfil', 'estado_producto',
                     'valor_del_bien_display', 'fecha_publicacion',
                     'ver_imagen', 'activar_para_que_se_vea_en_front')
@@ -261,3 +418,43 @@ class VentaGarageAdmin(admin.ModelAdmin):
             )
         return "Sin imagen"
     ver_imagen.short_description = 'Imagen'
+
+
+@admin.register(PerfilArchivado)
+class PerfilArchivadoAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'numero_cedula', 'registros', 'tamano_display', 'fecha_archivado')
+    search_fields = ('nombre', 'numero_cedula')
+    readonly_fields = ('perfil_id_original', 'nombre', 'numero_cedula', 'registros',
+                       'tamano_json', 'archivos', 'fecha_archivado')
+    exclude = ('datos',)
+    actions = ['restaurar_perfiles']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('datos').annotate(tamano_gzip=Length('datos'))
+    
+    @admin.action(description='Restaurar perfiles seleccionados', permissions=['delete'])
+    def restaurar_perfiles(self, request, queryset):
+        from .archivado import restaurar
+        
+        restaurados = 0
+        for archivado in queryset.model.objects.filter(pk__in=queryset.values('pk')):
+            try:
+                restaurar(archivado)
+            except IntegrityError as exc:
+                self.message_user(
+                    request, f'No se pudo restaurar {archivado}: {exc}', messages.ERROR
+                )
+            else:
+                restaurados += 1
+        self.message_user(request, f'{restaurados} perfiles restaurados.', messages.SUCCESS)
+    
+    def tamano_display(self, obj):
+        return f"{obj.tamano_gzip / 1024:.1f} KiB"
+    tamano_display.short_description = 'Tamaño comprimido'
+    tamano_display.admin_order_field = 'tamano_gzip'
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class PerfilesConfig(AppConfig):
+    """Configuración de la app de perfiles"""
+    
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.perfiles'
+    verbose_name = 'Perfiles'
+    
+    def ready(self):
+        # Registrar las señales de invalidación de caché
+        from . import signals  # noqa: F401
@@ -0,0 +1,162 @@
+"""
+Archivado de perfiles inactivos.
+
+Los perfiles con `perfil_activo=False` se sacan de las tablas que consultan
+las páginas públicas: el perfil y todas las filas que apuntan a él
+(experiencias, cursos, reconocimientos, productos, venta garage y visitas)
+se serializan a JSON, se comprimen con gzip y se guardan en una sola fila de
+`PerfilArchivado`. Restaurar vuelve a insertar las filas con sus ids
+originales.
+
+Los registros archivados siguen apuntando a sus archivos por contenido, así
+que el archivo conserva esas referencias (`PerfilArchivado.archivos`) para
+que `limpiar_archivos_huerfanos` no los borre.
+"""
+import datetime
+import gzip
+from collections import defaultdict
+
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .models import DatosPersonales, PerfilArchivado
+from .signals import invalidacion_agrupada
+from .storage import ajustar_referencias, campos_deduplicados
+
+
+class EncoderArchivo(DjangoJSONEncoder):
+    """Como el de Django, sin recortar las fechas a milisegundos"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def relaciones_perfil():
+    """(modelo, campo) de cada modelo con una clave foránea al perfil"""
+    return [
+        (relacion.related_model, relacion.field.name)
+        for relacion in DatosPersonales._meta.related_objects
+        if relacion.one_to_many
+    ]
+
+
+def archivos_de(objetos):
+    """Nombres de los archivos por contenido de los objetos (con repeticiones)"""
+    nombres = []
+    for objeto in objetos:
+        for campo in campos_deduplicados(type(objeto)):
+            nombre = getattr(objeto, campo).name
+            if nombre:
+                nombres.append(nombre)
+    return nombres
+
+
+@transaction.atomic
+def archivar_lote(perfiles):
+    """
+    Archiva los perfiles inactivos del queryset `perfiles` y los elimina de
+    las tablas. Devuelve los `PerfilArchivado` creados.
+    """
+    # La condición se vuelve a evaluar con las filas bloqueadas: un perfil
+    # reactivado después de elegir el lote no se archiva
+    perfiles = list(perfiles.filter(perfil_activo=False).select_for_update())
+    if not perfiles:
+        return []
+    ids = [perfil.pk for perfil in perfiles]
+
+    relacionados = defaultdict(list)
+    for modelo, campo in relaciones_perfil():
+        for objeto in modelo._default_manager.filter(**{f'{campo}__in': ids}).order_by('pk'):
+            relacionados[getattr(objeto, f'{campo}_id')].append(objeto)
+
+    archivados = []
+    for perfil in perfiles:
+        objetos = [perfil] + relacionados[perfil.pk]
+        contenido = serializers.serialize('json', objetos, cls=EncoderArchivo).encode()
+        archivados.append(PerfilArchivado(
+            perfil_id_original=perfil.pk,
+            numero_cedula=perfil.numero_cedula,
+            nombre=f'{perfil.nombres} {perfil.apellidos}',
+            registros=len(objetos),
+            tamano_json=len(contenido),
+            archivos=archivos_de(objetos),
+            datos=gzip.compress(contenido, mtime=0),
+        ))
+    PerfilArchivado.objects.bulk_create(archivados)
+
+    # El borrado descuenta las referencias de cada registro; el archivo
+    # las vuelve a sumar porque sigue apuntando a esos archivos
+    ajustar_referencias([n for archivado in archivados for n in archivado.archivos], 1)
+    with invalidacion_agrupada():
+        DatosPersonales.objects.filter(pk__in=ids).delete()
+    return archivados
+
+
+def archivar_inactivos(lote=100, perfiles=None):
+    """Archiva en lotes los perfiles inactivos; devuelve cuántos se archivaron"""
+    if perfiles is None:
+        perfiles = DatosPersonales.objects.all()
+    perfiles = perfiles.filter(perfil_activo=False)
+    total = 0
+    while True:
+        ids = list(perfiles.order_by('pk').values_list('pk', flat=True)[:lote])
+        if not ids:
+            return total
+        total += len(archivar_lote(perfiles.filter(pk__in=ids)))
+
+
+@transaction.atomic
+def restaurar(archivado):
+    """Vuelve a insertar el perfil archivado y sus registros con sus ids originales"""
+    contenido = gzip.decompress(bytes(archivado.datos))
+    with invalidacion_agrupada():
+        # Primero el perfil: el resto de las filas apunta a él
+        for objeto in serializers.deserialize('json', contenido):
+            objeto.save()
+    # Al guardarse, los registros suman otra vez sus referencias
+    ajustar_referencias(archivado.archivos, -1)
+    archivado.delete()
+
+
+def tamanos_tablas(modelos):
+    """
+    {tabla: (filas, bytes de datos, bytes de índices)} de los modelos. Los
+    tamaños son None si el motor no los expone (solo SQLite y PostgreSQL).
+    """
+    tablas = [modelo._meta.db_table for modelo in modelos]
+    resultado = {}
+    with connection.cursor() as cursor:
+        qn = connection.ops.quote_name
+        filas = {}
+        for tabla in tablas:
+            cursor.execute(f'SELECT COUNT(*) FROM {qn(tabla)}')
+            filas[tabla] = cursor.fetchone()[0]
+
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT m.tbl_name, m.type, SUM(s.pgsize) FROM dbstat s '
+                    'JOIN sqlite_master m ON m.name = s.name GROUP BY m.tbl_name, m.type'
+                )
+            except Exception:
+                # SQLite compilado sin la tabla virtual dbstat
+                return {tabla: (filas[tabla], None, None) for tabla in tablas}
+            paginas = {(tabla, tipo): total for tabla, tipo, total in cursor.fetchall()}
+            for tabla in tablas:
+                resultado[tabla] = (
+                    filas[tabla],
+                    paginas.get((tabla, 'table'), 0),
+                    paginas.get((tabla, 'index'), 0),
+                )
+        elif connection.vendor == 'postgresql':
+            for tabla in tablas:
+                cursor.execute(
+                    'SELECT pg_relation_size(%s), pg_indexes_size(%s)', [tabla, tabla]
+                )
+                resultado[tabla] = (filas[tabla],) + cursor.fetchone()
+        else:
+            resultado = {tabla: (filas[tabla], None, None) for tabla in tablas}
+    return resultado
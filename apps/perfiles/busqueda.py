@@ -0,0 +1,234 @@
+"""
+Índice en memoria para buscar perfiles mientras se escribe.
+
+Cada palabra de `nombres` y `apellidos` y el `numero_cedula` se normalizan
+(minúsculas, sin tildes ni signos) y se guardan en una lista ordenada de
+pares (palabra, id). Una búsqueda es un `bisect` por cada palabra escrita
+sobre esa lista: el prefijo más selectivo da los candidatos y el resto se
+comprueba contra las palabras del perfil.
+
+- El índice se construye en la primera búsqueda del proceso (una sola vez
+  aunque lleguen varias búsquedas a la vez).
+- En la búsqueda pública (`cedula_completa`) las palabras de solo dígitos
+  tienen que coincidir enteras: un prefijo de cédula permitiría listarlas.
+- Las señales de los perfiles (`aplicar_cambios`) actualizan solo los perfiles
+  modificados, al confirmar la transacción.
+- Los demás workers se enteran por un contador en la caché
+  (`busqueda:version`), que revisan como mucho cada `BUSQUEDA_REVISION`
+  segundos; si cambió, reconstruyen el índice en un hilo y mientras tanto
+  siguen respondiendo con el anterior.
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = 'busqueda:version'
+RE_SEPARADORES = re.compile(r'[\W_]+')
+# Tildes, diéresis y virgulilla que NFKD separa de su letra
+RE_DIACRITICOS = re.compile('[\u0300-\u036f]')
+CAMPOS = ('pk', 'nombres', 'apellidos', 'numero_cedula', 'descripcion_perfil', 'perfil_activo')
+
+
+def normalizar(texto):
+    """Minúsculas sin tildes, con todo lo que no es letra o número como espacio"""
+    texto = texto or ''
+    if not texto.isascii():
+        texto = RE_DIACRITICOS.sub('', unicodedata.normalize('NFKD', texto))
+    return RE_SEPARADORES.sub(' ', texto.casefold())
+
+
+@dataclass(frozen=True, slots=True)
+class Resultado:
+    pk: int
+    nombre: str
+    numero_cedula: str
+    descripcion: str
+    activo: bool
+    palabras: tuple
+
+
+def resultado_desde_fila(pk, nombres, apellidos, cedula, descripcion, activo):
+    nombre = f'{nombres} {apellidos}'
+    palabras = tuple(dict.fromkeys(normalizar(f'{nombre} {cedula}').split()))
+    return Resultado(pk, nombre, cedula, descripcion, activo, palabras)
+
+
+def leer_version():
+    try:
+        return cache.get(CLAVE_VERSION, 0)
+    except Exception:
+        logger.warning('Caché no disponible para la versión del índice de búsqueda')
+        return None
+
+
+class IndicePerfiles:
+    """Lista ordenada de (palabra, id) y los datos de cada perfil"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_construccion = threading.Lock()
+        self._entradas = []
+        self._perfiles = {}
+        self.construido = False
+        self.version = None
+        self._revisado = 0.0
+        self._reconstruyendo = False
+
+    # Construcción
+
+    def construir(self, filas=None):
+        """Reemplaza el índice por uno nuevo (desde la base de datos si no hay `filas`)"""
+        version = leer_version()
+        if filas is None:
+            from .models import DatosPersonales
+            filas = DatosPersonales.objects.values_list(*CAMPOS).iterator(chunk_size=2000)
+        perfiles = {}
+        entradas = []
+        for fila in filas:
+            resultado = resultado_desde_fila(*fila)
+            perfiles[resultado.pk] = resultado
+            entradas += [(palabra, resultado.pk) for palabra in resultado.palabras]
+        entradas.sort()
+        with self._lock:
+            self._entradas, self._perfiles = entradas, perfiles
+            self.version = version
+            self.construido = True
+
+    def reconstruir_en_segundo_plano(self):
+        with self._lock:
+            if self._reconstruyendo:
+                return
+            self._reconstruyendo = True
+
+        def reconstruir():
+            from django.db import close_old_connections
+
+            try:
+                self.construir()
+            except Exception:
+                logger.exception('No se pudo reconstruir el índice de búsqueda')
+            finally:
+                close_old_connections()
+                self._reconstruyendo = False
+
+        threading.Thread(target=reconstruir, name='busqueda-reconstruccion', daemon=True).start()
+
+    def revisar(self):
+        """Construye el índice la primera vez o lo renueva si otro worker lo cambió"""
+        if not self.construido:
+            # Las búsquedas que llegan durante la primera construcción la esperan
+            with self._lock_construccion:
+                if not self.construido:
+                    self.construir()
+                    self._revisado = time.monotonic()
+            return
+        if time.monotonic() - self._revisado < settings.BUSQUEDA_REVISION:
+            return
+        self._revisado = time.monotonic()
+        version = leer_version()
+        if version is not None and version != self.version:
+            self.reconstruir_en_segundo_plano()
+
+    # Cambios incrementales
+
+    def quitar(self, pk):
+        anterior = self._perfiles.pop(pk, None)
+        if anterior is None:
+            return
+        for palabra in anterior.palabras:
+            posicion = bisect_left(self._entradas, (palabra, pk))
+            if posicion < len(self._entradas) and self._entradas[posicion] == (palabra, pk):
+                del self._entradas[posicion]
+
+    def poner(self, resultado):
+        self.quitar(resultado.pk)
+        self._perfiles[resultado.pk] = resultado
+        for palabra in resultado.palabras:
+            insort(self._entradas, (palabra, resultado.pk))
+
+    def actualizar(self, perfil_ids):
+        """Vuelve a leer los perfiles indicados (los que ya no existen se quitan)"""
+        from .models import DatosPersonales
+
+        perfil_ids = set(perfil_ids)
+        filas = DatosPersonales.objects.filter(pk__in=perfil_ids).values_list(*CAMPOS)
+        nuevos = {fila[0]: resultado_desde_fila(*fila) for fila in filas}
+        version = self.publicar_cambio()
+        with self._lock:
+            if not self.construido:
+                return
+            for pk in perfil_ids:
+                if pk in nuevos:
+                    self.poner(nuevos[pk])
+                else:
+                    self.quitar(pk)
+            # Si nadie más cambió el contador, el índice sigue al día
+            if version is not None and self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def publicar_cambio(self):
+        """Incrementa el contador compartido para que los otros workers se renueven"""
+        try:
+            cache.add(CLAVE_VERSION, 0, None)
+            return cache.incr(CLAVE_VERSION)
+        except Exception:
+            logger.warning('No se pudo publicar el cambio del índice de búsqueda')
+            return None
+
+    # Consultas
+
+    def buscar(self, texto, limite=10, incluir_inactivos=False, cedula_completa=False):
+        """
+        Perfiles cuyas palabras empiezan con cada una de las palabras de
+        `texto`. Con `cedula_completa`, las palabras de solo dígitos tienen
+        que coincidir enteras.
+        """
+        self.revisar()
+        palabras = normalizar(texto).split()
+        if not palabras:
+            return []
+        with self._lock:
+            entradas = self._entradas
+            rangos = []
+            for palabra in palabras:
+                exacta = cedula_completa and palabra.isdigit()
+                inicio = bisect_left(entradas, (palabra,))
+                fin = bisect_left(entradas, (palabra + ('\0' if exacta else '\U0010ffff'),), inicio)
+                rangos.append((fin - inicio, inicio, fin, palabra, exacta))
+            _, inicio, fin, elegida, _ = min(rangos)
+            restantes = [(palabra, exacta) for *_, palabra, exacta in rangos if palabra != elegida]
+
+            resultados, vistos = [], set()
+            for posicion in range(inicio, fin):
+                pk = entradas[posicion][1]
+                if pk in vistos:
+                    continue
+                vistos.add(pk)
+                perfil = self._perfiles[pk]
+                if not (perfil.activo or incluir_inactivos):
+                    continue
+                if all(
+                    (r in perfil.palabras) if exacta else any(p.startswith(r) for p in perfil.palabras)
+                    for r, exacta in restantes
+                ):
+                    resultados.append(perfil)
+                    if len(resultados) >= limite:
+                        break
+            return resultados
+
+    def ids(self, texto, maximo):
+        """Ids que coinciden con `texto`, activos o no; vacío si son más de `maximo`"""
+        perfiles = self.buscar(texto, maximo + 1, incluir_inactivos=True)
+        return [perfil.pk for perfil in perfiles] if len(perfiles) <= maximo else []
+
+
+indice = IndicePerfiles()
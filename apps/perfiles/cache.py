@@ -0,0 +1,186 @@
+"""
+Caché de las páginas públicas de los perfiles.
+
+Cada perfil tiene un número de versión guardado en la caché. Las claves de
+las páginas renderizadas incluyen esa versión, de modo que al modificar el
+perfil o cualquiera de sus registros basta con incrementar la versión para
+que las entradas anteriores dejen de usarse y expiren solas.
+
+Además, cada sección del CV (experiencias, cursos, etc.) tiene su propia
+versión, usada por los fragmentos `{% cache %}` de las plantillas: editar un
+curso solo obliga a volver a renderizar el bloque de cursos.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from .coalescencia import obtener_o_generar
+
+
+def clave_version_perfil(perfil_id):
+    return f'perfil:{perfil_id}:version'
+
+
+def obtener_version_perfil(perfil_id):
+    """Devuelve la versión actual del perfil, creándola si no existe"""
+    clave = clave_version_perfil(perfil_id)
+    version = cache.get(clave)
+    if version is None:
+        # Se parte de una marca de tiempo para que, si la caché pierde la
+        # clave, la nueva versión no coincida con entradas antiguas
+        cache.add(clave, int(time.time() * 1000), None)
+        version = cache.get(clave, 1)
+    return version
+
+
+def incrementar_version(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(clave, version, None)
+        return version
+
+
+def invalidar_perfil(perfil_id):
+    """Incrementa la versión del perfil para descartar lo cacheado"""
+    return incrementar_version(clave_version_perfil(perfil_id))
+
+
+SECCIONES = (
+    'experiencias',
+    'cursos',
+    'reconocimientos',
+    'productos_academicos',
+    'productos_laborales',
+)
+
+
+def clave_version_seccion(perfil_id, seccion):
+    return f'perfil:{perfil_id}:seccion:{seccion}:version'
+
+
+def invalidar_seccion(perfil_id, seccion):
+    """Incrementa la versión de una sección del CV del perfil"""
+    return incrementar_version(clave_version_seccion(perfil_id, seccion))
+
+
+def invalidar_en_lote(cambios):
+    """
+    Invalida de una vez varios perfiles y secciones.
+    
+    `cambios` son pares (perfil_id, seccion o None). Las versiones se leen y
+    escriben con `get_many`/`set_many`: cada una pasa al mayor entre su valor
+    más uno y la hora actual en milisegundos.
+    """
+    claves = set()
+    for perfil_id, seccion in cambios:
+        claves.add(clave_version_perfil(perfil_id))
+        if seccion:
+            claves.add(clave_version_seccion(perfil_id, seccion))
+        else:
+            # Los cambios sin sección (datos personales o venta garage)
+            # también pueden cambiar el mercado
+            claves.add(CLAVE_VERSION_MERCADO)
+    if not claves:
+        return
+    actuales = cache.get_many(claves)
+    ahora = int(time.time() * 1000)
+    cache.set_many(
+        {clave: max(ahora, actuales.get(clave, 0) + 1) for clave in claves}, None
+    )
+
+
+def clave_fragmento(perfil_id, seccion, version):
+    """Clave que genera `{% cache ... cv_seccion seccion perfil.pk version %}`"""
+    return make_template_fragment_key('cv_seccion', [seccion, perfil_id, version])
+
+
+async def aobtener_versiones_secciones(perfil_id):
+    """Versiones actuales de todas las secciones del perfil, en una sola lectura"""
+    claves = {seccion: clave_version_seccion(perfil_id, seccion) for seccion in SECCIONES}
+    encontradas = await cache.aget_many(claves.values())
+    faltantes = {
+        clave: int(time.time() * 1000)
+        for clave in claves.values() if clave not in encontradas
+    }
+    if faltantes:
+        for clave, version in faltantes.items():
+            await cache.aadd(clave, version, None)
+        encontradas.update(await cache.aget_many(faltantes))
+    return {seccion: encontradas.get(clave, 1) for seccion, clave in claves.items()}
+
+
+CLAVE_VERSION_MERCADO = 'mercado:version'
+
+
+async def aobtener_version_mercado():
+    """Versión del mercado de la venta garage, creándola si no existe"""
+    version = await cache.aget(CLAVE_VERSION_MERCADO)
+    if version is None:
+        await cache.aadd(CLAVE_VERSION_MERCADO, int(time.time() * 1000), None)
+        version = await cache.aget(CLAVE_VERSION_MERCADO, 1)
+    return version
+
+
+def clave_pagina(nombre, perfil_id, version):
+    """Clave de la página `nombre` del perfil en la versión dada"""
+    return f'pagina:{nombre}:{perfil_id}:{version}'
+
+
+def clave_pdf(perfil_id, version):
+    """Clave del PDF del perfil generado con el motor configurado"""
+    return f'pdf:{settings.PDF_MOTOR}:{perfil_id}:{version}'
+
+
+async def aobtener_version_perfil(perfil_id):
+    """Versión asíncrona de `obtener_version_perfil`"""
+    clave = clave_version_perfil(perfil_id)
+    version = await cache.aget(clave)
+    if version is None:
+        await cache.aadd(clave, int(time.time() * 1000), None)
+        version = await cache.aget(clave, 1)
+    return version
+
+
+async def arender(request, template_name, context):
+    """
+    Renderiza en el hilo síncrono: el contexto puede traer querysets sin
+    evaluar (p. ej. de secciones cuyo fragmento ya está en caché) y solo se
+    consultan si la plantilla realmente los usa.
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def render_cacheado(request, nombre, perfil, template_name, construir_contexto):
+    """
+    Renderiza la plantilla usando la caché de páginas públicas.
+    
+    `construir_contexto` es una corrutina que solo se espera cuando no hay
+    una copia cacheada, así que las consultas de los registros relacionados
+    se evitan en cada acierto, y las peticiones simultáneas de una página que
+    no está en caché esperan a un único render. Las respuestas llevan el atributo `clave_cache`
+    para que el middleware de compresión pueda guardar también sus variantes
+    comprimidas.
+    """
+    # request.user carga la sesión de forma perezosa y síncrona
+    autenticado = await sync_to_async(lambda: request.user.is_authenticated)()
+    if not settings.CACHE_PAGINAS_SEGUNDOS or autenticado:
+        return await arender(request, template_name, await construir_contexto())
+    
+    version = await aobtener_version_perfil(perfil.pk)
+    clave = clave_pagina(nombre, perfil.pk, version)
+    
+    async def generar():
+        response = await arender(request, template_name, await construir_contexto())
+        return response.content
+    
+    contenido = await obtener_o_generar(clave, generar, settings.CACHE_PAGINAS_SEGUNDOS)
+    response = HttpResponse(contenido)
+    response.clave_cache = clave
+    return response
@@ -0,0 +1,126 @@
+"""
+Agrupación de renders concurrentes de la misma clave ("single flight").
+
+Cuando llegan muchas peticiones a la vez por un PDF o una página que no está
+en caché, solo la primera la genera; las demás esperan y reciben el mismo
+resultado.
+
+- Dentro del proceso, las peticiones simultáneas comparten un
+  `concurrent.futures.Future`, que funciona entre hilos y bucles de eventos
+  distintos (WSGI con `async_to_sync` o ASGI).
+- Entre workers, quien genera toma un candado en la caché con `cache.add` y
+  tiempo de expiración. Los demás workers consultan la caché hasta que aparece
+  el resultado; si el candado se libera sin resultado o se agota
+  `COALESCENCIA_ESPERA`, generan ellos mismos.
+- Si el que genera se cancela (el cliente se desconectó), los que esperan no
+  heredan la cancelación: vuelven a intentarlo y uno de ellos genera.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core import metricas
+
+INTERVALO_CONSULTA = 0.1
+
+# Resultado que reciben los que esperan cuando el que generaba se canceló
+REINTENTAR = object()
+
+_lock = threading.Lock()
+_en_curso = {}
+
+
+def clave_candado(clave):
+    return f'{clave}:generando'
+
+
+async def obtener_o_generar(clave, generar, timeout):
+    """
+    Devuelve el valor cacheado en `clave`; si falta, espera la corrutina
+    `generar()` una sola vez entre todas las peticiones concurrentes y guarda
+    el resultado con el `timeout` dado.
+    """
+    tipo = clave.split(':', 1)[0]
+    valor = await cache.aget(clave)
+    if valor is not None:
+        metricas.incrementar('cache_consultas_total', tipo=tipo, resultado='acierto')
+        return valor
+    metricas.incrementar('cache_consultas_total', tipo=tipo, resultado='fallo')
+
+    with _lock:
+        futuro = _en_curso.get(clave)
+        lider = futuro is None
+        if lider:
+            futuro = Future()
+            _en_curso[clave] = futuro
+
+    if not lider:
+        metricas.incrementar('coalescencia_total', resultado='espera')
+        try:
+            valor = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(futuro)), settings.COALESCENCIA_ESPERA
+            )
+        except asyncio.TimeoutError:
+            return await generar_y_guardar(clave, generar, timeout)
+        if valor is REINTENTAR:
+            return await obtener_o_generar(clave, generar, timeout)
+        return valor
+
+    try:
+        valor = await generar_entre_workers(clave, generar, timeout)
+    except Exception as exc:
+        terminar(clave, futuro, excepcion=exc)
+        raise
+    except BaseException:
+        # Cancelación: solo afecta a esta petición
+        terminar(clave, futuro, REINTENTAR)
+        raise
+    terminar(clave, futuro, valor)
+    return valor
+
+
+def terminar(clave, futuro, valor=None, excepcion=None):
+    """Retira el render en curso y entrega su resultado a los que esperan"""
+    # Primero se retira, para que un reintento no vuelva a esperar este futuro
+    with _lock:
+        _en_curso.pop(clave, None)
+    if excepcion is not None:
+        futuro.set_exception(excepcion)
+    else:
+        futuro.set_result(valor)
+
+
+async def generar_entre_workers(clave, generar, timeout):
+    """Genera con el candado de la caché o espera al worker que lo tiene"""
+    candado = clave_candado(clave)
+    token = uuid.uuid4().hex
+
+    if await cache.aadd(candado, token, settings.COALESCENCIA_ESPERA):
+        try:
+            return await generar_y_guardar(clave, generar, timeout)
+        finally:
+            if await cache.aget(candado) == token:
+                await cache.adelete(candado)
+
+    metricas.incrementar('coalescencia_total', resultado='otro_worker')
+    limite = time.monotonic() + settings.COALESCENCIA_ESPERA
+    while time.monotonic() < limite:
+        await asyncio.sleep(INTERVALO_CONSULTA)
+        valor = await cache.aget(clave)
+        if valor is not None:
+            return valor
+        if await cache.aget(candado) is None:
+            break
+    return await generar_y_guardar(clave, generar, timeout)
+
+
+async def generar_y_guardar(clave, generar, timeout):
+    metricas.incrementar('coalescencia_total', resultado='genera')
+    valor = await generar()
+    await cache.aset(clave, valor, timeout)
+    return valor
@@ -0,0 +1,113 @@
+"""
+Contadores de visitas y descargas con escritura diferida.
+
+Las vistas solo incrementan un contador en memoria del proceso; un hilo en
+segundo plano vuelca cada `VISITAS_INTERVALO` segundos todo lo acumulado a
+`VisitaDiaria` con un INSERT ... ON CONFLICT DO UPDATE masivo (soportado por
+SQLite y PostgreSQL). Así ninguna petición escribe en la base de datos.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_buffer = Counter()
+_hilo = None
+_pid = None
+
+
+def registrar_visita(perfil_id, tipo):
+    """Suma una visita del `tipo` indicado al perfil (sin tocar la base de datos)"""
+    if not settings.VISITAS_ACTIVAS:
+        return
+    clave = (perfil_id, timezone.localdate(), tipo)
+    with _lock:
+        _buffer[clave] += 1
+    iniciar_hilo()
+
+
+def iniciar_hilo():
+    """Arranca el hilo de volcado en este proceso si aún no existe"""
+    global _hilo, _pid
+    # Tras un fork (gunicorn) el hilo del proceso padre no existe en el hijo
+    if _hilo is not None and _pid == os.getpid():
+        return
+    with _lock:
+        if _hilo is not None and _pid == os.getpid():
+            return
+        _pid = os.getpid()
+        _hilo = threading.Thread(target=bucle_volcado, name='volcado-visitas', daemon=True)
+        _hilo.start()
+
+
+def bucle_volcado():
+    while True:
+        time.sleep(settings.VISITAS_INTERVALO)
+        vaciar_visitas()
+
+
+def vaciar_visitas():
+    """Escribe lo acumulado en la tabla diaria y devuelve las filas afectadas"""
+    from .models import DatosPersonales, VisitaDiaria
+
+    with _lock:
+        if not _buffer:
+            return 0
+        pendientes = dict(_buffer)
+        _buffer.clear()
+
+    close_old_connections()
+    try:
+        # Se descartan las visitas de perfiles que ya fueron eliminados
+        existentes = set(DatosPersonales.objects.filter(
+            pk__in={perfil_id for perfil_id, _, _ in pendientes}
+        ).values_list('pk', flat=True))
+        filas = [
+            (perfil_id, fecha, tipo, total)
+            for (perfil_id, fecha, tipo), total in pendientes.items()
+            if perfil_id in existentes
+        ]
+        if filas:
+            upsert_visitas(VisitaDiaria, filas)
+        return len(filas)
+    except Exception:
+        # Se devuelven los conteos al buffer para el siguiente intento
+        logger.exception('No se pudieron guardar las visitas')
+        with _lock:
+            _buffer.update(pendientes)
+        return 0
+    finally:
+        close_old_connections()
+
+
+def upsert_visitas(modelo, filas, lote=200):
+    """Inserta o suma los totales de `filas` con un INSERT por cada lote"""
+    qn = connection.ops.quote_name
+    tabla = qn(modelo._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for inicio in range(0, len(filas), lote):
+            grupo = filas[inicio:inicio + lote]
+            valores = ', '.join(['(%s, %s, %s, %s)'] * len(grupo))
+            sql = (
+                f'INSERT INTO {tabla} ({qn("perfil_id")}, {qn("fecha")}, {qn("tipo")}, {qn("total")}) '
+                f'VALUES {valores} '
+                f'ON CONFLICT ({qn("perfil_id")}, {qn("fecha")}, {qn("tipo")}) '
+                f'DO UPDATE SET {qn("total")} = {tabla}.{qn("total")} + EXCLUDED.{qn("total")}'
+            )
+            parametros = []
+            for perfil_id, fecha, tipo, total in grupo:
+                parametros += [perfil_id, connection.ops.adapt_datefield_value(fecha), tipo, total]
+            cursor.execute(sql, parametros)
+
+
+# No perder lo acumulado al reiniciar un worker
+atexit.register(vaciar_visitas)
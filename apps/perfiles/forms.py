@@ -0,0 +1,32 @@
+from django import forms
+
+from .models import VentaGarage
+
+
+class FiltroMercadoForm(forms.Form):
+    """Filtros y orden del mercado de la venta garage"""
+    
+    ORDEN_CHOICES = [
+        ('recientes', 'Más recientes'),
+        ('precio_asc', 'Precio: menor a mayor'),
+        ('precio_desc', 'Precio: mayor a menor'),
+    ]
+    
+    orden = forms.ChoiceField(choices=ORDEN_CHOICES, required=False)
+    estado = forms.ChoiceField(
+        choices=[('', 'Todos')] + VentaGarage.ESTADO_CHOICES,
+        required=False
+    )
+    precio_min = forms.DecimalField(min_value=0, decimal_places=2, required=False)
+    precio_max = forms.DecimalField(min_value=0, decimal_places=2, required=False)
+    
+    def filtros(self):
+        """Datos válidos del formulario; los campos inválidos se ignoran"""
+        self.is_valid()
+        datos = getattr(self, 'cleaned_data', {})
+        return {
+            'orden': datos.get('orden') or 'recientes',
+            'estado': datos.get('estado') or None,
+            'precio_min': datos.get('precio_min'),
+            'precio_max': datos.get('precio_max'),
+        }
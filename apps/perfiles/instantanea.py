@@ -0,0 +1,254 @@
+"""
+Instantánea compacta de un perfil para guardar en la caché.
+
+En lugar de picklear instancias de los modelos (con `_state`, cachés de
+campos, objetos `PhoneNumber`, `FieldFile`, ...), se copian a dataclasses
+congeladas con `__slots__` solo los campos que usan las plantillas y los
+motores de PDF. Las fechas se guardan como ordinales, los archivos como su
+URL y los teléfonos como texto.
+
+El formato binario es una cabecera (`CV`, versión del formato y versión de
+`marshal`) seguida de tuplas serializadas con `marshal`. Si la cabecera no
+coincide (por ejemplo, tras cambiar los campos y subir `FORMATO`) la entrada
+se trata como ausente y se vuelve a construir.
+"""
+import marshal
+from dataclasses import dataclass, fields
+from datetime import date
+from typing import ClassVar, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import aobtener_version_perfil
+from .models import calcular_duracion, calcular_edad
+
+FORMATO = 1
+CABECERA = b'CV' + bytes([FORMATO, marshal.version])
+
+
+@dataclass(frozen=True, slots=True)
+class Archivo:
+    """Archivo subido; las plantillas solo usan su URL"""
+    url: str
+
+
+@dataclass(frozen=True, slots=True)
+class PerfilCV:
+    FECHAS: ClassVar[tuple] = ('fecha_nacimiento',)
+    ARCHIVOS: ClassVar[tuple] = ('foto_perfil',)
+
+    pk: int
+    nombres: str
+    apellidos: str
+    descripcion_perfil: str
+    numero_cedula: str
+    fecha_nacimiento: date
+    nacionalidad: str
+    estado_civil: str
+    telefono_fijo: str
+    telefono_convencional: str
+    direccion_domiciliaria: str
+    sitio_web: str
+    foto_perfil: Optional[Archivo]
+
+    def get_edad(self):
+        """Calcula la edad actual"""
+        return calcular_edad(self.fecha_nacimiento)
+
+
+@dataclass(frozen=True, slots=True)
+class ExperienciaCV:
+    FECHAS: ClassVar[tuple] = ('fecha_inicio_gestion', 'fecha_fin_gestion')
+    ARCHIVOS: ClassVar[tuple] = ('ruta_certificado',)
+
+    cargo_desempenado: str
+    nombre_empresa: str
+    lugar_empresa: str
+    descripcion_funciones: str
+    fecha_inicio_gestion: date
+    fecha_fin_gestion: Optional[date]
+    ruta_certificado: Optional[Archivo]
+
+    def get_duracion(self):
+        """Calcula la duración del trabajo"""
+        return calcular_duracion(self.fecha_inicio_gestion, self.fecha_fin_gestion)
+
+
+@dataclass(frozen=True, slots=True)
+class CursoCV:
+    FECHAS: ClassVar[tuple] = ('fecha_inicio', 'fecha_fin')
+    ARCHIVOS: ClassVar[tuple] = ('ruta_certificado',)
+
+    nombre_curso: str
+    entidad_patrocinadora: str
+    fecha_inicio: date
+    fecha_fin: date
+    total_horas: int
+    descripcion_curso: str
+    ruta_certificado: Optional[Archivo]
+
+
+@dataclass(frozen=True, slots=True)
+class ReconocimientoCV:
+    FECHAS: ClassVar[tuple] = ('fecha_reconocimiento',)
+    ARCHIVOS: ClassVar[tuple] = ('ruta_certificado',)
+
+    tipo_reconocimiento: str
+    entidad_patrocinadora: str
+    fecha_reconocimiento: date
+    descripcion_reconocimiento: str
+    ruta_certificado: Optional[Archivo]
+
+
+@dataclass(frozen=True, slots=True)
+class ProductoAcademicoCV:
+    FECHAS: ClassVar[tuple] = ()
+    ARCHIVOS: ClassVar[tuple] = ('imagen_proyecto',)
+
+    nombre_recurso: str
+    clasificador: str
+    descripcion: str
+    imagen_proyecto: Optional[Archivo]
+
+
+@dataclass(frozen=True, slots=True)
+class ProductoLaboralCV:
+    FECHAS: ClassVar[tuple] = ('fecha_producto',)
+    ARCHIVOS: ClassVar[tuple] = ()
+
+    nombre_producto: str
+    fecha_producto: date
+    descripcion: str
+    link_proyecto: str
+
+
+# Orden fijo de las secciones dentro del formato binario
+CLASES_SECCIONES = {
+    'experiencias': ExperienciaCV,
+    'cursos': CursoCV,
+    'reconocimientos': ReconocimientoCV,
+    'productos_academicos': ProductoAcademicoCV,
+    'productos_laborales': ProductoLaboralCV,
+}
+
+_campos = {}
+
+
+def campos(clase):
+    """Nombres de los campos y posiciones de las fechas y los archivos"""
+    if clase not in _campos:
+        nombres = tuple(campo.name for campo in fields(clase))
+        _campos[clase] = (
+            nombres,
+            tuple(i for i, nombre in enumerate(nombres) if nombre in clase.FECHAS),
+            tuple(i for i, nombre in enumerate(nombres) if nombre in clase.ARCHIVOS),
+        )
+    return _campos[clase]
+
+
+def desde_modelo(clase, instancia):
+    """Copia a `clase` los campos de una instancia del modelo"""
+    valores = []
+    for nombre in campos(clase)[0]:
+        valor = getattr(instancia, nombre)
+        if nombre in clase.ARCHIVOS:
+            valor = Archivo(valor.url) if valor else None
+        elif nombre in clase.FECHAS:
+            pass
+        elif valor is None:
+            valor = ''
+        elif not isinstance(valor, (str, int)):
+            # PhoneNumber y similares se guardan como texto
+            valor = str(valor)
+        valores.append(valor)
+    return clase(*valores)
+
+
+def a_tupla(objeto):
+    nombres, fechas, archivos = campos(type(objeto))
+    valores = [getattr(objeto, nombre) for nombre in nombres]
+    for i in fechas:
+        if valores[i] is not None:
+            valores[i] = valores[i].toordinal()
+    for i in archivos:
+        if valores[i] is not None:
+            valores[i] = valores[i].url
+    return tuple(valores)
+
+
+def desde_tupla(clase, valores):
+    _, fechas, archivos = campos(clase)
+    valores = list(valores)
+    for i in fechas:
+        if valores[i] is not None:
+            valores[i] = date.fromordinal(valores[i])
+    for i in archivos:
+        if valores[i] is not None:
+            valores[i] = Archivo(valores[i])
+    return clase(*valores)
+
+
+@dataclass(frozen=True, slots=True)
+class InstantaneaCV:
+    """Perfil y secciones visibles del CV, listos para las plantillas y el PDF"""
+
+    perfil: PerfilCV
+    experiencias: tuple
+    cursos: tuple
+    reconocimientos: tuple
+    productos_academicos: tuple
+    productos_laborales: tuple
+
+    @classmethod
+    def desde_perfil(cls, perfil, secciones):
+        """Construye la instantánea a partir del modelo y sus secciones consultadas"""
+        return cls(
+            desde_modelo(PerfilCV, perfil),
+            *(
+                tuple(desde_modelo(clase, registro) for registro in secciones.get(nombre, ()))
+                for nombre, clase in CLASES_SECCIONES.items()
+            ),
+        )
+
+    def secciones(self):
+        return {nombre: getattr(self, nombre) for nombre in CLASES_SECCIONES}
+
+    def serializar(self):
+        datos = (a_tupla(self.perfil),) + tuple(
+            tuple(a_tupla(registro) for registro in getattr(self, nombre))
+            for nombre in CLASES_SECCIONES
+        )
+        return CABECERA + marshal.dumps(datos)
+
+    @classmethod
+    def deserializar(cls, contenido):
+        """Instantánea guardada con `serializar`, o None si el formato no coincide"""
+        if not contenido or contenido[:len(CABECERA)] != CABECERA:
+            return None
+        perfil, *secciones = marshal.loads(contenido[len(CABECERA):])
+        return cls(
+            desde_tupla(PerfilCV, perfil),
+            *(
+                tuple(desde_tupla(clase, valores) for valores in registros)
+                for clase, registros in zip(CLASES_SECCIONES.values(), secciones)
+            ),
+        )
+
+
+def clave_instantanea(perfil_id, version):
+    return f'instantanea:{FORMATO}:{perfil_id}:{version}'
+
+
+async def aobtener_instantanea(perfil):
+    """Instantánea del perfil en su versión actual, desde la caché o recién construida"""
+    clave = clave_instantanea(perfil.pk, await aobtener_version_perfil(perfil.pk))
+    instantanea = InstantaneaCV.deserializar(await cache.aget(clave))
+    if instantanea is None:
+        secciones = {
+            nombre: [registro async for registro in queryset]
+            for nombre, queryset in perfil.secciones_visibles().items()
+        }
+        instantanea = InstantaneaCV.desde_perfil(perfil, secciones)
+        await cache.aset(clave, instantanea.serializar(), settings.CACHE_INSTANTANEAS_SEGUNDOS)
+    return instantanea
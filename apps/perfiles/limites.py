@@ -0,0 +1,175 @@
+"""
+Límites de tasa y de concurrencia para el endpoint del PDF y límite de tasa
+de la búsqueda pública de perfiles.
+
+- Token bucket por IP de cliente y global, guardado en la caché configurada
+  para que lo compartan todos los workers. El acceso al bucket se serializa
+  con un candado en la caché (`cache.add` con un valor propio de cada
+  petición, que se comprueba antes de liberarlo). Si el candado sigue ocupado
+  tras unos reintentos cortos, la petición se rechaza. Solo si la caché es
+  local al proceso o no responde se usa un bucket en memoria protegido con
+  un `threading.Lock`.
+- Un semáforo por proceso limita los renders de PDF simultáneos; cuando está
+  lleno se responde 503 en lugar de encolar la petición.
+
+Los rechazos se cuentan en `pdf_rechazos_total` con la etiqueta `motivo`, y
+los de la búsqueda en `busqueda_rechazos_total`.
+"""
+import logging
+import math
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from apps.core import metricas
+
+logger = logging.getLogger(__name__)
+
+# Pausas entre los intentos de tomar el candado del bucket (unos 15 ms en total)
+ESPERAS_CANDADO = (0, 0.001, 0.002, 0.004, 0.008)
+
+
+class ConcurrenciaAgotada(Exception):
+    """No hay espacio para otro render de PDF en este proceso"""
+
+
+class TokenBucket:
+    """Bucket de `capacidad` fichas que se recarga a `tasa` fichas por segundo"""
+
+    def __init__(self, nombre, capacidad, tasa):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self._lock = threading.Lock()
+        self._locales = {}
+
+    def recargar(self, estado, ahora):
+        fichas, marca = estado if estado else (self.capacidad, ahora)
+        return min(self.capacidad, fichas + max(0, ahora - marca) * self.tasa)
+
+    def tomar(self, fichas):
+        """Devuelve (permitido, fichas restantes, segundos hasta la próxima ficha)"""
+        if fichas >= 1:
+            return True, fichas - 1, 0
+        return False, fichas, (1 - fichas) / self.tasa
+
+    def consumir(self, clave=''):
+        """Intenta tomar una ficha; devuelve (permitido, segundos de espera)"""
+        if not isinstance(caches['default'], LocMemCache):
+            resultado = self.consumir_en_cache(clave)
+            if resultado is not None:
+                return resultado
+        return self.consumir_local(clave)
+
+    def consumir_en_cache(self, clave):
+        """
+        Toma la ficha del estado compartido, o None si la caché falló. Con el
+        candado ocupado se rechaza: un bucket local por worker multiplicaría
+        el límite por la cantidad de workers justo cuando hay más tráfico.
+        """
+        clave_estado = f'limite:{self.nombre}:{clave}'
+        clave_candado = f'{clave_estado}:candado'
+        dueno = secrets.token_hex(8)
+        try:
+            if not self.tomar_candado(clave_candado, dueno):
+                return False, 1
+            try:
+                ahora = time.time()
+                fichas = self.recargar(cache.get(clave_estado), ahora)
+                permitido, fichas, espera = self.tomar(fichas)
+                # El estado expira cuando el bucket ya se habría llenado
+                cache.set(clave_estado, (fichas, ahora), math.ceil(self.capacidad / self.tasa) + 1)
+                return permitido, espera
+            finally:
+                # Si el candado expiró mientras tanto ya es de otra petición
+                if cache.get(clave_candado) == dueno:
+                    cache.delete(clave_candado)
+        except Exception:
+            logger.warning('Caché no disponible para el límite %s, se usa el local', self.nombre)
+            return None
+
+    def tomar_candado(self, clave_candado, dueno):
+        for espera in ESPERAS_CANDADO:
+            time.sleep(espera)
+            if cache.add(clave_candado, dueno, timeout=2):
+                return True
+        return False
+
+    def consumir_local(self, clave):
+        with self._lock:
+            ahora = time.time()
+            fichas = self.recargar(self._locales.get(clave), ahora)
+            permitido, fichas, espera = self.tomar(fichas)
+            self._locales[clave] = (fichas, ahora)
+            # Se descartan los buckets llenos para no crecer sin límite
+            if len(self._locales) > 10000:
+                llenos = [
+                    k for k, estado in self._locales.items()
+                    if self.recargar(estado, ahora) >= self.capacidad
+                ]
+                for k in llenos:
+                    del self._locales[k]
+            return permitido, espera
+
+
+bucket_ip = TokenBucket(
+    'pdf-ip', settings.PDF_LIMITE_IP_CAPACIDAD, settings.PDF_LIMITE_IP_TASA
+)
+bucket_global = TokenBucket(
+    'pdf-global', settings.PDF_LIMITE_GLOBAL_CAPACIDAD, settings.PDF_LIMITE_GLOBAL_TASA
+)
+bucket_busqueda = TokenBucket(
+    'busqueda-ip', settings.BUSQUEDA_LIMITE_IP_CAPACIDAD, settings.BUSQUEDA_LIMITE_IP_TASA
+)
+renders_pdf = threading.BoundedSemaphore(settings.PDF_MAX_CONCURRENTES)
+
+
+def ip_cliente(request):
+    """IP del cliente, considerando los proxies confiables de NUM_PROXIES"""
+    if settings.NUM_PROXIES:
+        reenviadas = [
+            ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+            if ip.strip()
+        ]
+        if len(reenviadas) >= settings.NUM_PROXIES:
+            return reenviadas[-settings.NUM_PROXIES]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def rechazar(estado, segundos, motivo, metrica='pdf_rechazos_total'):
+    metricas.incrementar(metrica, motivo=motivo)
+    response = HttpResponse(
+        'Demasiadas solicitudes, intente nuevamente en unos segundos.',
+        status=estado, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(max(1, math.ceil(segundos)))
+    return response
+
+
+def verificar_limite_tasa(request):
+    """Respuesta 429 si el cliente o el total superan su tasa, si no None"""
+    permitido, espera = bucket_ip.consumir(ip_cliente(request))
+    if not permitido:
+        return rechazar(429, espera, 'ip')
+    permitido, espera = bucket_global.consumir()
+    if not permitido:
+        return rechazar(429, espera, 'global')
+    return None
+
+
+def verificar_limite_busqueda(request):
+    """Respuesta 429 si el cliente supera la tasa de búsquedas, si no None"""
+    permitido, espera = bucket_busqueda.consumir(ip_cliente(request))
+    if not permitido:
+        return rechazar(429, espera, 'ip', metrica='busqueda_rechazos_total')
+    return None
+
+
+def rechazo_por_concurrencia():
+    """Respuesta 503 cuando ya hay demasiados PDF generándose en el proceso"""
+    return rechazar(503, settings.PDF_RETRY_AFTER, 'concurrencia')
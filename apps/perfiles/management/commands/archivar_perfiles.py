@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from apps.perfiles.archivado import (
+    archivar_inactivos, relaciones_perfil, restaurar, tamanos_tablas,
+)
+from apps.perfiles.models import DatosPersonales, PerfilArchivado
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los perfiles inactivos y todos sus registros a un archivo JSON '
+        'comprimido (PerfilArchivado), o los restaura con --restaurar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Perfiles por transacción')
+        parser.add_argument(
+            '--cedula', nargs='+', default=None,
+            help='Archiva solo estos perfiles inactivos'
+        )
+        parser.add_argument(
+            '--restaurar', nargs='+', metavar='CEDULA',
+            help='Restaura los perfiles archivados con estas cédulas'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra qué se archivaría')
+        parser.add_argument('--informe', action='store_true', help='Solo muestra el tamaño de las tablas')
+
+    def handle(self, *args, **options):
+        modelos = [DatosPersonales] + [modelo for modelo, _ in relaciones_perfil()] + [PerfilArchivado]
+
+        if options['informe']:
+            self.mostrar_tamanos(tamanos_tablas(modelos))
+            return
+
+        if options['restaurar']:
+            self.restaurar(options['restaurar'])
+            return
+
+        perfiles = DatosPersonales.objects.filter(perfil_activo=False)
+        if options['cedula']:
+            perfiles = perfiles.filter(numero_cedula__in=options['cedula'])
+
+        if options['dry_run']:
+            self.stdout.write(f'Se archivarían {perfiles.count()} perfiles inactivos.')
+            return
+
+        antes = tamanos_tablas(modelos)
+        total = archivar_inactivos(options['lote'], perfiles)
+        despues = tamanos_tablas(modelos)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} perfiles archivados.'))
+        self.mostrar_tamanos(antes, despues)
+
+    def restaurar(self, cedulas):
+        archivados = {a.numero_cedula: a for a in PerfilArchivado.objects.filter(numero_cedula__in=cedulas)}
+        faltantes = [cedula for cedula in cedulas if cedula not in archivados]
+        if faltantes:
+            raise CommandError(f'No hay perfiles archivados con cédula: {", ".join(faltantes)}')
+        for cedula, archivado in archivados.items():
+            try:
+                restaurar(archivado)
+            except IntegrityError as exc:
+                # Por ejemplo, se registró otro perfil con la misma cédula
+                self.stderr.write(self.style.ERROR(f'No se pudo restaurar {cedula}: {exc}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Restaurado {archivado.nombre} ({archivado.registros} registros).'
+                ))
+
+    def mostrar_tamanos(self, antes, despues=None):
+        def kib(valor):
+            return '-' if valor is None else f'{valor / 1024:.0f}'
+
+        encabezado = f'\n{"tabla":<32}{"filas":>9}{"datos KiB":>11}{"índices KiB":>13}'
+        if despues is not None:
+            encabezado += f'{"filas":>9}{"datos KiB":>11}{"índices KiB":>13}'
+        self.stdout.write(encabezado)
+        for tabla, (filas, datos, indices) in antes.items():
+            linea = f'{tabla:<32}{filas:>9}{kib(datos):>11}{kib(indices):>13}'
+            if despues is not None:
+                filas, datos, indices = despues[tabla]
+                linea += f'{filas:>9}{kib(datos):>11}{kib(indices):>13}'
+            self.stdout.write(linea)
+        if despues is not None:
+            self.stdout.write(
+                '\nEn PostgreSQL el espacio liberado se reutiliza tras VACUUM; '
+                'en SQLite el archivo se achica con VACUUM.'
+            )
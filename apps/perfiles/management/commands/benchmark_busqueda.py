@@ -0,0 +1,60 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.perfiles.busqueda import IndicePerfiles
+
+NOMBRES = (
+    'José', 'María', 'Andrés', 'Lucía', 'Sebastián', 'Ana', 'Martín', 'Valeria',
+    'Nicolás', 'Camila', 'Ángel', 'Sofía', 'Julián', 'Isabel', 'Tomás', 'Paula',
+)
+APELLIDOS = (
+    'Pérez', 'González', 'Rodríguez', 'Muñoz', 'Zambrano', 'Cedeño', 'Vélez',
+    'Ortiz', 'Castillo', 'Chávez', 'Mendoza', 'Ruiz', 'Álvarez', 'Benítez',
+)
+CONSULTAS = ('j', 'jo', 'jose', 'jose pe', 'perez', 'mu', 'zamb an', 'cede', '0912', 'xyz')
+
+
+def filas_sinteticas(cantidad, aleatorio):
+    for pk in range(1, cantidad + 1):
+        yield (
+            pk,
+            f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(NOMBRES)}',
+            f'{aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}',
+            f'09{aleatorio.randrange(10 ** 8):08d}',
+            'Perfil sintético',
+            aleatorio.random() < 0.8,
+        )
+
+
+class Command(BaseCommand):
+    help = 'Mide la construcción del índice de búsqueda de perfiles y sus consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfiles', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--repeticiones', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"perfiles":>9}{"construir ms":>14}{"consulta":>12}{"mediana µs":>12}{"p99 µs":>9}')
+        for cantidad in options['perfiles']:
+            filas = list(filas_sinteticas(cantidad, random.Random(cantidad)))
+            indice = IndicePerfiles()
+            inicio = time.perf_counter()
+            indice.construir(filas)
+            ms_construir = (time.perf_counter() - inicio) * 1000
+            # Ya construido: sin revisar la caché en cada consulta
+            indice.revisar = lambda: None
+
+            for consulta in CONSULTAS:
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    indice.buscar(consulta)
+                    tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+                tiempos.sort()
+                self.stdout.write(
+                    f'{cantidad:>9}{ms_construir:>14.1f}{consulta!r:>12}'
+                    f'{statistics.median(tiempos):>12.1f}{tiempos[int(len(tiempos) * 0.99)]:>9.1f}'
+                )
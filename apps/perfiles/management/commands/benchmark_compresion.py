@@ -0,0 +1,93 @@
+import gzip
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from apps.core.middleware import CompresionMiddleware, brotli, comprimir
+from apps.perfiles.models import DatosPersonales
+from apps.perfiles.views import PerfilPublicoView
+
+
+def medir(funcion, repeticiones):
+    """Mediana en milisegundos de `repeticiones` llamadas a `funcion`"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = 'Compara tamaño y latencia del perfil público sin comprimir, con gzip y con Brotli'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cedula', help='Cédula del perfil a medir (por defecto el primero activo)')
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        perfiles = DatosPersonales.objects.filter(perfil_activo=True)
+        if options['cedula']:
+            perfiles = perfiles.filter(numero_cedula=options['cedula'])
+        perfil = perfiles.first()
+        if perfil is None:
+            raise CommandError('No hay un perfil activo para medir.')
+
+        repeticiones = options['repeticiones']
+        factory = RequestFactory()
+        vista = async_to_sync(PerfilPublicoView.as_view())
+        middleware = CompresionMiddleware(vista)
+
+        def peticion(accept_encoding):
+            request = factory.get(
+                f'/perfil/{perfil.numero_cedula}/',
+                HTTP_ACCEPT_ENCODING=accept_encoding,
+            )
+            request.user = AnonymousUser()
+            return middleware.procesar_respuesta(
+                request, vista(request, cedula=perfil.numero_cedula)
+            )
+
+        html = peticion('').content
+        self.stdout.write(f'Perfil: {perfil} ({len(html)} bytes sin comprimir)\n')
+
+        # Compresión en línea, como la de una respuesta no cacheada
+        codecs = [('identity', None), ('gzip', 'gzip')]
+        if brotli is not None:
+            codecs.append(('br', 'br'))
+        else:
+            self.stdout.write(self.style.WARNING('Brotli no está instalado, se omite.'))
+
+        self.stdout.write(f'{"codificación":<14}{"bytes":>10}{"ratio":>8}{"comprimir ms":>15}{"descomprimir ms":>18}')
+        for nombre, codificacion in codecs:
+            if codificacion is None:
+                datos, ms_comprimir, ms_descomprimir = html, 0.0, 0.0
+            else:
+                datos = comprimir(html, codificacion)
+                ms_comprimir = medir(lambda: comprimir(html, codificacion), repeticiones)
+                descomprimir = brotli.decompress if codificacion == 'br' else gzip.decompress
+                ms_descomprimir = medir(lambda: descomprimir(datos), repeticiones)
+            self.stdout.write(
+                f'{nombre:<14}{len(datos):>10}{len(datos) / len(html):>8.2f}'
+                f'{ms_comprimir:>15.3f}{ms_descomprimir:>18.3f}'
+            )
+
+        # Latencia completa de la vista: caché vacía frente a variante precomprimida
+        self.stdout.write('')
+        self.stdout.write(f'{"codificación":<14}{"bytes":>10}{"frío ms":>12}{"cacheado ms":>14}')
+        for nombre, codificacion in codecs:
+            accept = codificacion or ''
+
+            def en_frio():
+                cache.clear()
+                return peticion(accept)
+
+            frio = medir(en_frio, max(1, repeticiones // 5))
+            cuerpo = peticion(accept).content
+            caliente = medir(lambda: peticion(accept), repeticiones)
+            self.stdout.write(f'{nombre:<14}{len(cuerpo):>10}{frio:>12.3f}{caliente:>14.3f}')
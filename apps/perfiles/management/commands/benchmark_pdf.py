@@ -0,0 +1,132 @@
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.perfiles.models import (
+    DatosPersonales, ExperienciaLaboral, Reconocimiento,
+    CursoRealizado, ProductoAcademico
+)
+from apps.perfiles.pdf import MOTORES, obtener_motor
+
+TAMANOS = {
+    'pequeño': 3,
+    'mediano': 25,
+    'grande': 300,
+}
+
+
+def cv_sintetico(cantidad):
+    """Perfil y secciones sin guardar con `cantidad` registros por sección"""
+    perfil = DatosPersonales(
+        descripcion_perfil='Desarrollador Web',
+        nombres='Ana María',
+        apellidos='Benítez Loor',
+        nacionalidad='Ecuatoriana',
+        fecha_nacimiento=date(1990, 5, 17),
+        numero_cedula='0000000000',
+        sexo='M',
+        estado_civil='Soltero/a',
+        direccion_domiciliaria='Av. Principal y Calle Secundaria',
+        sitio_web='https://example.com',
+    )
+    hoy = date(2024, 1, 1)
+    texto = 'Responsable de diseño, desarrollo y mantenimiento de sistemas. ' * 6
+    secciones = {
+        'experiencias': [
+            ExperienciaLaboral(
+                cargo_desempenado=f'Cargo {i}', nombre_empresa=f'Empresa {i}',
+                lugar_empresa='Quito', descripcion_funciones=texto[:500],
+                fecha_inicio_gestion=hoy - timedelta(days=365 * (i + 1)),
+                fecha_fin_gestion=hoy - timedelta(days=365 * i) if i else None,
+            )
+            for i in range(cantidad)
+        ],
+        'cursos': [
+            CursoRealizado(
+                nombre_curso=f'Curso {i}', entidad_patrocinadora='Universidad',
+                fecha_inicio=hoy - timedelta(days=30 * (i + 2)),
+                fecha_fin=hoy - timedelta(days=30 * (i + 1)), total_horas=40,
+            )
+            for i in range(cantidad)
+        ],
+        'reconocimientos': [
+            Reconocimiento(
+                tipo_reconocimiento='Académico', entidad_patrocinadora='Universidad',
+                fecha_reconocimiento=hoy - timedelta(days=90 * i),
+                descripcion_reconocimiento=texto[:300],
+            )
+            for i in range(cantidad)
+        ],
+        'productos_academicos': [
+            ProductoAcademico(
+                nombre_recurso=f'Proyecto {i}', clasificador='Desarrollo Web',
+                descripcion=texto[:500],
+            )
+            for i in range(cantidad)
+        ],
+    }
+    return perfil, secciones
+
+
+class Command(BaseCommand):
+    help = 'Compara tiempo de render, memoria pico y tamaño del PDF de cada motor'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--motores', default=','.join(MOTORES),
+            help='Motores a comparar separados por coma'
+        )
+        parser.add_argument(
+            '--tamanos', default=','.join(TAMANOS),
+            help=f'CVs sintéticos a generar ({", ".join(TAMANOS)})'
+        )
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        tamanos = options['tamanos'].split(',')
+        for tamano in tamanos:
+            if tamano not in TAMANOS:
+                raise CommandError(f'Tamaño desconocido: {tamano}')
+
+        self.stdout.write(
+            f'{"motor":<12}{"cv":<10}{"registros":>10}{"mediana ms":>12}'
+            f'{"mín ms":>10}{"pico MB":>10}{"KB":>10}'
+        )
+        for nombre in options['motores'].split(','):
+            motor = obtener_motor(nombre, respaldo=False)
+            try:
+                motor.cargar_librerias()
+            except (ImportError, OSError) as exc:
+                self.stdout.write(self.style.WARNING(f'{nombre:<12}no disponible: {exc}'))
+                continue
+
+            for tamano in tamanos:
+                perfil, secciones = cv_sintetico(TAMANOS[tamano])
+                # Primer render fuera de la medición (cachés de fuentes, plantillas)
+                motor.generar(perfil, secciones)
+
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    pdf = motor.generar(perfil, secciones)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+                # La memoria se mide aparte para no inflar los tiempos
+                tracemalloc.start()
+                motor.generar(perfil, secciones)
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.stdout.write(
+                    f'{nombre:<12}{tamano:<10}{TAMANOS[tamano] * 4:>10}'
+                    f'{statistics.median(tiempos):>12.1f}{min(tiempos):>10.1f}'
+                    f'{pico / 1024 / 1024:>10.2f}{len(pdf) / 1024:>10.1f}'
+                )
+
+        self.stdout.write(
+            'La memoria pico corresponde a las asignaciones de Python (tracemalloc); '
+            'no incluye la memoria nativa de las librerías en C.'
+        )
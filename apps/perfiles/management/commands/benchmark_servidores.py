@@ -0,0 +1,146 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVIDORES = {
+    'gunicorn': lambda puerto, workers: [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+        '--workers', str(workers), '--bind', f'127.0.0.1:{puerto}',
+        '--log-level', 'warning',
+    ],
+    'uvicorn': lambda puerto, workers: [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--workers', str(workers), '--host', '127.0.0.1', '--port', str(puerto),
+        '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def peticion(puerto, ruta, timeout):
+    """Hace un GET con una conexión nueva y devuelve (ok, segundos)"""
+    inicio = time.perf_counter()
+    try:
+        lector, escritor = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', puerto), timeout
+        )
+        escritor.write(
+            f'GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'Accept-Encoding: gzip\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await escritor.drain()
+        respuesta = await asyncio.wait_for(lector.read(), timeout)
+        escritor.close()
+        ok = respuesta.startswith(b'HTTP/1.1 200')
+    except (OSError, asyncio.TimeoutError):
+        ok = False
+    return ok, time.perf_counter() - inicio
+
+
+async def carga(puerto, ruta, concurrencia, duracion, timeout):
+    """Mantiene `concurrencia` clientes activos durante `duracion` segundos"""
+    fin = time.perf_counter() + duracion
+    latencias = []
+    errores = 0
+
+    async def cliente():
+        nonlocal errores
+        while time.perf_counter() < fin:
+            ok, segundos = await peticion(puerto, ruta, timeout)
+            if ok:
+                latencias.append(segundos)
+            else:
+                errores += 1
+
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    return latencias, errores
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara cuántas conexiones concurrentes soportan uvicorn (ASGI, vistas '
+        'asíncronas) y gunicorn con workers síncronos (WSGI)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ruta', default='/perfil/', help='URL a solicitar')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--duracion', type=float, default=5.0, help='Segundos por nivel')
+        parser.add_argument('--timeout', type=float, default=5.0)
+        parser.add_argument(
+            '--concurrencias', default='10,50,100,200',
+            help='Niveles de clientes concurrentes separados por coma'
+        )
+        parser.add_argument(
+            '--servidores', default='gunicorn,uvicorn',
+            help='Servidores a comparar separados por coma'
+        )
+
+    def handle(self, *args, **options):
+        concurrencias = [int(c) for c in options['concurrencias'].split(',')]
+        entorno = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            ALLOWED_HOSTS='127.0.0.1',
+            SECURE_SSL_REDIRECT='False',
+        )
+
+        for nombre in options['servidores'].split(','):
+            if nombre not in SERVIDORES:
+                raise CommandError(f'Servidor desconocido: {nombre}')
+            puerto = puerto_libre()
+            proceso = subprocess.Popen(
+                SERVIDORES[nombre](puerto, options['workers']),
+                cwd=settings.BASE_DIR, env=entorno,
+            )
+            try:
+                self.esperar_servidor(puerto, proceso)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{nombre} ({options["workers"]} workers) {options["ruta"]}'
+                ))
+                self.stdout.write(f'{"clientes":>9}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"errores":>9}')
+                for concurrencia in concurrencias:
+                    latencias, errores = asyncio.run(carga(
+                        puerto, options['ruta'], concurrencia,
+                        options['duracion'], options['timeout'],
+                    ))
+                    self.escribir_fila(concurrencia, latencias, errores, options['duracion'])
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+
+    def esperar_servidor(self, puerto, proceso, limite=30):
+        fin = time.time() + limite
+        while time.time() < fin:
+            if proceso.poll() is not None:
+                raise CommandError('El servidor terminó al arrancar.')
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('El servidor no respondió a tiempo.')
+
+    def escribir_fila(self, concurrencia, latencias, errores, duracion):
+        if latencias:
+            ordenadas = sorted(latencias)
+            p50 = statistics.median(ordenadas) * 1000
+            p95 = ordenadas[int(len(ordenadas) * 0.95) - 1] * 1000
+        else:
+            p50 = p95 = float('nan')
+        self.stdout.write(
+            f'{concurrencia:>9}{len(latencias) / duracion:>10.1f}'
+            f'{p50:>10.1f}{p95:>10.1f}{errores:>9}'
+        )
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+from apps.perfiles.models import DatosPersonales
+
+MANIFIESTO = 'manifiesto.json'
+
+# Cambiar este valor obliga a reconstruir todo (p. ej. al cambiar las plantillas)
+VERSION_ESQUEMA = 1
+
+RELACIONES = (
+    'experiencias', 'cursos', 'reconocimientos',
+    'productos_academicos', 'productos_laborales', 'ventas_garage',
+)
+
+
+def version_contenido(perfil):
+    """Hash de todos los datos que se muestran del perfil"""
+    datos = {
+        'esquema': VERSION_ESQUEMA,
+        'motor_pdf': settings.PDF_MOTOR,
+        'perfil': DatosPersonales.objects.filter(pk=perfil.pk).values().first(),
+    }
+    for relacion in RELACIONES:
+        datos[relacion] = list(getattr(perfil, relacion).order_by('pk').values())
+    serializado = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha256(serializado.encode()).hexdigest()
+
+
+def escribir_atomico(ruta, contenido):
+    """Escribe en un temporal del mismo directorio y lo renombra"""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f'.{ruta.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as archivo:
+            archivo.write(contenido)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def exportar_perfil(cedula, destino):
+    """Renderiza las páginas y el PDF de un perfil (se ejecuta en un proceso hijo)"""
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+
+    from apps.perfiles.views import GenerarPDFView, PerfilPublicoView, VentaGarageView
+
+    factory = RequestFactory()
+    paginas = (
+        (PerfilPublicoView, f'/perfil/{cedula}/', 'index.html'),
+        (VentaGarageView, f'/perfil/{cedula}/garage/', 'garage/index.html'),
+        (GenerarPDFView, f'/perfil/{cedula}/pdf/', 'cv.pdf'),
+    )
+
+    archivos = []
+    for vista, ruta, archivo in paginas:
+        request = factory.get(ruta)
+        request.user = AnonymousUser()
+        # Las vistas no cuentan estas peticiones como visitas
+        request.exportacion_estatica = True
+        response = async_to_sync(vista.as_view())(request, cedula=cedula)
+        if response.status_code != 200:
+            raise RuntimeError(f'{ruta} respondió {response.status_code}')
+        relativo = f'perfil/{cedula}/{archivo}'
+        escribir_atomico(Path(destino) / relativo, response.content)
+        archivos.append(relativo)
+
+    connections.close_all()
+    return cedula, archivos
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta el perfil público, la venta garage y el PDF de cada perfil activo '
+        'como archivos estáticos, reconstruyendo solo los perfiles que cambiaron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--destino', default=str(settings.EXPORTACION_ESTATICA_DIR),
+            help='Directorio de salida'
+        )
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 1,
+            help='Procesos en paralelo para renderizar'
+        )
+        parser.add_argument('--forzar', action='store_true', help='Reconstruye todos los perfiles')
+
+    def handle(self, *args, **options):
+        destino = Path(options['destino'])
+        destino.mkdir(parents=True, exist_ok=True)
+        ruta_manifiesto = destino / MANIFIESTO
+
+        manifiesto = {}
+        if ruta_manifiesto.exists() and not options['forzar']:
+            manifiesto = json.loads(ruta_manifiesto.read_text(encoding='utf-8'))
+
+        versiones = {
+            perfil.numero_cedula: version_contenido(perfil)
+            for perfil in DatosPersonales.objects.filter(perfil_activo=True)
+        }
+        pendientes = [
+            cedula for cedula, version in versiones.items()
+            if manifiesto.get(cedula, {}).get('version') != version
+        ]
+
+        # Perfiles que ya no están activos
+        for cedula in set(manifiesto) - set(versiones):
+            shutil.rmtree(destino / 'perfil' / cedula, ignore_errors=True)
+            del manifiesto[cedula]
+            self.stdout.write(f'Eliminado {cedula}')
+
+        # Los procesos hijos abren sus propias conexiones
+        connections.close_all()
+        errores = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['procesos'])) as ejecutor:
+            futuros = {
+                ejecutor.submit(exportar_perfil, cedula, str(destino)): cedula
+                for cedula in pendientes
+            }
+            for futuro in as_completed(futuros):
+                cedula = futuros[futuro]
+                try:
+                    _, archivos = futuro.result()
+                except Exception as exc:
+                    errores += 1
+                    self.stderr.write(self.style.ERROR(f'Error exportando {cedula}: {exc}'))
+                    continue
+                manifiesto[cedula] = {'version': versiones[cedula], 'archivos': archivos}
+                self.stdout.write(f'Exportado {cedula}')
+
+        escribir_atomico(
+            ruta_manifiesto,
+            json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(pendientes) - errores} perfiles reconstruidos, '
+            f'{len(versiones) - len(pendientes)} sin cambios.'
+        ))
+        if errores:
+            raise CommandError(f'{errores} perfiles no se pudieron exportar.')
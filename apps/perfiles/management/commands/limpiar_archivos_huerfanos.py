@@ -0,0 +1,99 @@
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.perfiles.models import ArchivoContenido, PerfilArchivado
+from apps.perfiles.storage import campos_deduplicados, contenido_storage
+
+
+class Command(BaseCommand):
+    help = 'Elimina los archivos por contenido que ya no tienen referencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas', type=int, default=24,
+            help=(
+                'Solo borra archivos sin subidas ni cambios de referencias en '
+                'estas horas (protege subidas en curso)'
+            )
+        )
+        parser.add_argument(
+            '--reconciliar', action='store_true',
+            help='Recalcula las referencias a partir de los registros antes de limpiar'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra lo que se borraría')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        dry_run = options['dry_run']
+
+        if options['reconciliar']:
+            self.reconciliar()
+
+        # El plazo cuenta desde la última subida o cambio de referencias: un
+        # archivo viejo que se vuelve a subir no se borra antes de que el
+        # registro que lo usa sume su referencia
+        huerfanos = ArchivoContenido.objects.filter(
+            referencias__lte=0, fecha_actualizacion__lt=limite
+        )
+        total_bytes = 0
+        borrados = 0
+        for archivo in huerfanos.iterator():
+            if not dry_run:
+                # Se vuelve a comprobar al borrar: pudo usarse mientras tanto
+                eliminados, _ = huerfanos.filter(pk=archivo.pk).delete()
+                if not eliminados:
+                    continue
+                contenido_storage.eliminar_definitivo(archivo.nombre)
+            total_bytes += archivo.tamano
+            borrados += 1
+
+        # Archivos en disco sin fila (p. ej. temporales de subidas interrumpidas)
+        conocidos = set(ArchivoContenido.objects.values_list('nombre', flat=True))
+        raiz = contenido_storage.path(contenido_storage.prefijo)
+        corte = time.time() - options['horas'] * 3600
+        for directorio, _, archivos in os.walk(raiz):
+            for nombre_archivo in archivos:
+                ruta = os.path.join(directorio, nombre_archivo)
+                nombre = os.path.relpath(ruta, contenido_storage.location).replace(os.sep, '/')
+                if nombre in conocidos or os.path.getmtime(ruta) >= corte:
+                    continue
+                total_bytes += os.path.getsize(ruta)
+                borrados += 1
+                if not dry_run:
+                    os.remove(ruta)
+
+        accion = 'Se borrarían' if dry_run else 'Se borraron'
+        self.stdout.write(self.style.SUCCESS(
+            f'{accion} {borrados} archivos huérfanos ({total_bytes / 1024 / 1024:.2f} MB).'
+        ))
+
+    def reconciliar(self):
+        """Recalcula las referencias contando los campos de archivo de todos los modelos"""
+        conteo = Counter()
+        for modelo in apps.get_app_config('perfiles').get_models():
+            for campo in campos_deduplicados(modelo):
+                nombres = modelo._default_manager.exclude(
+                    **{f'{campo}__isnull': True}
+                ).exclude(**{campo: ''}).values_list(campo, flat=True)
+                conteo.update(n for n in nombres if contenido_storage.es_nombre_por_contenido(n))
+        # Los perfiles archivados conservan las referencias de sus registros
+        for archivos in PerfilArchivado.objects.values_list('archivos', flat=True).iterator():
+            conteo.update(n for n in archivos if contenido_storage.es_nombre_por_contenido(n))
+
+        cambios = []
+        for archivo in ArchivoContenido.objects.all().iterator():
+            referencias = conteo.get(archivo.nombre, 0)
+            if archivo.referencias != referencias:
+                archivo.referencias = referencias
+                archivo.fecha_actualizacion = timezone.now()
+                cambios.append(archivo)
+        ArchivoContenido.objects.bulk_update(
+            cambios, ['referencias', 'fecha_actualizacion'], batch_size=500
+        )
+        self.stdout.write(f'Referencias corregidas en {len(cambios)} archivos.')
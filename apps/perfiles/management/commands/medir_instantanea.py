@@ -0,0 +1,54 @@
+import pickle
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.perfiles.instantanea import InstantaneaCV
+from apps.perfiles.models import DatosPersonales
+
+from .benchmark_pdf import TAMANOS, cv_sintetico
+
+
+def medir(funcion, repeticiones):
+    """Mediana en microsegundos de `repeticiones` llamadas a `funcion`"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara bytes y tiempo de carga de un perfil cacheado como instancias '
+        'del modelo (pickle) y como instantánea compacta'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=200)
+
+    def handle(self, *args, **options):
+        casos = [(f'sintético {nombre}', *cv_sintetico(cantidad)) for nombre, cantidad in TAMANOS.items()]
+        perfil = DatosPersonales.objects.filter(perfil_activo=True).first()
+        if perfil is not None:
+            secciones = {
+                nombre: list(queryset)
+                for nombre, queryset in perfil.secciones_visibles().items()
+            }
+            casos.insert(0, (f'perfil {perfil.numero_cedula}', perfil, secciones))
+
+        self.stdout.write(
+            f'{"caso":<22}{"pickle B":>10}{"compacta B":>12}{"ratio":>7}'
+            f'{"pickle µs":>12}{"compacta µs":>13}'
+        )
+        for nombre, perfil, secciones in casos:
+            modelos = pickle.dumps((perfil, secciones), pickle.HIGHEST_PROTOCOL)
+            compacta = InstantaneaCV.desde_perfil(perfil, secciones).serializar()
+            us_pickle = medir(lambda: pickle.loads(modelos), options['repeticiones'])
+            us_compacta = medir(lambda: InstantaneaCV.deserializar(compacta), options['repeticiones'])
+            self.stdout.write(
+                f'{nombre:<22}{len(modelos):>10}{len(compacta):>12}'
+                f'{len(compacta) / len(modelos):>7.2f}{us_pickle:>12.1f}{us_compacta:>13.1f}'
+            )
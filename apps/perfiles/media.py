@@ -0,0 +1,166 @@
+"""
+Servicio de los archivos subidos (MEDIA) en producción.
+
+- Los archivos nombrados por su contenido (`ContenidoHashStorage`) nunca
+  cambian, así que se sirven con `Cache-Control: immutable` por un año y su
+  hash como ETag. El resto lleva un max-age corto y un ETag de fecha y tamaño.
+- GET condicional (`If-None-Match` / `If-Modified-Since`) responde 304.
+- `Range` de un solo intervalo responde 206 (visores de PDF que piden los
+  certificados por partes); `If-Range` se respeta.
+- Bajo ASGI el archivo o el intervalo se envía por bloques con un iterador
+  asíncrono (`streaming.cuerpo_streaming`), sin leerlo entero en memoria.
+- Con `MEDIA_DESCARGA='x-accel'` la transferencia se delega a nginx con
+  `X-Accel-Redirect` (prefijo interno en `MEDIA_ACCEL_PREFIJO`), y con
+  `'sendfile'` a Apache/lighttpd con `X-Sendfile`. El servidor web se ocupa
+  entonces de los rangos.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from django.views import View
+
+from .storage import contenido_storage
+from .streaming import cuerpo_streaming
+
+UN_ANIO = 365 * 24 * 60 * 60
+TAMANO_BLOQUE = 64 * 1024
+
+RANGO_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASH_RE = re.compile(r'([0-9a-f]{64})\.[^/]*$')
+
+# Tipos que el navegador puede mostrar sin riesgo; el resto se descarga
+TIPOS_EN_LINEA = ('image/png', 'image/jpeg', 'image/gif', 'image/webp', 'application/pdf')
+
+
+def leer_intervalo(ruta, inicio, longitud):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while longitud > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+
+
+def parsear_rango(cabecera, tamano):
+    """
+    (inicio, fin) inclusivo del único intervalo pedido, None si la cabecera
+    no aplica (se responde completo) o False si no se puede satisfacer.
+    """
+    coincidencia = RANGO_RE.match(cabecera.replace(' ', ''))
+    if not coincidencia:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        # Últimos N bytes; un archivo vacío no tiene ninguno
+        longitud = int(fin)
+        if longitud == 0 or tamano == 0:
+            return False
+        return max(0, tamano - longitud), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+class MediaView(View):
+    """Sirve un archivo de MEDIA_ROOT con caché HTTP y rangos"""
+
+    def get(self, request, ruta):
+        if any(parte.startswith('.') for parte in ruta.split('/')) or ruta.endswith('.tmp'):
+            raise Http404
+        try:
+            absoluta = safe_join(settings.MEDIA_ROOT, ruta)
+        except SuspiciousFileOperation:
+            raise Http404
+        try:
+            estado = os.stat(absoluta)
+        except (FileNotFoundError, NotADirectoryError):
+            raise Http404
+        if not os.path.isfile(absoluta):
+            raise Http404
+
+        tamano = estado.st_size
+        coincidencia = HASH_RE.search(ruta)
+        inmutable = contenido_storage.es_nombre_por_contenido(ruta) and coincidencia
+        if inmutable:
+            etag = f'"{coincidencia.group(1)}"'
+            cache_control = f'public, max-age={UN_ANIO}, immutable'
+        else:
+            etag = f'"{estado.st_mtime_ns:x}-{tamano:x}"'
+            cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+        condicional = get_conditional_response(
+            request, etag=etag, last_modified=int(estado.st_mtime)
+        )
+        if condicional is not None:
+            condicional['Cache-Control'] = cache_control
+            return condicional
+
+        tipo = mimetypes.guess_type(absoluta)[0] or 'application/octet-stream'
+
+        if settings.MEDIA_DESCARGA:
+            response = HttpResponse(content_type=tipo)
+            if settings.MEDIA_DESCARGA == 'x-accel':
+                response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIJO + ruta)
+            else:
+                response['X-Sendfile'] = absoluta
+        else:
+            rango = None
+            if request.META.get('HTTP_RANGE') and self.rango_vigente(request, etag, estado):
+                rango = parsear_rango(request.META['HTTP_RANGE'], tamano)
+            if rango is False:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{tamano}'
+                return response
+            if rango:
+                inicio, fin = rango
+                response = StreamingHttpResponse(
+                    cuerpo_streaming(request, leer_intervalo(absoluta, inicio, fin - inicio + 1)),
+                    status=206, content_type=tipo,
+                )
+                response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+                response['Content-Length'] = str(fin - inicio + 1)
+            elif isinstance(request, ASGIRequest):
+                # Bajo ASGI FileResponse leería el archivo entero antes de enviarlo
+                response = StreamingHttpResponse(
+                    cuerpo_streaming(request, leer_intervalo(absoluta, 0, tamano)),
+                    content_type=tipo,
+                )
+                response['Content-Length'] = str(tamano)
+            else:
+                # FileResponse usa wsgi.file_wrapper (sendfile en gunicorn)
+                response = FileResponse(open(absoluta, 'rb'), content_type=tipo)
+            response['Accept-Ranges'] = 'bytes'
+
+        if tipo not in TIPOS_EN_LINEA:
+            response['Content-Disposition'] = content_disposition_header(
+                True, os.path.basename(absoluta)
+            )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(estado.st_mtime)
+        response['Cache-Control'] = cache_control
+        return response
+
+    def rango_vigente(self, request, etag, estado):
+        """Con If-Range, el rango solo aplica si el archivo no cambió"""
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range:
+            return True
+        if if_range.startswith(('"', 'W/')):
+            return if_range == etag
+        fecha = parse_http_date_safe(if_range)
+        return fecha is not None and int(estado.st_mtime) <= fecha
@@ -0,0 +1,130 @@
+"""
+Mercado con la venta garage de todos los perfiles activos.
+
+La paginación es por conjunto de claves (keyset): cada página se pide con el
+valor de ordenamiento y el id del último artículo de la anterior, de modo que
+la base de datos recorre el índice desde ese punto sin contar ni saltar filas
+(la página 500 cuesta lo mismo que la primera). Los índices compuestos de
+`VentaGarage.Meta` cubren cada orden.
+
+Los conteos por estado salen de una sola consulta agrupada y se guardan en la
+caché bajo la versión del mercado, que cambia con cada modificación de una
+venta o de un perfil.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+from django.utils.dateparse import parse_datetime
+
+from .cache import aobtener_version_mercado
+from .models import DatosPersonales, VentaGarage
+
+# Campo de ordenamiento de cada orden; el id desempata en el mismo sentido
+ORDENES = {
+    'recientes': '-fecha_creacion',
+    'precio_asc': 'valor_del_bien',
+    'precio_desc': '-valor_del_bien',
+}
+
+
+def articulos_visibles():
+    # Con una subconsulta en lugar de un JOIN, el planificador recorre el
+    # índice de ventas en el orden pedido y corta en el LIMIT
+    return VentaGarage.objects.filter(
+        activar_para_que_se_vea_en_front=True,
+        perfil__in=DatosPersonales.objects.filter(perfil_activo=True).values('pk'),
+    )
+
+
+def filtrar(queryset, estado=None, precio_min=None, precio_max=None):
+    if estado:
+        queryset = queryset.filter(estado_producto=estado)
+    if precio_min is not None:
+        queryset = queryset.filter(valor_del_bien__gte=precio_min)
+    if precio_max is not None:
+        queryset = queryset.filter(valor_del_bien__lte=precio_max)
+    return queryset
+
+
+def codificar_cursor(articulo, orden):
+    """Token opaco con la posición del artículo en el orden dado"""
+    campo = ORDENES[orden].lstrip('-')
+    valor = getattr(articulo, campo)
+    valor = valor.isoformat() if campo == 'fecha_creacion' else str(valor)
+    datos = json.dumps([valor, articulo.pk]).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def decodificar_cursor(token, orden):
+    """(valor, id) del token, o None si no es válido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valor, pk = json.loads(base64.urlsafe_b64decode(token + relleno))
+        if ORDENES[orden].lstrip('-') == 'fecha_creacion':
+            valor = parse_datetime(valor)
+        else:
+            valor = Decimal(valor)
+        if valor is None:
+            return None
+        return valor, int(pk)
+    except (binascii.Error, ValueError, TypeError, InvalidOperation):
+        return None
+
+
+def ordenar_desde(queryset, orden, cursor=None):
+    """Queryset ordenado que empieza después de la posición del cursor"""
+    campo = ORDENES[orden]
+    descendente = campo.startswith('-')
+    nombre = campo.lstrip('-')
+    if cursor is not None:
+        valor, pk = cursor
+        op, op_igual = ('lt', 'lte') if descendente else ('gt', 'gte')
+        # La primera condición acota el recorrido del índice; la segunda
+        # descarta los empates ya mostrados
+        queryset = queryset.filter(
+            Q(**{f'{nombre}__{op_igual}': valor}),
+            Q(**{f'{nombre}__{op}': valor}) | Q(**{f'pk__{op}': pk}),
+        )
+    return queryset.order_by(campo, '-pk' if descendente else 'pk')
+
+
+async def apagina(filtros, token=None, por_pagina=None):
+    """Artículos de la página y el token de la siguiente (None si es la última)"""
+    por_pagina = por_pagina or settings.MERCADO_POR_PAGINA
+    orden = filtros['orden']
+    cursor = decodificar_cursor(token, orden) if token else None
+    queryset = ordenar_desde(
+        filtrar(
+            articulos_visibles(),
+            filtros['estado'], filtros['precio_min'], filtros['precio_max'],
+        ),
+        orden, cursor,
+    ).prefetch_related('perfil')
+    
+    # Se pide un artículo de más para saber si hay otra página
+    articulos = [articulo async for articulo in queryset[:por_pagina + 1]]
+    siguiente = None
+    if len(articulos) > por_pagina:
+        articulos = articulos[:por_pagina]
+        siguiente = codificar_cursor(articulos[-1], orden)
+    return articulos, siguiente
+
+
+async def afacetas():
+    """Total y rango de precios por estado, cacheados por versión del mercado"""
+    clave = f'mercado:facetas:{await aobtener_version_mercado()}'
+    facetas = await cache.aget(clave)
+    if facetas is None:
+        grupos = articulos_visibles().values('estado_producto').annotate(
+            total=Count('pk'),
+            precio_min=Min('valor_del_bien'),
+            precio_max=Max('valor_del_bien'),
+        ).order_by('estado_producto')
+        facetas = [grupo async for grupo in grupos]
+        await cache.aset(clave, facetas, settings.MERCADO_FACETAS_SEGUNDOS)
+    return facetas
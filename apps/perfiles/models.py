@@ -4,15 +4,34 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import date, timedelta
 from phonenumber_field.modelfields import PhoneNumberField
+from .storage import almacenamiento_archivos
+
+
+def calcular_edad(fecha_nacimiento):
+    """Edad actual de quien nació en `fecha_nacimiento`"""
+    hoy = date.today()
+    return hoy.year - fecha_nacimiento.year - (
+        (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day)
+    )
+
+
+def calcular_duracion(fecha_inicio, fecha_fin=None):
+    """Duración en años y meses hasta `fecha_fin` (hoy si no hay), como texto"""
+    fecha_fin = fecha_fin or date.today()
+    delta = fecha_fin - fecha_inicio
+    años = delta.days // 365
+    meses = (delta.days % 365) // 30
+    
+    if años > 0:
+        return f"{años} año{'s' if años > 1 else ''}" + (f" {meses} mes{'es' if meses > 1 else ''}" if meses > 0 else "")
+    else:
+        return f"{meses} mes{'es' if meses != 1 else ''}"
 
 
 def validate_edad_minima(fecha_nacimiento):
     """Valida que la persona tenga al menos 15 años"""
     if fecha_nacimiento:
-        hoy = date.today()
-        edad = hoy.year - fecha_nacimiento.year - (
-            (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day)
-        )
+        edad = calcular_edad(fecha_nacimiento)
         if edad < 15:
             raise ValidationError('Debe tener al menos 15 años de edad.')
         if edad > 75:
@@ -138,6 +157,7 @@ class DatosPersonales(models.Model):
     # Foto de perfil
     foto_perfil = models.ImageField(
         upload_to='perfiles/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Foto de perfil'
@@ -157,16 +177,24 @@ class DatosPersonales(models.Model):
     
     def get_edad(self):
         """Calcula la edad actual"""
-        hoy = date.today()
-        return hoy.year - self.fecha_nacimiento.year - (
-            (hoy.month, hoy.day) < (self.fecha_nacimiento.month, self.fecha_nacimiento.day)
-        )
+        return calcular_edad(self.fecha_nacimiento)
     
     def clean(self):
         """Validaciones adicionales"""
         super().clean()
         validate_edad_minima(self.fecha_nacimiento)
         validate_fecha_no_futura(self.fecha_nacimiento)
+    
+    def secciones_visibles(self):
+        """Querysets de los registros relacionados que se muestran en el CV"""
+        visibles = {'activar_para_que_se_vea_en_front': True}
+        return {
+            'experiencias': self.experiencias.filter(**visibles).order_by('-fecha_inicio_gestion'),
+            'cursos': self.cursos.filter(**visibles).order_by('-fecha_inicio'),
+            'reconocimientos': self.reconocimientos.filter(**visibles).order_by('-fecha_reconocimiento'),
+            'productos_academicos': self.productos_academicos.filter(**visibles),
+            'productos_laborales': self.productos_laborales.filter(**visibles).order_by('-fecha_producto'),
+        }
 
 
 class ExperienciaLaboral(models.Model):
@@ -249,6 +277,7 @@ class ExperienciaLaboral(models.Model):
     # Certificado
     ruta_certificado = models.FileField(
         upload_to='certificados/experiencia/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Certificado laboral'
@@ -261,6 +290,14 @@ class ExperienciaLaboral(models.Model):
         verbose_name = 'Experiencia Laboral'
         verbose_name_plural = 'Experiencias Laborales'
         ordering = ['-fecha_inicio_gestion']
+        # Rama de la línea de tiempo del perfil (ver trayectoria.py)
+        indexes = [
+            models.Index(
+                fields=['perfil', '-fecha_inicio_gestion', '-id'],
+                name='experiencia_trayectoria',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.cargo_desempenado} en {self.nombre_empresa}"
@@ -276,15 +313,7 @@ class ExperienciaLaboral(models.Model):
     
     def get_duracion(self):
         """Calcula la duración del trabajo"""
-        fecha_fin = self.fecha_fin_gestion or date.today()
-        delta = fecha_fin - self.fecha_inicio_gestion
-        años = delta.days // 365
-        meses = (delta.days % 365) // 30
-        
-        if años > 0:
-            return f"{años} año{'s' if años > 1 else ''}" + (f" {meses} mes{'es' if meses > 1 else ''}" if meses > 0 else "")
-        else:
-            return f"{meses} mes{'es' if meses != 1 else ''}"
+        return calcular_duracion(self.fecha_inicio_gestion, self.fecha_fin_gestion)
 
 
 class Reconocimiento(models.Model):
@@ -348,6 +377,7 @@ class Reconocimiento(models.Model):
     # Certificado
     ruta_certificado = models.FileField(
         upload_to='certificados/reconocimientos/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Certificado'
@@ -360,6 +390,14 @@ class Reconocimiento(models.Model):
         verbose_name = 'Reconocimiento'
         verbose_name_plural = 'Reconocimientos'
         ordering = ['-fecha_reconocimiento']
+        # Rama de la línea de tiempo del perfil (ver trayectoria.py)
+        indexes = [
+            models.Index(
+                fields=['perfil', '-fecha_reconocimiento', '-id'],
+                name='reconocimiento_trayectoria',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.tipo_reconocimiento} - {self.entidad_patrocinadora}"
@@ -439,6 +477,7 @@ class CursoRealizado(models.Model):
     # Certificado
     ruta_certificado = models.FileField(
         upload_to='certificados/cursos/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Certificado'
@@ -451,6 +490,14 @@ class CursoRealizado(models.Model):
         verbose_name = 'Curso Realizado'
         verbose_name_plural = 'Cursos Realizados'
         ordering = ['-fecha_inicio']
+        # Rama de la línea de tiempo del perfil (ver trayectoria.py)
+        indexes = [
+            models.Index(
+                fields=['perfil', '-fecha_inicio', '-id'],
+                name='curso_trayectoria',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nombre_curso} - {self.entidad_patrocinadora}"
@@ -498,6 +545,7 @@ class ProductoAcademico(models.Model):
     
     imagen_proyecto = models.ImageField(
         upload_to='proyectos/academicos/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Imagen del proyecto'
@@ -565,6 +613,14 @@ class ProductoLaboral(models.Model):
         verbose_name = 'Producto Laboral'
         verbose_name_plural = 'Productos Laborales'
         ordering = ['-fecha_producto']
+        # Rama de la línea de tiempo del perfil (ver trayectoria.py)
+        indexes = [
+            models.Index(
+                fields=['perfil', '-fecha_producto', '-id'],
+                name='producto_lab_trayectoria',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+        ]
     
     def __str__(self):
         return self.nombre_producto
@@ -614,6 +670,7 @@ class VentaGarage(models.Model):
     
     imagen_producto = models.ImageField(
         upload_to='ventas/',
+        storage=almacenamiento_archivos,
         blank=True,
         null=True,
         verbose_name='Imagen del producto'
@@ -637,6 +694,159 @@ class VentaGarage(models.Model):
         verbose_name = 'Venta Garage'
         verbose_name_plural = 'Ventas Garage'
         ordering = ['-fecha_creacion']
+        # Índices parciales del mercado: solo los artículos visibles, con el
+        # orden completo que usa la paginación por claves
+        indexes = [
+            models.Index(
+                fields=['-fecha_creacion', '-id'],
+                name='venta_mercado_recientes',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+            models.Index(
+                fields=['valor_del_bien', 'id'],
+                name='venta_mercado_precio',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+            models.Index(
+                fields=['estado_producto', '-fecha_creacion', '-id'],
+                name='venta_mercado_estado_rec',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+            models.Index(
+                fields=['estado_producto', 'valor_del_bien', 'id'],
+                name='venta_mercado_estado_precio',
+                condition=models.Q(activar_para_que_se_vea_en_front=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nombre_producto} - ${self.valor_del_bien}"
+
+
+class ArchivoContenido(models.Model):
+    """Archivo guardado por el hash SHA-256 de su contenido"""
+    
+    nombre = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Nombre en el almacenamiento'
+    )
+    
+    sha256 = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='SHA-256'
+    )
+    
+    tamano = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Tamaño (bytes)'
+    )
+    
+    referencias = models.IntegerField(
+        default=0,
+        verbose_name='Referencias',
+        help_text='Cantidad de registros que apuntan a este archivo'
+    )
+    
+    # Metadata
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Última actualización',
+        help_text='Última vez que se subió este contenido o cambiaron sus referencias'
+    )
+    
+    class Meta:
+        verbose_name = 'Archivo por contenido'
+        verbose_name_plural = 'Archivos por contenido'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} ref.)"
+
+
+class VisitaDiaria(models.Model):
+    """Conteo diario de visitas y descargas de cada perfil"""
+    
+    TIPO_CHOICES = [
+        ('perfil', 'Perfil público'),
+        ('garage', 'Venta garage'),
+        ('pdf', 'Descarga PDF'),
+    ]
+    
+    perfil = models.ForeignKey(
+        DatosPersonales,
+        on_delete=models.CASCADE,
+        related_name='visitas',
+        verbose_name='Perfil'
+    )
+    
+    fecha = models.DateField(verbose_name='Fecha')
+    
+    tipo = models.CharField(
+        max_length=10,
+        choices=TIPO_CHOICES,
+        verbose_name='Tipo'
+    )
+    
+    total = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Total'
+    )
+    
+    class Meta:
+        verbose_name = 'Visita Diaria'
+        verbose_name_plural = 'Visitas Diarias'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['perfil', 'fecha', 'tipo'],
+                name='visita_diaria_unica'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.perfil} - {self.get_tipo_display()} {self.fecha}: {self.total}"
+
+
+class PerfilArchivado(models.Model):
+    """Perfil inactivo y todos sus registros, guardados como JSON comprimido"""
+    
+    perfil_id_original = models.PositiveBigIntegerField(
+        unique=True,
+        verbose_name='ID original'
+    )
+    
+    numero_cedula = models.CharField(
+        max_length=10,
+        db_index=True,
+        verbose_name='Número de cédula'
+    )
+    
+    nombre = models.CharField(max_length=201, verbose_name='Nombre')
+    
+    registros = models.PositiveIntegerField(
+        verbose_name='Registros',
+        help_text='Filas archivadas, incluido el perfil'
+    )
+    
+    tamano_json = models.PositiveIntegerField(verbose_name='Tamaño JSON (bytes)')
+    
+    archivos = models.JSONField(
+        default=list,
+        verbose_name='Archivos',
+        help_text='Archivos por contenido a los que apuntan los registros archivados'
+    )
+    
+    datos = models.BinaryField(verbose_name='Datos (JSON con gzip)')
+    
+    fecha_archivado = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')
+    
+    class Meta:
+        verbose_name = 'Perfil Archivado'
+        verbose_name_plural = 'Perfiles Archivados'
+        ordering = ['-fecha_archivado']
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.numero_cedula})"
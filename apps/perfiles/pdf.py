@@ -0,0 +1,320 @@
+"""
+Motores de generación del PDF de la hoja de vida.
+
+Hay dos implementaciones intercambiables mediante el setting `PDF_MOTOR`:
+
+- `reportlab`: arma el documento con los flowables de ReportLab.
+- `weasyprint` / `xhtml2pdf`: renderizan los mismos datos con la plantilla
+  `perfiles/pdf/hoja_vida.html` y convierten ese HTML a PDF.
+
+El render es intensivo en CPU, así que las vistas asíncronas lo ejecutan en
+un pool de hilos acotado (`ejecutor_pdf`) para no bloquear el event loop ni
+acumular renders sin límite.
+
+Las librerías de cada motor se importan recién en su primer render: los
+workers que nunca sirven un PDF no pagan ese tiempo de arranque ni esa
+memoria. Con `--preload` de gunicorn, `cargar_librerias` permite importarlas
+una sola vez en el proceso maestro para que los workers las compartan por
+copy-on-write.
+
+Si las librerías del motor configurado no se pueden importar (WeasyPrint sin
+Pango en el sistema, xhtml2pdf sin instalar), se usa ReportLab en su lugar y
+se avisa una vez en el log.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.loader import render_to_string
+
+from apps.core import metricas
+
+logger = logging.getLogger(__name__)
+
+_ejecutor = None
+
+
+def ejecutor_pdf():
+    """Pool de hilos compartido para generar PDFs"""
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=settings.PDF_HILOS,
+            thread_name_prefix='pdf',
+        )
+    return _ejecutor
+
+
+class MotorPDF:
+    """
+    Interfaz de los motores de PDF.
+    
+    `generar` recibe el perfil y las listas ya consultadas de experiencias,
+    cursos, reconocimientos y productos académicos visibles (`secciones`),
+    de modo que los motores no acceden a la base de datos.
+    """
+    
+    nombre = None
+    
+    def cargar_librerias(self):
+        """Importa de antemano las librerías que usa el motor"""
+    
+    def generar(self, perfil, secciones):
+        """Genera el PDF del perfil y devuelve sus bytes"""
+        raise NotImplementedError
+
+
+class ReportLabMotor(MotorPDF):
+    """Motor que arma el PDF con los flowables de ReportLab"""
+    
+    nombre = 'reportlab'
+    
+    def cargar_librerias(self):
+        import reportlab.lib.enums  # noqa: F401
+        import reportlab.lib.styles  # noqa: F401
+        import reportlab.platypus  # noqa: F401
+    
+    def generar(self, perfil, secciones):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib.enums import TA_CENTER
+        
+        # Crear el PDF en memoria
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        story = []
+        styles = getSampleStyleSheet()
+        
+        # Estilos personalizados
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2C3E50'),
+            spaceAfter=30,
+            alignment=TA_CENTER,
+        )
+        
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#34495E'),
+            spaceAfter=12,
+            spaceBefore=12,
+        )
+        
+        # Título
+        story.append(Paragraph(f"{perfil.nombres} {perfil.apellidos}", title_style))
+        story.append(Paragraph(perfil.descripcion_perfil, styles['Normal']))
+        story.append(Spacer(1, 0.2*inch))
+        
+        # Datos personales
+        story.append(Paragraph("DATOS PERSONALES", heading_style))
+        datos_personales = [
+            ['Cédula:', perfil.numero_cedula],
+            ['Fecha de Nacimiento:', perfil.fecha_nacimiento.strftime('%d/%m/%Y')],
+            ['Edad:', f"{perfil.get_edad()} años"],
+            ['Nacionalidad:', perfil.nacionalidad],
+            ['Estado Civil:', perfil.estado_civil],
+            ['Teléfono:', str(perfil.telefono_fijo or perfil.telefono_convencional or 'N/A')],
+            ['Dirección:', perfil.direccion_domiciliaria],
+        ]
+        if perfil.sitio_web:
+            datos_personales.append(['Sitio Web:', perfil.sitio_web])
+        
+        tabla = Table(datos_personales, colWidths=[2*inch, 4*inch])
+        tabla.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        story.append(tabla)
+        story.append(Spacer(1, 0.3*inch))
+        
+        # Experiencia laboral
+        experiencias = secciones['experiencias']
+        
+        if experiencias:
+            story.append(Paragraph("EXPERIENCIA LABORAL", heading_style))
+            for exp in experiencias:
+                fecha_inicio = exp.fecha_inicio_gestion.strftime('%m/%Y')
+                fecha_fin = exp.fecha_fin_gestion.strftime('%m/%Y') if exp.fecha_fin_gestion else 'Actualidad'
+            
+                story.append(Paragraph(
+                    f"<b>{exp.cargo_desempenado}</b> - {exp.nombre_empresa}",
+                    styles['Normal']
+                ))
+                story.append(Paragraph(
+                    f"{fecha_inicio} - {fecha_fin} | {exp.lugar_empresa}",
+                    styles['Normal']
+                ))
+                story.append(Paragraph(exp.descripcion_funciones, styles['Normal']))
+                story.append(Spacer(1, 0.15*inch))
+        
+        # Cursos
+        cursos = secciones['cursos']
+        
+        if cursos:
+            story.append(Paragraph("CURSOS Y CAPACITACIONES", heading_style))
+            for curso in cursos:
+                periodo = f"{curso.fecha_inicio.strftime('%m/%Y')} - {curso.fecha_fin.strftime('%m/%Y')}"
+                story.append(Paragraph(
+                    f"<b>{curso.nombre_curso}</b> - {curso.entidad_patrocinadora}",
+                    styles['Normal']
+                ))
+                story.append(Paragraph(
+                    f"{periodo} | {curso.total_horas} horas",
+                    styles['Normal']
+                ))
+                story.append(Spacer(1, 0.1*inch))
+        
+        # Reconocimientos
+        reconocimientos = secciones['reconocimientos']
+        
+        if reconocimientos:
+            story.append(Paragraph("RECONOCIMIENTOS", heading_style))
+            for rec in reconocimientos:
+                story.append(Paragraph(
+                    f"<b>{rec.tipo_reconocimiento}</b> - {rec.entidad_patrocinadora}",
+                    styles['Normal']
+                ))
+                story.append(Paragraph(
+                    f"{rec.fecha_reconocimiento.strftime('%m/%Y')} - {rec.descripcion_reconocimiento}",
+                    styles['Normal']
+                ))
+                story.append(Spacer(1, 0.1*inch))
+        
+        # Productos académicos
+        productos_academicos = secciones['productos_academicos']
+        
+        if productos_academicos:
+            story.append(Paragraph("PRODUCTOS ACADÉMICOS", heading_style))
+            for prod in productos_academicos:
+                story.append(Paragraph(
+                    f"<b>{prod.nombre_recurso}</b> ({prod.clasificador})",
+                    styles['Normal']
+                ))
+                story.append(Paragraph(prod.descripcion, styles['Normal']))
+                story.append(Spacer(1, 0.1*inch))
+        
+        # Construir PDF
+        doc.build(story)
+        
+        return buffer.getvalue()
+
+
+class PlantillaHTMLMotor(MotorPDF):
+    """Motor que renderiza una plantilla de Django y la convierte a PDF"""
+    
+    template_name = 'perfiles/pdf/hoja_vida.html'
+    
+    def renderizar_html(self, perfil, secciones):
+        context = {'perfil': perfil}
+        context.update(secciones)
+        return render_to_string(self.template_name, context)
+    
+    def generar(self, perfil, secciones):
+        return self.convertir(self.renderizar_html(perfil, secciones))
+    
+    def convertir(self, html):
+        raise NotImplementedError
+
+
+class WeasyPrintMotor(PlantillaHTMLMotor):
+    """Convierte la plantilla HTML con WeasyPrint"""
+    
+    nombre = 'weasyprint'
+    
+    def cargar_librerias(self):
+        import weasyprint  # noqa: F401
+    
+    def convertir(self, html):
+        import weasyprint
+        
+        return weasyprint.HTML(string=html).write_pdf()
+
+
+class XHTML2PDFMotor(PlantillaHTMLMotor):
+    """Convierte la plantilla HTML con xhtml2pdf"""
+    
+    nombre = 'xhtml2pdf'
+    
+    def cargar_librerias(self):
+        from xhtml2pdf import pisa  # noqa: F401
+    
+    def convertir(self, html):
+        from xhtml2pdf import pisa
+        
+        buffer = BytesIO()
+        resultado = pisa.CreatePDF(html, dest=buffer, encoding='utf-8')
+        if resultado.err:
+            raise RuntimeError('xhtml2pdf no pudo generar el PDF.')
+        return buffer.getvalue()
+
+
+MOTORES = {
+    motor.nombre: motor
+    for motor in (ReportLabMotor, WeasyPrintMotor, XHTML2PDFMotor)
+}
+
+
+# Motor que reemplaza al configurado cuando sus librerías no están disponibles
+MOTOR_RESPALDO = 'reportlab'
+
+# Motores cuyas librerías ya fallaron al importarse en este proceso
+_no_disponibles = set()
+
+
+def obtener_motor(nombre=None, respaldo=True):
+    """
+    Instancia del motor `nombre`, o del configurado en PDF_MOTOR.
+    
+    Con `respaldo`, si sus librerías no se pueden importar devuelve el motor
+    de ReportLab; el fallo se recuerda para no reintentar la importación en
+    cada PDF.
+    """
+    nombre = nombre or settings.PDF_MOTOR
+    try:
+        motor = MOTORES[nombre]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"PDF_MOTOR '{nombre}' no existe. Opciones: {', '.join(MOTORES)}"
+        )
+    if not respaldo or nombre == MOTOR_RESPALDO:
+        return motor
+    if nombre not in _no_disponibles:
+        try:
+            motor.cargar_librerias()
+            return motor
+        except (ImportError, OSError) as exc:
+            _no_disponibles.add(nombre)
+            logger.warning(
+                "El motor de PDF '%s' no está disponible (%s); se usa '%s'",
+                nombre, exc, MOTOR_RESPALDO,
+            )
+    return MOTORES[MOTOR_RESPALDO]()
+
+
+def cargar_librerias():
+    """Importa de antemano las librerías del motor configurado"""
+    obtener_motor().cargar_librerias()
+
+
+def construir_pdf(perfil, secciones):
+    """Genera el PDF del perfil con el motor configurado"""
+    inicio = time.perf_counter()
+    motor = obtener_motor()
+    contenido = motor.generar(perfil, secciones)
+    nombre = motor.nombre
+    metricas.observar('pdf_render_segundos', time.perf_counter() - inicio, motor=nombre)
+    metricas.observar('pdf_tamano_bytes', len(contenido), metricas.CUBETAS_BYTES, motor=nombre)
+    return contenido
@@ -0,0 +1,129 @@
+"""
+Pregeneración del PDF después de editar un perfil.
+
+Con `PDF_PREGENERAR` activado, cada cambio en un perfil o en sus registros
+programa, al confirmarse la transacción, la regeneración de su PDF en un pool
+de hilos propio. Los cambios seguidos del mismo perfil (por ejemplo, guardar
+un formulario del admin con varios inlines) se agrupan: cada uno reinicia una
+espera de `PDF_PREGENERAR_ESPERA` segundos y solo al terminar esa espera se
+genera el PDF una vez.
+
+Un único hilo planificador lleva los vencimientos de todos los perfiles en un
+heap, así una acción masiva sobre N perfiles no arranca N hilos. Borrar o
+desactivar un perfil cancela su espera en lugar de programar un PDF que no
+se va a mostrar.
+"""
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .cache import clave_pdf, obtener_version_perfil
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_ejecutor = None
+
+# perfil_id -> instante (time.monotonic) en que vence su espera
+_plazos = {}
+# Heap de (vencimiento, perfil_id); las entradas que ya no coinciden con
+# _plazos (espera reiniciada o cancelada) se descartan al salir
+_cola = []
+_condicion = threading.Condition()
+_planificador = None
+
+
+def ejecutor_pregeneracion():
+    """Pool de hilos de la pregeneración, separado del de las peticiones"""
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(
+                max_workers=settings.PDF_PREGENERAR_HILOS,
+                thread_name_prefix='pdf-pregeneracion',
+            )
+    return _ejecutor
+
+
+def programar_pregeneracion(perfil_id, activo=True):
+    """
+    Programa la regeneración del PDF cuando se confirme la transacción, o la
+    cancela si el perfil se borró o quedó inactivo (`activo=False`)
+    """
+    if settings.PDF_PREGENERAR and perfil_id is not None:
+        accion = reiniciar_espera if activo else cancelar_espera
+        transaction.on_commit(lambda: accion(perfil_id))
+
+
+def reiniciar_espera(perfil_id):
+    """Empieza de nuevo la espera del perfil"""
+    global _planificador
+    vencimiento = time.monotonic() + settings.PDF_PREGENERAR_ESPERA
+    with _condicion:
+        _plazos[perfil_id] = vencimiento
+        heapq.heappush(_cola, (vencimiento, perfil_id))
+        # Tras un fork (preload de gunicorn) el hilo del proceso padre no existe
+        if _planificador is None or not _planificador.is_alive():
+            _planificador = threading.Thread(
+                target=planificar, name='pdf-pregeneracion-espera', daemon=True
+            )
+            _planificador.start()
+        _condicion.notify()
+
+
+def cancelar_espera(perfil_id):
+    with _condicion:
+        _plazos.pop(perfil_id, None)
+
+
+def extraer_vencidos(ahora):
+    """Saca de la cola los perfiles cuya espera terminó"""
+    vencidos = []
+    while _cola and _cola[0][0] <= ahora:
+        vencimiento, perfil_id = heapq.heappop(_cola)
+        if _plazos.get(perfil_id) == vencimiento:
+            del _plazos[perfil_id]
+            vencidos.append(perfil_id)
+    return vencidos
+
+
+def planificar():
+    """Hilo planificador: encola cada PDF cuando vence la espera de su perfil"""
+    while True:
+        with _condicion:
+            while not (vencidos := extraer_vencidos(time.monotonic())):
+                _condicion.wait(_cola[0][0] - time.monotonic() if _cola else None)
+        for perfil_id in vencidos:
+            ejecutor_pregeneracion().submit(regenerar_pdf, perfil_id)
+
+
+def regenerar_pdf(perfil_id):
+    """Genera el PDF del perfil y lo guarda en la caché de PDFs"""
+    from .models import DatosPersonales
+    from .pdf import construir_pdf
+
+    close_old_connections()
+    try:
+        perfil = DatosPersonales.objects.filter(pk=perfil_id, perfil_activo=True).first()
+        if perfil is None:
+            return
+
+        clave = clave_pdf(perfil.pk, obtener_version_perfil(perfil.pk))
+        if cache.get(clave) is not None:
+            return
+
+        secciones = {
+            nombre: list(queryset)
+            for nombre, queryset in perfil.secciones_visibles().items()
+        }
+        cache.set(clave, construir_pdf(perfil, secciones), settings.CACHE_PDF_SEGUNDOS)
+    except Exception:
+        logger.exception('No se pudo pregenerar el PDF del perfil %s', perfil_id)
+    finally:
+        close_old_connections()
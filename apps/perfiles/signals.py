@@ -0,0 +1,155 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from .busqueda import indice
+from .cache import invalidar_en_lote
+from .pregeneracion import programar_pregeneracion
+from .storage import ajustar_referencias, campos_deduplicados
+from .models import (
+    DatosPersonales, ExperienciaLaboral, Reconocimiento,
+    CursoRealizado, ProductoAcademico, ProductoLaboral, VentaGarage
+)
+
+MODELOS_RELACIONADOS = (
+    ExperienciaLaboral, Reconocimiento, CursoRealizado,
+    ProductoAcademico, ProductoLaboral, VentaGarage,
+)
+
+# Sección del CV público que muestra cada modelo
+SECCION_POR_MODELO = {
+    ExperienciaLaboral: 'experiencias',
+    CursoRealizado: 'cursos',
+    Reconocimiento: 'reconocimientos',
+    ProductoAcademico: 'productos_academicos',
+    ProductoLaboral: 'productos_laborales',
+}
+
+
+_local = threading.local()
+
+
+def perfil_modificado(perfil_id, seccion=None, datos_personales=False, sin_pdf=False):
+    """
+    Invalida la caché del perfil (y de la sección, si se indica) y programa
+    su PDF al confirmar la transacción. Con `datos_personales` (cambió la fila
+    del perfil, no un registro relacionado) también se actualiza el índice
+    de búsqueda. Con `sin_pdf` (perfil borrado o inactivo) se cancela el PDF
+    pendiente en lugar de programarlo.
+    
+    Invalidar antes del commit permitiría que una petición concurrente cachee
+    los datos viejos bajo la versión nueva.
+    """
+    perfiles_modificados([perfil_id], seccion, datos_personales, sin_pdf)
+
+
+def perfiles_modificados(perfil_ids, seccion=None, datos_personales=False, sin_pdf=False):
+    """Como `perfil_modificado`, para varios perfiles en un solo lote"""
+    perfil_ids = {perfil_id for perfil_id in perfil_ids if perfil_id is not None}
+    cambios = {(perfil_id, seccion) for perfil_id in perfil_ids}
+    indexados = perfil_ids if datos_personales else set()
+    descartados = perfil_ids if sin_pdf else set()
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.update(cambios)
+        _local.indexados.update(indexados)
+        _local.descartados.update(descartados)
+    else:
+        aplicar_cambios(cambios, indexados, descartados)
+
+
+def aplicar_cambios(cambios, indexados=(), descartados=()):
+    """
+    Programa la invalidación y el PDF de los pares (perfil_id, seccion), y la
+    actualización del índice de búsqueda de los perfiles `indexados`. Los
+    perfiles `descartados` (borrados o inactivos) cancelan su PDF pendiente.
+    """
+    if not cambios:
+        return
+    transaction.on_commit(lambda: invalidar_en_lote(cambios))
+    # La venta garage y las secciones no cambian nada de lo que indexa la
+    # búsqueda; cada actualización hace que los demás workers lo reconstruyan
+    if indexados:
+        indexados = set(indexados)
+        transaction.on_commit(lambda: indice.actualizar(indexados))
+    for perfil_id in {perfil_id for perfil_id, _ in cambios}:
+        programar_pregeneracion(perfil_id, activo=perfil_id not in descartados)
+
+
+@contextmanager
+def invalidacion_agrupada():
+    """
+    Acumula las invalidaciones del bloque (p. ej. las señales de un borrado
+    masivo) y las aplica juntas al salir.
+    """
+    if getattr(_local, 'pendientes', None) is not None:
+        yield
+        return
+    _local.pendientes = set()
+    _local.indexados = set()
+    _local.descartados = set()
+    try:
+        yield
+    finally:
+        pendientes, indexados, descartados = (
+            _local.pendientes, _local.indexados, _local.descartados
+        )
+        _local.pendientes = _local.indexados = _local.descartados = None
+        aplicar_cambios(pendientes, indexados, descartados)
+
+
+@receiver([post_save, post_delete], sender=DatosPersonales)
+def invalidar_cache_perfil(sender, instance, signal, **kwargs):
+    """Invalida la caché cuando cambian los datos personales"""
+    perfil_modificado(
+        instance.pk, datos_personales=True,
+        sin_pdf=signal is post_delete or not instance.perfil_activo,
+    )
+
+
+def invalidar_cache_relacionado(sender, instance, **kwargs):
+    """Invalida la caché del perfil dueño de un registro relacionado"""
+    perfil_modificado(instance.perfil_id, SECCION_POR_MODELO.get(sender))
+
+
+for modelo in MODELOS_RELACIONADOS:
+    post_save.connect(invalidar_cache_relacionado, sender=modelo)
+    post_delete.connect(invalidar_cache_relacionado, sender=modelo)
+
+
+def recordar_archivos_previos(sender, instance, **kwargs):
+    """Guarda en la instancia los archivos que tenía antes de guardarse"""
+    instance._archivos_previos = {}
+    if instance.pk is not None:
+        campos = campos_deduplicados(sender)
+        instance._archivos_previos = sender._default_manager.filter(
+            pk=instance.pk
+        ).values(*campos).first() or {}
+
+
+def actualizar_referencias_archivos(sender, instance, **kwargs):
+    """Ajusta las referencias de los archivos que cambiaron"""
+    previos = getattr(instance, '_archivos_previos', {})
+    for campo in campos_deduplicados(sender):
+        nuevo = getattr(instance, campo).name or ''
+        anterior = previos.get(campo) or ''
+        if nuevo != anterior:
+            ajustar_referencias([nuevo], 1)
+            ajustar_referencias([anterior], -1)
+
+
+def liberar_referencias_archivos(sender, instance, **kwargs):
+    """Descuenta las referencias de los archivos de un registro eliminado"""
+    ajustar_referencias(
+        [getattr(instance, campo).name for campo in campos_deduplicados(sender)], -1
+    )
+
+
+for modelo in (DatosPersonales,) + MODELOS_RELACIONADOS:
+    if campos_deduplicados(modelo):
+        pre_save.connect(recordar_archivos_previos, sender=modelo)
+        post_save.connect(actualizar_referencias_archivos, sender=modelo)
+        post_delete.connect(liberar_referencias_archivos, sender=modelo)
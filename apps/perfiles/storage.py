@@ -0,0 +1,124 @@
+"""
+Almacenamiento de archivos deduplicado por contenido.
+
+Los certificados e imágenes se guardan con el SHA-256 de su contenido como
+nombre, así un mismo PDF subido para muchos perfiles (algo habitual en los
+cursos grupales) ocupa disco una sola vez. Cada archivo tiene una fila
+`ArchivoContenido` con su contador de referencias, que mantienen las señales
+de los modelos; el comando `limpiar_archivos_huerfanos` borra los que quedan
+sin referencias.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import F, FileField
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContenidoHashStorage(FileSystemStorage):
+    """Guarda cada archivo una sola vez, nombrado por el hash de su contenido"""
+
+    prefijo = 'contenido'
+
+    def nombre_para_hash(self, sha256, extension):
+        return f'{self.prefijo}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+    def es_nombre_por_contenido(self, name):
+        return bool(name) and name.startswith(f'{self.prefijo}/')
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide el hash en _save
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        directorio = self.path(self.prefijo)
+        os.makedirs(directorio, exist_ok=True)
+
+        # El hash se calcula mientras se copia el archivo, sin cargarlo entero
+        sha256 = hashlib.sha256()
+        tamano = 0
+        fd, ruta_temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as destino:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    destino.write(chunk)
+                    tamano += len(chunk)
+
+            digest = sha256.hexdigest()
+            nombre = self.nombre_para_hash(digest, extension)
+            ruta = self.path(nombre)
+            if os.path.exists(ruta):
+                # Contenido ya almacenado: se descarta la copia
+                os.remove(ruta_temporal)
+            else:
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                os.chmod(ruta_temporal, self.file_permissions_mode or 0o644)
+                os.replace(ruta_temporal, ruta)
+        except BaseException:
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            raise
+
+        registrar_archivo(nombre, digest, tamano)
+        return nombre
+
+    def delete(self, name):
+        # Los archivos pueden estar compartidos; solo se eliminan desde
+        # `eliminar_definitivo` cuando ya no tienen referencias
+        if not self.es_nombre_por_contenido(name):
+            super().delete(name)
+
+    def eliminar_definitivo(self, name):
+        super().delete(name)
+
+
+def almacenamiento_archivos():
+    """Storage de los certificados e imágenes de los perfiles"""
+    if settings.ARCHIVOS_DEDUPLICADOS:
+        return contenido_storage
+    return default_storage
+
+
+contenido_storage = ContenidoHashStorage()
+
+
+def campos_deduplicados(modelo):
+    """Nombres de los campos de archivo del modelo que usan el storage por contenido"""
+    return [
+        campo.name for campo in modelo._meta.get_fields()
+        if isinstance(campo, FileField) and isinstance(campo.storage, ContenidoHashStorage)
+    ]
+
+
+def registrar_archivo(nombre, sha256, tamano):
+    """Crea la fila del archivo si aún no existe, sin referencias"""
+    from .models import ArchivoContenido
+
+    archivo, creado = ArchivoContenido.objects.get_or_create(
+        nombre=nombre,
+        defaults={'sha256': sha256, 'tamano': tamano},
+    )
+    if not creado:
+        # Contenido ya conocido, quizá sin referencias desde hace tiempo: la
+        # limpieza de huérfanos no lo borra mientras el registro se guarda
+        ArchivoContenido.objects.filter(pk=archivo.pk).update(fecha_actualizacion=timezone.now())
+
+
+def ajustar_referencias(nombres, delta):
+    """Suma `delta` a las referencias de cada archivo de `nombres`"""
+    from .models import ArchivoContenido
+
+    nombres = [n for n in nombres if contenido_storage.es_nombre_por_contenido(n)]
+    for nombre in nombres:
+        ArchivoContenido.objects.filter(nombre=nombre).update(
+            referencias=F('referencias') + delta, fecha_actualizacion=timezone.now()
+        )
@@ -0,0 +1,34 @@
+"""
+Cuerpos de respuesta en streaming para WSGI y ASGI.
+
+Con un iterador síncrono, `StreamingHttpResponse` bajo ASGI lo consume
+entero con `sync_to_async(list)` antes de enviar el primer byte. Bajo ASGI
+los bloques se leen de uno en uno en un hilo del pool, así el ZIP de
+certificados o un archivo de MEDIA no se cargan completos en memoria.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+FIN = object()
+
+
+async def aiterar(bloques):
+    """Recorre un iterador síncrono de bloques sin bloquear el event loop"""
+    bloques = iter(bloques)
+    # Fuera del hilo compartido del ORM: leer un bloque no encola a las
+    # demás vistas síncronas del proceso
+    siguiente = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (bloque := await siguiente(bloques, FIN)) is not FIN:
+            yield bloque
+    finally:
+        # Cliente desconectado a mitad: se cierran archivos abiertos
+        if hasattr(bloques, 'close'):
+            await sync_to_async(bloques.close, thread_sensitive=False)()
+
+
+def cuerpo_streaming(request, bloques):
+    """El iterador de bloques en la forma que el servidor consume en streaming"""
+    if isinstance(request, ASGIRequest):
+        return aiterar(bloques)
+    return bloques
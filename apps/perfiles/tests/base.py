@@ -0,0 +1,55 @@
+"""
+Utilidades compartidas por las pruebas.
+
+Las plantillas de página (`perfil_publico.html`, `venta_garage.html`, ...) no
+viven en este repositorio; `templates/` trae versiones mínimas que incluyen
+las secciones reales para poder renderizar las vistas.
+"""
+import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.perfiles.models import DatosPersonales
+
+PLANTILLAS = Path(__file__).resolve().parent / 'templates'
+
+
+def ajustes_prueba(**ajustes):
+    """
+    `override_settings` con las plantillas de prueba, sin redirección a HTTPS
+    y sin el manifiesto de estáticos (no se corre collectstatic)
+    """
+    plantillas = dict(settings.TEMPLATES[0])
+    plantillas['DIRS'] = [*plantillas['DIRS'], PLANTILLAS]
+    return override_settings(
+        SECURE_SSL_REDIRECT=False,
+        TEMPLATES=[plantillas],
+        STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+        VISITAS_ACTIVAS=False,
+        **ajustes,
+    )
+
+
+def crear_perfil(cedula='0102030405', **campos):
+    datos = {
+        'descripcion_perfil': 'Desarrollador',
+        'nombres': 'José',
+        'apellidos': 'Pérez',
+        'fecha_nacimiento': datetime.date(1990, 1, 1),
+        'sexo': 'H',
+        'estado_civil': 'Soltero/a',
+        'direccion_domiciliaria': 'Calle 1',
+    }
+    datos.update(campos)
+    return DatosPersonales.objects.create(numero_cedula=cedula, **datos)
+
+
+@ajustes_prueba()
+class PruebaBase(TestCase):
+    """TestCase con las plantillas de prueba y la caché vacía en cada prueba"""
+
+    def setUp(self):
+        cache.clear()
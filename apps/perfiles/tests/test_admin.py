@@ -0,0 +1,103 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.forms import CheckboxInput, FileInput
+from django.test.utils import CaptureQueriesContext
+
+from apps.perfiles.models import ExperienciaLaboral
+
+from .base import PruebaBase, crear_perfil
+
+
+def datos_formulario(response):
+    """POST que enviaría el navegador con el formulario de cambio tal como se muestra"""
+    formularios = [response.context['adminform'].form]
+    for inline in response.context['inline_admin_formsets']:
+        formularios += [inline.formset.management_form, *inline.formset.forms]
+    datos = {}
+    for formulario in formularios:
+        for campo in formulario:
+            valor = campo.value()
+            widget = campo.field.widget
+            if isinstance(widget, FileInput):
+                continue
+            if isinstance(widget, CheckboxInput):
+                if valor:
+                    datos[campo.html_name] = 'on'
+                continue
+            datos[campo.html_name] = '' if valor is None else str(valor)
+    return datos
+
+
+class InlinePaginadoTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        self.perfil = crear_perfil()
+        ExperienciaLaboral.objects.bulk_create(
+            ExperienciaLaboral(
+                perfil=self.perfil, cargo_desempenado=f'Cargo {numero}', nombre_empresa='ACME',
+                lugar_empresa='Quito', descripcion_funciones='x',
+                fecha_inicio_gestion=datetime.date(2000, 1, 1) + datetime.timedelta(days=numero),
+            )
+            for numero in range(25)
+        )
+        self.url = f'/admin/perfiles/datospersonales/{self.perfil.pk}/change/'
+
+    def formset(self, response):
+        return next(
+            inline.formset for inline in response.context['inline_admin_formsets']
+            if inline.formset.model is ExperienciaLaboral
+        )
+
+    def filas(self, excepto):
+        return list(ExperienciaLaboral.objects.exclude(pk=excepto).order_by('pk').values())
+
+    def test_guardar_la_segunda_pagina_sin_tocar_la_primera(self):
+        response = self.client.get(self.url, {'experiencias-pagina': 2})
+        formset = self.formset(response)
+        self.assertEqual(formset.pagina.number, 2)
+        self.assertEqual(len(formset.forms), 5)
+        en_pagina = [form.instance.pk for form in formset.forms]
+
+        antes = self.filas(excepto=en_pagina[0])
+        datos = datos_formulario(response)
+        prefijo = formset.prefix
+        self.assertEqual(datos[f'{prefijo}-TOTAL_FORMS'], '5')
+        datos[f'{prefijo}-0-cargo_desempenado'] = 'Cargo editado'
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(f'{self.url}?{prefijo}-pagina=2', datos)
+        self.assertEqual(response.status_code, 302)
+
+        editada = ExperienciaLaboral.objects.get(pk=en_pagina[0])
+        self.assertEqual(editada.cargo_desempenado, 'Cargo editado')
+        tabla = ExperienciaLaboral._meta.db_table
+        actualizaciones = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith(f'UPDATE "{tabla}"')
+        ]
+        self.assertEqual(len(actualizaciones), 1)
+        # Las otras 24 experiencias siguen igual, dentro y fuera de la página
+        self.assertEqual(self.filas(excepto=editada.pk), antes)
+
+    def test_filas_sin_cambios_no_se_validan(self):
+        # Un registro que ya no pasaría la validación no impide guardar otro
+        invalida = ExperienciaLaboral.objects.order_by('-fecha_inicio_gestion').first()
+        ExperienciaLaboral.objects.filter(pk=invalida.pk).update(
+            fecha_fin_gestion=datetime.date(1990, 1, 1)
+        )
+        response = self.client.get(self.url)
+        formset = self.formset(response)
+        self.assertIn(invalida.pk, [form.instance.pk for form in formset.forms])
+        datos = datos_formulario(response)
+        indice = next(i for i, form in enumerate(formset.forms) if form.instance.pk != invalida.pk)
+        datos[f'{formset.prefix}-{indice}-cargo_desempenado'] = 'Cargo editado'
+
+        response = self.client.post(self.url, datos)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ExperienciaLaboral.objects.filter(cargo_desempenado='Cargo editado').count(), 1)
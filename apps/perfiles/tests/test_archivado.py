@@ -0,0 +1,116 @@
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+
+from apps.perfiles import archivado
+from apps.perfiles.busqueda import indice
+from apps.perfiles.cache import obtener_version_perfil
+from apps.perfiles.models import (
+    ArchivoContenido, DatosPersonales, ExperienciaLaboral, PerfilArchivado,
+    VentaGarage, VisitaDiaria,
+)
+
+from .base import PruebaBase, crear_perfil
+
+
+class ArchivadoTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.activo = crear_perfil('0000000001', nombres='Ana')
+        self.inactivo = crear_perfil('0000000002', nombres='Zoila', perfil_activo=False)
+        # El mismo certificado en los dos perfiles: un solo archivo, dos referencias
+        for perfil in (self.activo, self.inactivo):
+            ExperienciaLaboral.objects.create(
+                perfil=perfil, cargo_desempenado='Analista', nombre_empresa='ACME',
+                lugar_empresa='Quito', fecha_inicio_gestion=datetime.date(2020, 1, 1),
+                descripcion_funciones='x',
+                ruta_certificado=SimpleUploadedFile('certificado.pdf', b'%PDF compartido'),
+            )
+        VentaGarage.objects.create(
+            perfil=self.inactivo, nombre_producto='Bicicleta', estado_producto='Bueno',
+            descripcion='Rodado 26', valor_del_bien=80,
+        )
+        VisitaDiaria.objects.create(
+            perfil=self.inactivo, fecha=datetime.date(2024, 1, 1), tipo='perfil', total=7,
+        )
+        self.archivo = ArchivoContenido.objects.get()
+        indice.construir()
+
+    def filas_del_inactivo(self):
+        perfil_id = self.inactivo.pk
+        return {
+            'perfil': list(DatosPersonales.objects.filter(pk=perfil_id).values()),
+            'experiencias': list(ExperienciaLaboral.objects.filter(perfil_id=perfil_id).values()),
+            'ventas': list(VentaGarage.objects.filter(perfil_id=perfil_id).values()),
+            'visitas': list(VisitaDiaria.objects.filter(perfil_id=perfil_id).values()),
+        }
+
+    def referencias(self):
+        return ArchivoContenido.objects.get(pk=self.archivo.pk).referencias
+
+    def en_indice(self):
+        return self.inactivo.pk in {p.pk for p in indice.buscar('zoila', incluir_inactivos=True)}
+
+    def test_archivar_y_restaurar(self):
+        filas = self.filas_del_inactivo()
+        self.assertEqual(self.referencias(), 2)
+        self.assertTrue(self.en_indice())
+        version = obtener_version_perfil(self.inactivo.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archivar_perfiles', stdout=StringIO())
+
+        registro = PerfilArchivado.objects.get()
+        self.assertEqual(registro.perfil_id_original, self.inactivo.pk)
+        self.assertEqual(registro.registros, 4)
+        self.assertEqual(registro.archivos, [self.archivo.nombre])
+        self.assertEqual(
+            self.filas_del_inactivo(),
+            {'perfil': [], 'experiencias': [], 'ventas': [], 'visitas': []},
+        )
+        self.assertTrue(DatosPersonales.objects.filter(pk=self.activo.pk).exists())
+        # El archivo conserva la referencia del registro archivado
+        self.assertEqual(self.referencias(), 2)
+        self.assertNotEqual(obtener_version_perfil(self.inactivo.pk), version)
+        self.assertFalse(self.en_indice())
+
+        version = obtener_version_perfil(self.inactivo.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archivar_perfiles', restaurar=['0000000002'], stdout=StringIO())
+
+        self.assertEqual(self.filas_del_inactivo(), filas)
+        self.assertFalse(PerfilArchivado.objects.exists())
+        self.assertEqual(self.referencias(), 2)
+        self.assertNotEqual(obtener_version_perfil(self.inactivo.pk), version)
+        self.assertTrue(self.en_indice())
+
+    def test_no_archiva_un_perfil_reactivado_antes_del_bloqueo(self):
+        archivar_lote = archivado.archivar_lote
+
+        def reactivar_y_archivar(perfiles):
+            # Otro proceso reactiva el perfil entre la lectura de ids y el bloqueo
+            DatosPersonales.objects.filter(pk=self.inactivo.pk).update(perfil_activo=True)
+            return archivar_lote(perfiles)
+
+        with mock.patch.object(archivado, 'archivar_lote', side_effect=reactivar_y_archivar):
+            self.assertEqual(archivado.archivar_inactivos(), 0)
+
+        self.assertTrue(DatosPersonales.objects.filter(pk=self.inactivo.pk).exists())
+        self.assertFalse(PerfilArchivado.objects.exists())
+
+    def test_archivar_lote_ignora_perfiles_activos(self):
+        self.assertEqual(len(archivado.archivar_lote(DatosPersonales.objects.all())), 1)
+        self.assertTrue(DatosPersonales.objects.filter(pk=self.activo.pk).exists())
@@ -0,0 +1,126 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+
+from apps.perfiles.busqueda import CLAVE_VERSION, IndicePerfiles, indice
+from apps.perfiles.limites import bucket_busqueda
+from apps.perfiles.models import VentaGarage
+
+from .base import PruebaBase, crear_perfil
+
+
+class IndiceSenalesTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        indice.construir()
+
+    def version(self):
+        return cache.get(CLAVE_VERSION, 0)
+
+    def test_venta_garage_no_cambia_el_indice(self):
+        antes = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = VentaGarage.objects.create(
+                perfil=self.perfil, nombre_producto='Bicicleta', estado_producto='Bueno',
+                descripcion='Rodado 26', valor_del_bien=80,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            venta.delete()
+        self.assertEqual(self.version(), antes)
+
+    def test_datos_personales_actualizan_el_indice(self):
+        antes = self.version()
+        self.perfil.apellidos = 'Zambrano'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.save()
+        self.assertEqual(self.version(), antes + 1)
+        self.assertEqual([p.pk for p in indice.buscar('zamb')], [self.perfil.pk])
+
+
+class BusquedaAdminTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.ana = crear_perfil('0000000001', nombres='Ana', apellidos='Pérez')
+        self.mariana = crear_perfil('0000000002', nombres='Mariana', apellidos='López')
+        self.otro = crear_perfil('0000000003', nombres='Carlos', apellidos='Ruiz')
+        indice.construir()
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+
+    def buscar(self, texto):
+        response = self.client.get('/admin/perfiles/datospersonales/', {'q': texto})
+        self.assertEqual(response.status_code, 200)
+        return {perfil.pk for perfil in response.context['cl'].result_list}
+
+    def test_subcadena_en_medio_de_palabra(self):
+        # El índice encuentra "Ana" por prefijo; "Mariana" solo por subcadena
+        self.assertEqual(self.buscar('ana'), {self.ana.pk, self.mariana.pk})
+        self.assertEqual(self.buscar('ria'), {self.mariana.pk})
+
+    def test_prefijo_sin_tildes(self):
+        self.assertEqual(self.buscar('perez'), {self.ana.pk})
+
+    def test_cedula(self):
+        self.assertEqual(self.buscar('0000000003'), {self.otro.pk})
+
+
+class BusquedaPublicaTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        bucket_busqueda._locales.clear()
+        self.addCleanup(bucket_busqueda._locales.clear)
+        self.ana = crear_perfil('0102030405', nombres='Ana', apellidos='Pérez')
+        crear_perfil('0102039999', nombres='Luis', apellidos='Mora')
+        indice.construir()
+
+    def buscar(self, texto):
+        response = self.client.get('/perfil/buscar/', {'q': texto})
+        self.assertEqual(response.status_code, 200)
+        return [resultado['cedula'] for resultado in response.json()['resultados']]
+
+    def test_cedula_solo_completa(self):
+        for prefijo in ('0', '0102', '010203040'):
+            with self.subTest(prefijo=prefijo):
+                self.assertEqual(self.buscar(prefijo), [])
+        self.assertEqual(self.buscar('0102030405'), ['0102030405'])
+        self.assertEqual(self.buscar('ana 0102030405'), ['0102030405'])
+        self.assertEqual(self.buscar('ana 0102'), [])
+        self.assertEqual(self.buscar('ana'), ['0102030405'])
+
+    def test_staff_busca_por_prefijo_de_cedula(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        self.assertEqual(sorted(self.buscar('0102')), ['0102030405', '0102039999'])
+
+    @override_settings(NUM_PROXIES=0)
+    def test_limite_de_tasa_por_ip(self):
+        with mock.patch.object(bucket_busqueda, 'capacidad', 3):
+            estados = [
+                self.client.get('/perfil/buscar/', {'q': 'ana'}).status_code for _ in range(4)
+            ]
+        self.assertEqual(estados, [200, 200, 200, 429])
+
+    def test_primera_construccion_una_sola_vez(self):
+        nuevo = IndicePerfiles()
+        llamadas = []
+
+        def construir(filas=None):
+            llamadas.append(threading.current_thread())
+            time.sleep(0.05)
+            nuevo.construido = True
+
+        with mock.patch.object(nuevo, 'construir', construir):
+            hilos = [threading.Thread(target=nuevo.buscar, args=('ana',)) for _ in range(5)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        self.assertEqual(len(llamadas), 1)
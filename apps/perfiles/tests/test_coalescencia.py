@@ -0,0 +1,61 @@
+import asyncio
+
+from django.core.cache import cache
+
+from apps.perfiles.coalescencia import clave_candado, obtener_o_generar
+
+from .base import PruebaBase
+
+
+class CoalescenciaTests(PruebaBase):
+
+    async def test_una_sola_generacion(self):
+        llamadas = []
+
+        async def generar():
+            llamadas.append(1)
+            await asyncio.sleep(0.05)
+            return b'pdf'
+
+        valores = await asyncio.gather(
+            *[obtener_o_generar('pdf:prueba', generar, 60) for _ in range(5)]
+        )
+        self.assertEqual(valores, [b'pdf'] * 5)
+        self.assertEqual(len(llamadas), 1)
+
+    async def test_cancelar_al_lider_no_cancela_a_los_que_esperan(self):
+        empezo = asyncio.Event()
+
+        async def lento():
+            empezo.set()
+            await asyncio.sleep(10)
+            return b'lider'
+
+        async def rapido():
+            return b'seguidor'
+
+        lider = asyncio.create_task(obtener_o_generar('pdf:prueba', lento, 60))
+        await empezo.wait()
+        seguidores = [
+            asyncio.create_task(obtener_o_generar('pdf:prueba', rapido, 60))
+            for _ in range(3)
+        ]
+        # Los seguidores quedan esperando el resultado del líder
+        await asyncio.sleep(0.05)
+        lider.cancel()
+
+        self.assertEqual(await asyncio.gather(*seguidores), [b'seguidor'] * 3)
+        with self.assertRaises(asyncio.CancelledError):
+            await lider
+        self.assertIsNone(await cache.aget(clave_candado('pdf:prueba')))
+
+    async def test_error_del_lider_llega_a_los_que_esperan(self):
+        async def falla():
+            await asyncio.sleep(0.05)
+            raise ValueError('sin motor de PDF')
+
+        resultados = await asyncio.gather(
+            *[obtener_o_generar('pdf:prueba', falla, 60) for _ in range(3)],
+            return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(r, ValueError) for r in resultados))
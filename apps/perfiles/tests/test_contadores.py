@@ -0,0 +1,94 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.perfiles import contadores
+from apps.perfiles.models import VisitaDiaria
+
+from .base import PruebaBase, crear_perfil
+
+
+@override_settings(VISITAS_ACTIVAS=True)
+class VolcadoVisitasTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        contadores._buffer.clear()
+        self.addCleanup(contadores._buffer.clear)
+        # Sin hilo de volcado (cada prueba vacía el buffer a mano) y sin cerrar
+        # la conexión, que cortaría la transacción de la prueba (PostgreSQL)
+        for nombre in ('iniciar_hilo', 'close_old_connections'):
+            parche = mock.patch.object(contadores, nombre)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.perfil = crear_perfil()
+        self.otro = crear_perfil('0000000002')
+
+    def visitas(self, perfil, tipo, veces):
+        for _ in range(veces):
+            contadores.registrar_visita(perfil.pk, tipo)
+
+    def totales(self):
+        return {
+            (visita.perfil_id, visita.tipo): visita.total
+            for visita in VisitaDiaria.objects.filter(fecha=timezone.localdate())
+        }
+
+    def inserts(self, consultas):
+        return [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('INSERT')]
+
+    def test_volcado_suma_a_las_filas_existentes(self):
+        self.visitas(self.perfil, 'perfil', 3)
+        self.visitas(self.perfil, 'pdf', 1)
+        self.assertEqual(contadores.vaciar_visitas(), 2)
+        self.assertEqual(self.totales(), {(self.perfil.pk, 'perfil'): 3, (self.perfil.pk, 'pdf'): 1})
+        self.assertEqual(contadores._buffer, {})
+
+        self.visitas(self.perfil, 'perfil', 2)
+        self.visitas(self.otro, 'garage', 4)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(contadores.vaciar_visitas(), 2)
+        # Filas nuevas y existentes en un solo INSERT ... ON CONFLICT
+        self.assertEqual(len(self.inserts(consultas)), 1)
+        self.assertEqual(self.totales(), {
+            (self.perfil.pk, 'perfil'): 5, (self.perfil.pk, 'pdf'): 1, (self.otro.pk, 'garage'): 4,
+        })
+        self.assertEqual(contadores.vaciar_visitas(), 0)
+
+    def test_upsert_por_lotes(self):
+        dias = [datetime.date(2024, 1, dia) for dia in range(1, 6)]
+        filas = [(self.perfil.pk, dia, 'perfil', 1) for dia in dias]
+        with CaptureQueriesContext(connection) as consultas:
+            contadores.upsert_visitas(VisitaDiaria, filas, lote=2)
+            contadores.upsert_visitas(VisitaDiaria, filas, lote=2)
+        self.assertEqual(len(self.inserts(consultas)), 6)
+        self.assertEqual(
+            list(VisitaDiaria.objects.order_by('fecha').values_list('fecha', 'total')),
+            [(dia, 2) for dia in dias],
+        )
+
+    def test_descarta_perfiles_eliminados(self):
+        self.visitas(self.perfil, 'perfil', 1)
+        self.visitas(self.otro, 'perfil', 1)
+        self.otro.delete()
+        self.assertEqual(contadores.vaciar_visitas(), 1)
+        self.assertEqual(self.totales(), {(self.perfil.pk, 'perfil'): 1})
+
+    def test_error_devuelve_los_conteos_al_buffer(self):
+        self.visitas(self.perfil, 'perfil', 3)
+        with mock.patch.object(contadores, 'upsert_visitas', side_effect=RuntimeError), \
+                self.assertLogs(contadores.logger, 'ERROR'):
+            self.assertEqual(contadores.vaciar_visitas(), 0)
+        self.visitas(self.perfil, 'perfil', 1)
+
+        self.assertEqual(contadores.vaciar_visitas(), 1)
+        self.assertEqual(self.totales(), {(self.perfil.pk, 'perfil'): 4})
+
+    @override_settings(VISITAS_ACTIVAS=False)
+    def test_desactivadas_no_acumulan(self):
+        self.visitas(self.perfil, 'perfil', 1)
+        self.assertEqual(contadores._buffer, {})
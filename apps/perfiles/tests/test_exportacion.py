@@ -0,0 +1,77 @@
+import tempfile
+from concurrent.futures import Future
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from apps.perfiles import contadores
+from apps.perfiles.limites import bucket_global, bucket_ip
+from apps.perfiles.management.commands import exportar_estatico
+from apps.perfiles.management.commands.exportar_estatico import exportar_perfil
+
+from .base import PruebaBase, crear_perfil
+
+
+class EjecutorEnProceso:
+    """
+    Reemplazo de `ProcessPoolExecutor` que ejecuta cada tarea al enviarla:
+    los procesos hijos no verían la base de datos de prueba en memoria
+    """
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        try:
+            futuro.set_result(funcion(*args))
+        except Exception as exc:
+            futuro.set_exception(exc)
+        return futuro
+
+
+class ExportacionTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.destino = tempfile.TemporaryDirectory()
+        self.addCleanup(self.destino.cleanup)
+        # En proceso, cerrar las conexiones cortaría la transacción de la prueba
+        # (PostgreSQL); SQLite en memoria ya ignora el cierre
+        cerrar = mock.patch.object(exportar_estatico.connections, 'close_all')
+        cerrar.start()
+        self.addCleanup(cerrar.stop)
+
+    @override_settings(VISITAS_ACTIVAS=True)
+    def test_exportar_no_cuenta_visitas(self):
+        crear_perfil()
+        self.addCleanup(contadores._buffer.clear)
+        contadores._buffer.clear()
+
+        _, archivos = exportar_perfil('0102030405', self.destino.name)
+
+        self.assertEqual(len(archivos), 3)
+        self.assertTrue((Path(self.destino.name) / 'perfil/0102030405/cv.pdf').exists())
+        self.assertEqual(contadores._buffer, {})
+
+    def test_exportar_mas_perfiles_que_la_capacidad_del_limite(self):
+        total = max(bucket_ip.capacidad, bucket_global.capacidad) + 2
+        for numero in range(total):
+            crear_perfil(f'{numero:010d}')
+
+        salida = StringIO()
+        with mock.patch.object(exportar_estatico, 'ProcessPoolExecutor', EjecutorEnProceso):
+            call_command('exportar_estatico', destino=self.destino.name, procesos=1, stdout=salida)
+
+        self.assertIn(f'{total} perfiles reconstruidos', salida.getvalue())
+        for numero in range(total):
+            self.assertTrue((Path(self.destino.name) / f'perfil/{numero:010d}/cv.pdf').exists())
@@ -0,0 +1,95 @@
+import datetime
+import marshal
+import pickle
+import shutil
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from apps.perfiles import instantanea
+from apps.perfiles.cache import obtener_version_perfil
+from apps.perfiles.instantanea import Archivo, InstantaneaCV
+from apps.perfiles.models import CursoRealizado, ExperienciaLaboral, ProductoLaboral
+
+from .base import PruebaBase, crear_perfil
+
+
+class InstantaneaTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.perfil = crear_perfil(telefono_fijo='+593987654321', sitio_web='')
+        self.experiencia = ExperienciaLaboral.objects.create(
+            perfil=self.perfil, cargo_desempenado='Analista', nombre_empresa='ACME',
+            lugar_empresa='Quito', fecha_inicio_gestion=datetime.date(2019, 1, 1),
+            descripcion_funciones='x',
+            ruta_certificado=SimpleUploadedFile('certificado.pdf', b'%PDF'),
+        )
+        ExperienciaLaboral.objects.create(
+            perfil=self.perfil, cargo_desempenado='Oculta', nombre_empresa='ACME',
+            lugar_empresa='Quito', fecha_inicio_gestion=datetime.date(2015, 1, 1),
+            fecha_fin_gestion=datetime.date(2016, 3, 1), descripcion_funciones='x',
+            activar_para_que_se_vea_en_front=False,
+        )
+        CursoRealizado.objects.create(
+            perfil=self.perfil, nombre_curso='Django', total_horas=10,
+            fecha_inicio=datetime.date(2020, 1, 1), fecha_fin=datetime.date(2020, 1, 2),
+            descripcion_curso='c', entidad_patrocinadora='Universidad',
+        )
+        ProductoLaboral.objects.create(
+            perfil=self.perfil, nombre_producto='Sistema',
+            fecha_producto=datetime.date(2021, 6, 1), descripcion='d',
+        )
+
+    def construir(self):
+        secciones = {
+            nombre: list(queryset) for nombre, queryset in self.perfil.secciones_visibles().items()
+        }
+        return InstantaneaCV.desde_perfil(self.perfil, secciones)
+
+    def test_ida_y_vuelta(self):
+        original = self.construir()
+        copia = InstantaneaCV.deserializar(original.serializar())
+
+        self.assertEqual(copia, original)
+        self.assertEqual(copia.perfil.fecha_nacimiento, self.perfil.fecha_nacimiento)
+        self.assertEqual(copia.perfil.telefono_fijo, '+593987654321')
+        self.assertIsNone(copia.perfil.foto_perfil)
+        self.assertEqual(
+            [len(registros) for registros in copia.secciones().values()], [1, 1, 0, 0, 1]
+        )
+        experiencia = copia.experiencias[0]
+        self.assertEqual(experiencia.ruta_certificado, Archivo(self.experiencia.ruta_certificado.url))
+        self.assertIsNone(experiencia.fecha_fin_gestion)
+        # Los mismos cálculos que los modelos, para las plantillas y el PDF
+        self.assertEqual(copia.perfil.get_edad(), self.perfil.get_edad())
+        self.assertEqual(experiencia.get_duracion(), self.experiencia.get_duracion())
+
+    def test_cabecera_distinta_se_rechaza(self):
+        contenido = self.construir().serializar()
+        cuerpo = contenido[len(instantanea.CABECERA):]
+        otro_formato = b'CV' + bytes([instantanea.FORMATO + 1, marshal.version]) + cuerpo
+        otro_marshal = b'CV' + bytes([instantanea.FORMATO, marshal.version + 1]) + cuerpo
+        for invalido in (None, b'', cuerpo, otro_formato, otro_marshal, pickle.dumps(self.perfil)):
+            with self.subTest(invalido=invalido[:4] if invalido else invalido):
+                self.assertIsNone(InstantaneaCV.deserializar(invalido))
+
+    def test_entrada_con_otro_formato_se_reconstruye(self):
+        clave = instantanea.clave_instantanea(self.perfil.pk, obtener_version_perfil(self.perfil.pk))
+        cache.set(clave, b'CV\x00\x00basura')
+
+        construida = async_to_sync(instantanea.aobtener_instantanea)(self.perfil)
+
+        self.assertEqual(construida, self.construir())
+        self.assertEqual(InstantaneaCV.deserializar(cache.get(clave)), construida)
+        with self.assertNumQueries(0):
+            async_to_sync(instantanea.aobtener_instantanea)(self.perfil)
@@ -0,0 +1,68 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncClient
+
+from apps.perfiles import views
+from apps.perfiles.limites import TokenBucket
+
+from .base import PruebaBase
+
+
+class TokenBucketCacheTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.bucket = TokenBucket('prueba', capacidad=3, tasa=0.001)
+        self.candado = 'limite:prueba:1.2.3.4:candado'
+
+    def test_capacidad_compartida(self):
+        resultados = [self.bucket.consumir_en_cache('1.2.3.4')[0] for _ in range(4)]
+        self.assertEqual(resultados, [True, True, True, False])
+        self.assertIsNone(cache.get(self.candado))
+
+    def test_candado_ocupado_rechaza_sin_bucket_local(self):
+        cache.add(self.candado, 'otro worker', timeout=2)
+
+        # Con una caché compartida (no LocMemCache)
+        with mock.patch('apps.perfiles.limites.caches', {'default': object()}):
+            permitido, espera = self.bucket.consumir('1.2.3.4')
+
+        self.assertFalse(permitido)
+        self.assertGreater(espera, 0)
+        self.assertEqual(self.bucket._locales, {})
+        self.assertEqual(cache.get(self.candado), 'otro worker')
+
+    def test_no_libera_el_candado_de_otro(self):
+        recargar = self.bucket.recargar
+
+        def candado_expirado(estado, ahora):
+            # El candado expiró durante la sección crítica y otro lo tomó
+            cache.set(self.candado, 'otro worker', timeout=2)
+            return recargar(estado, ahora)
+
+        with mock.patch.object(self.bucket, 'recargar', side_effect=candado_expirado):
+            permitido, _ = self.bucket.consumir_en_cache('1.2.3.4')
+
+        self.assertTrue(permitido)
+        self.assertEqual(cache.get(self.candado), 'otro worker')
+
+
+class LimiteVistaPDFTests(PruebaBase):
+
+    async def test_limite_fuera_del_hilo_compartido(self):
+        hilos = []
+
+        def verificar_limite_tasa(request):
+            hilos.append(threading.current_thread())
+            return HttpResponse(status=429)
+
+        with mock.patch.object(views, 'verificar_limite_tasa', verificar_limite_tasa):
+            response = await AsyncClient().get('/perfil/0102030405/pdf/')
+
+        self.assertEqual(response.status_code, 429)
+        # En las pruebas el hilo compartido de sync_to_async es el principal
+        self.assertEqual(len(hilos), 1)
+        self.assertIsNot(hilos[0], threading.main_thread())
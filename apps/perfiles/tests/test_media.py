@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import AsyncClient, override_settings
+
+from apps.perfiles import media
+from apps.perfiles.media import parsear_rango
+
+from .base import PruebaBase
+
+
+class MediaTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media, MEDIA_DESCARGA='')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.contenido = bytes(range(256)) * 40
+        self.escribir('certificados/curso.pdf', self.contenido)
+
+    def escribir(self, nombre, contenido):
+        ruta = Path(self.media) / nombre
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(contenido)
+
+    def get(self, ruta, **cabeceras):
+        response = self.client.get(f'/media/{ruta}', **cabeceras)
+        self.addCleanup(response.close)
+        return response
+
+    def test_completo(self):
+        response = self.get('certificados/curso.pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.contenido)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_rango_parcial(self):
+        response = self.get('certificados/curso.pdf', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.contenido)}')
+        self.assertEqual(b''.join(response.streaming_content), self.contenido[100:200])
+
+    def test_rango_final(self):
+        response = self.get('certificados/curso.pdf', HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.contenido[-10:])
+
+    async def test_asgi_por_bloques(self):
+        cliente = AsyncClient()
+        tamano = len(self.contenido)
+        casos = (({}, self.contenido), ({'RANGE': 'bytes=100-5099'}, self.contenido[100:5100]))
+        with mock.patch.object(media, 'TAMANO_BLOQUE', 1000):
+            for cabeceras, esperado in casos:
+                with self.subTest(cabeceras=cabeceras):
+                    response = await cliente.get('/media/certificados/curso.pdf', **cabeceras)
+                    # Iterador asíncrono: Django no lee el archivo entero antes de enviarlo
+                    self.assertTrue(response.is_async)
+                    bloques = [bloque async for bloque in response.streaming_content]
+                    self.assertEqual(b''.join(bloques), esperado)
+                    self.assertEqual(len(bloques), -(-len(esperado) // 1000))
+                    self.assertEqual(response['Content-Length'], str(len(esperado)))
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-5099/{tamano}')
+
+    def test_rango_invalido(self):
+        tamano = len(self.contenido)
+        response = self.get('certificados/curso.pdf', HTTP_RANGE=f'bytes={tamano}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{tamano}')
+
+    def test_rango_final_de_archivo_vacio(self):
+        self.assertIs(parsear_rango('bytes=-10', 0), False)
+        self.escribir('vacio.pdf', b'')
+        response = self.get('vacio.pdf', HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_nombre_de_descarga_escapado(self):
+        self.escribir('otros/informe "final".zip', b'zip')
+        response = self.get('otros/informe%20%22final%22.zip')
+        self.assertEqual(response['Content-Disposition'], r'attachment; filename="informe \"final\".zip"')
+
+        self.escribir('otros/año.zip', b'zip')
+        response = self.get('otros/a%C3%B1o.zip')
+        self.assertEqual(response['Content-Disposition'], "attachment; filename*=utf-8''a%C3%B1o.zip")
+
+    @override_settings(MEDIA_DESCARGA='x-accel', MEDIA_ACCEL_PREFIJO='/media-interna/')
+    def test_x_accel_redirect_codificado(self):
+        self.escribir('otros/mi certificado ñ.pdf', b'pdf')
+        response = self.get('otros/mi%20certificado%20%C3%B1.pdf')
+        self.assertEqual(response['X-Accel-Redirect'], '/media-interna/otros/mi%20certificado%20%C3%B1.pdf')
@@ -0,0 +1,150 @@
+import base64
+import datetime
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+
+from apps.perfiles import mercado
+from apps.perfiles.models import VentaGarage
+
+from .base import PruebaBase, crear_perfil
+
+MOMENTO = timezone.make_aware(datetime.datetime(2024, 3, 1, 12, 0))
+FILTROS = {'orden': 'recientes', 'estado': None, 'precio_min': None, 'precio_max': None}
+
+
+class MercadoBase(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def venta(self, valor, estado='Bueno', hace=0, perfil=None, visible=True):
+        venta = VentaGarage.objects.create(
+            perfil=perfil or self.perfil, nombre_producto='Bicicleta', estado_producto=estado,
+            descripcion='d', valor_del_bien=valor, activar_para_que_se_vea_en_front=visible,
+        )
+        # auto_now_add: la fecha se fija después para forzar empates
+        VentaGarage.objects.filter(pk=venta.pk).update(
+            fecha_creacion=MOMENTO - datetime.timedelta(hours=hace)
+        )
+        venta.refresh_from_db()
+        return venta
+
+    async def recorrer(self, por_pagina, **filtros):
+        """Todas las páginas: (ids en orden, tamaños de página)"""
+        filtros = {**FILTROS, **filtros}
+        ids, tamanos, token = [], [], None
+        # Un cursor que no avanza repetiría páginas para siempre
+        for _ in range(50):
+            pagina, token = await mercado.apagina(filtros, token, por_pagina)
+            ids += [articulo.pk for articulo in pagina]
+            tamanos.append(len(pagina))
+            if token is None:
+                return ids, tamanos
+        self.fail('la paginación no termina')
+
+
+class PaginacionMercadoTests(MercadoBase):
+
+    def setUp(self):
+        super().setUp()
+        # Empates en el precio y en la fecha de creación
+        self.ventas = [
+            self.venta(10), self.venta(10), self.venta(10, hace=1),
+            self.venta(20, 'Regular', hace=1), self.venta(20, hace=2),
+            self.venta(30, 'Regular'), self.venta(5, hace=3),
+        ]
+        self.venta(1, visible=False)
+        self.venta(1, perfil=crear_perfil('0000000009', perfil_activo=False))
+
+    def esperados(self, orden, estado=None):
+        ventas = [v for v in self.ventas if estado in (None, v.estado_producto)]
+        claves = {
+            'recientes': lambda v: (v.fecha_creacion, v.pk),
+            'precio_asc': lambda v: (v.valor_del_bien, v.pk),
+            'precio_desc': lambda v: (v.valor_del_bien, v.pk),
+        }
+        ordenadas = sorted(ventas, key=claves[orden], reverse=orden != 'precio_asc')
+        return [venta.pk for venta in ordenadas]
+
+    async def test_paginas_con_empates_sin_repetir_ni_saltar(self):
+        for orden in mercado.ORDENES:
+            for por_pagina in (1, 2, 3, 7):
+                with self.subTest(orden=orden, por_pagina=por_pagina):
+                    ids, tamanos = await self.recorrer(por_pagina, orden=orden)
+                    self.assertEqual(ids, self.esperados(orden))
+                    self.assertTrue(all(tamano == por_pagina for tamano in tamanos[:-1]))
+                    self.assertTrue(tamanos[-1])
+
+    async def test_paginas_con_filtros(self):
+        ids, _ = await self.recorrer(1, orden='precio_desc', estado='Regular')
+        self.assertEqual(ids, self.esperados('precio_desc', 'Regular'))
+        ids, _ = await self.recorrer(
+            2, orden='precio_asc', precio_min=Decimal('10'), precio_max=Decimal('20')
+        )
+        self.assertEqual(ids, self.esperados('precio_asc')[1:-1])
+
+    def test_ida_y_vuelta_del_cursor(self):
+        venta = self.ventas[0]
+        for orden, valor in (('recientes', venta.fecha_creacion), ('precio_asc', venta.valor_del_bien)):
+            with self.subTest(orden=orden):
+                token = mercado.codificar_cursor(venta, orden)
+                self.assertNotIn('=', token)
+                self.assertEqual(mercado.decodificar_cursor(token, orden), (valor, venta.pk))
+
+    async def test_token_invalido_empieza_desde_el_principio(self):
+        primera, _ = await mercado.apagina({**FILTROS, 'orden': 'precio_asc'}, None, 3)
+        de_otro_orden = mercado.codificar_cursor(self.ventas[0], 'recientes')
+        sin_id = base64.urlsafe_b64encode(b'["10", "x"]').decode()
+        for token in ('basura', '!!!', 'W10', 'e30', sin_id, de_otro_orden):
+            with self.subTest(token=token):
+                self.assertIsNone(mercado.decodificar_cursor(token, 'precio_asc'))
+                pagina, _ = await mercado.apagina({**FILTROS, 'orden': 'precio_asc'}, token, 3)
+                self.assertEqual(pagina, primera)
+
+    def test_vista(self):
+        response = self.client.get('/perfil/mercado/', {'orden': 'precio_asc', 'despues': 'basura'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [articulo.pk for articulo in response.context['articulos']],
+            self.esperados('precio_asc'),
+        )
+        self.assertIsNone(response.context['siguiente_url'])
+        self.assertEqual(response.context['primera_url'], '?orden=precio_asc')
+
+
+class FacetasMercadoTests(MercadoBase):
+
+    def facetas(self):
+        return {
+            faceta['estado_producto']: (faceta['total'], faceta['precio_min'], faceta['precio_max'])
+            for faceta in async_to_sync(mercado.afacetas)()
+        }
+
+    def test_facetas_cacheadas_hasta_un_cambio_de_venta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.venta(10)
+            regular = self.venta(40, 'Regular')
+        self.assertEqual(self.facetas(), {'Bueno': (1, 10, 10), 'Regular': (1, 40, 40)})
+        with self.assertNumQueries(0):
+            self.facetas()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.venta(15)
+        self.assertEqual(self.facetas()['Bueno'], (2, 10, 15))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            regular.activar_para_que_se_vea_en_front = False
+            regular.save()
+        self.assertEqual(self.facetas(), {'Bueno': (2, 10, 15)})
+
+    def test_facetas_cambian_al_desactivar_el_perfil(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.venta(10)
+        self.assertEqual(self.facetas(), {'Bueno': (1, 10, 10)})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.perfil_activo = False
+            self.perfil.save()
+        self.assertEqual(self.facetas(), {})
@@ -0,0 +1,64 @@
+import sys
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from apps.perfiles import pdf
+from apps.perfiles.instantanea import CLASES_SECCIONES
+
+from .base import PruebaBase, crear_perfil
+
+
+class MotorRespaldoTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        pdf._no_disponibles.clear()
+        self.addCleanup(pdf._no_disponibles.clear)
+
+    def sin_modulo(self, modulo):
+        """Simula que `modulo` no está instalado: importarlo da ImportError"""
+        return mock.patch.dict(sys.modules, {modulo: None})
+
+    def test_sin_librerias_usa_reportlab(self):
+        for nombre, modulo in (('weasyprint', 'weasyprint'), ('xhtml2pdf', 'xhtml2pdf')):
+            with self.subTest(nombre=nombre), self.sin_modulo(modulo):
+                with self.assertLogs(pdf.logger, 'WARNING') as registro:
+                    self.assertIsInstance(pdf.obtener_motor(nombre), pdf.ReportLabMotor)
+                self.assertIn(nombre, registro.output[0])
+
+                # El fallo se recuerda: ni otro aviso ni otro intento de importar
+                with mock.patch.object(pdf.MOTORES[nombre], 'cargar_librerias') as cargar, \
+                        self.assertNoLogs(pdf.logger):
+                    self.assertIsInstance(pdf.obtener_motor(nombre), pdf.ReportLabMotor)
+                cargar.assert_not_called()
+
+    def test_librerias_nativas_ausentes(self):
+        # WeasyPrint sin Pango falla con OSError al cargar la biblioteca
+        with mock.patch.object(pdf.WeasyPrintMotor, 'cargar_librerias', side_effect=OSError), \
+                self.assertLogs(pdf.logger, 'WARNING'):
+            self.assertIsInstance(pdf.obtener_motor('weasyprint'), pdf.ReportLabMotor)
+
+    @override_settings(PDF_MOTOR='xhtml2pdf')
+    def test_motor_disponible_sin_respaldo(self):
+        with mock.patch.object(pdf.XHTML2PDFMotor, 'cargar_librerias'):
+            self.assertIsInstance(pdf.obtener_motor(), pdf.XHTML2PDFMotor)
+        # El benchmark pide el motor tal cual para informar que no está
+        with self.sin_modulo('xhtml2pdf'):
+            self.assertIsInstance(pdf.obtener_motor(respaldo=False), pdf.XHTML2PDFMotor)
+
+    def test_motor_desconocido(self):
+        with self.assertRaises(ImproperlyConfigured):
+            pdf.obtener_motor('latex')
+
+    @override_settings(PDF_MOTOR='weasyprint')
+    def test_construir_pdf_con_el_respaldo(self):
+        perfil = crear_perfil()
+        secciones = {nombre: [] for nombre in CLASES_SECCIONES}
+        with self.sin_modulo('weasyprint'), self.assertLogs(pdf.logger, 'WARNING'), \
+                mock.patch.object(pdf.metricas, 'observar') as observar:
+            contenido = pdf.construir_pdf(perfil, secciones)
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        # Las métricas llevan el motor que generó el PDF
+        self.assertEqual({llamada.kwargs['motor'] for llamada in observar.call_args_list}, {'reportlab'})
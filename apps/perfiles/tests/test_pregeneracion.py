@@ -0,0 +1,98 @@
+import datetime
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from apps.perfiles import pregeneracion
+from apps.perfiles.models import DatosPersonales, ProductoLaboral
+from apps.perfiles.signals import invalidacion_agrupada
+
+from .base import PruebaBase, crear_perfil
+
+ESPERA = 0.2
+
+
+@override_settings(PDF_PREGENERAR=True, PDF_PREGENERAR_ESPERA=ESPERA)
+class PregeneracionTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.generados = []
+
+        def regenerar_pdf(perfil_id):
+            self.generados.append(perfil_id)
+
+        parche = mock.patch.object(pregeneracion, 'regenerar_pdf', regenerar_pdf)
+        parche.start()
+        self.addCleanup(parche.stop)
+        # Una espera que quede pendiente no debe vencer en otra prueba
+        self.addCleanup(pregeneracion._plazos.clear)
+
+    def esperar_pdfs(self, cantidad):
+        """Espera `cantidad` PDFs y un poco más, por si llega alguno de sobra"""
+        limite = time.monotonic() + 5
+        while len(self.generados) < cantidad and time.monotonic() < limite:
+            time.sleep(0.01)
+        time.sleep(2 * ESPERA)
+        return self.generados
+
+    def hilos_planificador(self):
+        return [h for h in threading.enumerate() if h.name == 'pdf-pregeneracion-espera']
+
+    def test_varios_guardados_un_solo_pdf(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil = crear_perfil()
+        for numero in range(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                perfil.descripcion_perfil = f'Versión {numero}'
+                perfil.save()
+                ProductoLaboral.objects.create(
+                    perfil=perfil, nombre_producto=f'Producto {numero}',
+                    fecha_producto=datetime.date(2020, 1, 1), descripcion='d',
+                )
+        self.assertEqual(self.esperar_pdfs(1), [perfil.pk])
+
+    def test_muchos_perfiles_un_solo_hilo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfiles = [crear_perfil(f'{numero:010d}') for numero in range(20)]
+        self.assertEqual(len(self.hilos_planificador()), 1)
+        self.assertEqual(sorted(self.esperar_pdfs(20)), sorted(perfil.pk for perfil in perfiles))
+
+    def test_borrado_o_inactivo_cancela_el_pdf(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            borrado = crear_perfil('0000000001')
+            inactivo = crear_perfil('0000000002')
+            activo = crear_perfil('0000000003')
+        with self.captureOnCommitCallbacks(execute=True):
+            borrado.delete()
+            inactivo.perfil_activo = False
+            inactivo.save()
+        self.assertEqual(self.esperar_pdfs(1), [activo.pk])
+
+    def test_borrado_masivo_cancela_el_pdf(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfiles = [crear_perfil(f'{numero:010d}') for numero in range(3)]
+            ProductoLaboral.objects.create(
+                perfil=perfiles[1], nombre_producto='Sistema',
+                fecha_producto=datetime.date(2020, 1, 1), descripcion='d',
+            )
+        # Como archivar_perfiles: el borrado en cascada agrupa sus señales
+        with self.captureOnCommitCallbacks(execute=True), invalidacion_agrupada():
+            DatosPersonales.objects.filter(pk__in=[p.pk for p in perfiles[1:]]).delete()
+        self.assertEqual(self.esperar_pdfs(1), [perfiles[0].pk])
+
+    def test_desactivar_desde_el_admin_cancela_el_pdf(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.login(username='admin', password='clave')
+        with self.captureOnCommitCallbacks(execute=True):
+            perfiles = [crear_perfil(f'{numero:010d}') for numero in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/perfiles/datospersonales/', {
+                'action': 'desactivar_perfiles',
+                '_selected_action': [p.pk for p in perfiles[1:]],
+            })
+        self.assertFalse(DatosPersonales.objects.get(pk=perfiles[1].pk).perfil_activo)
+        self.assertEqual(self.esperar_pdfs(1), [perfiles[0].pk])
@@ -0,0 +1,76 @@
+import datetime
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db.models import QuerySet
+
+from apps.perfiles.cache import (
+    CLAVE_VERSION_MERCADO, aobtener_versiones_secciones, clave_version_perfil,
+)
+from apps.perfiles.models import CursoRealizado, ExperienciaLaboral, VentaGarage
+
+from .base import PruebaBase, crear_perfil
+
+
+class VersionesSeccionTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        ExperienciaLaboral.objects.create(
+            perfil=self.perfil, cargo_desempenado='Analista', nombre_empresa='ACME',
+            lugar_empresa='Quito', fecha_inicio_gestion=datetime.date(2020, 1, 1),
+            descripcion_funciones='x',
+        )
+        self.curso = CursoRealizado.objects.create(
+            perfil=self.perfil, nombre_curso='Django', total_horas=10,
+            fecha_inicio=datetime.date(2020, 1, 1), fecha_fin=datetime.date(2020, 1, 2),
+            descripcion_curso='c', entidad_patrocinadora='Universidad',
+        )
+
+    def versiones(self):
+        return {
+            **async_to_sync(aobtener_versiones_secciones)(self.perfil.pk),
+            'perfil': cache.get(clave_version_perfil(self.perfil.pk)),
+            'mercado': cache.get(CLAVE_VERSION_MERCADO),
+        }
+
+    def cambiadas(self, antes):
+        despues = self.versiones()
+        return {nombre for nombre, version in despues.items() if antes[nombre] != version}
+
+    def test_editar_un_curso_solo_cambia_su_seccion(self):
+        self.client.get('/perfil/0102030405/')
+        antes = self.versiones()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.curso.nombre_curso = 'Django avanzado'
+            self.curso.save()
+
+        self.assertEqual(self.cambiadas(antes), {'cursos', 'perfil'})
+        response = self.client.get('/perfil/0102030405/')
+        self.assertContains(response, 'Django avanzado')
+        # Solo la sección con un fragmento nuevo se consulta
+        self.assertIsInstance(response.context['experiencias'], QuerySet)
+        self.assertIsInstance(response.context['cursos'], list)
+
+    def test_cambios_sin_seccion_no_tocan_las_secciones(self):
+        antes = self.versiones()
+        with self.captureOnCommitCallbacks(execute=True):
+            VentaGarage.objects.create(
+                perfil=self.perfil, nombre_producto='Bicicleta', estado_producto='Bueno',
+                descripcion='d', valor_del_bien=80,
+            )
+        self.assertEqual(self.cambiadas(antes), {'perfil', 'mercado'})
+
+        antes = self.versiones()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.nombres = 'Juan'
+            self.perfil.save()
+        self.assertEqual(self.cambiadas(antes), {'perfil', 'mercado'})
+
+    def test_borrar_un_registro_cambia_su_seccion(self):
+        antes = self.versiones()
+        with self.captureOnCommitCallbacks(execute=True):
+            ExperienciaLaboral.objects.get().delete()
+        self.assertEqual(self.cambiadas(antes), {'experiencias', 'perfil'})
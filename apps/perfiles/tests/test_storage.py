@@ -0,0 +1,106 @@
+import datetime
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.perfiles.models import ArchivoContenido, CursoRealizado
+from apps.perfiles.storage import contenido_storage
+
+from .base import PruebaBase, crear_perfil
+
+HACE_DOS_DIAS = timezone.now() - datetime.timedelta(days=2)
+
+
+class ArchivosPorContenidoTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.perfil = crear_perfil()
+
+    def curso(self, contenido, nombre='certificado.pdf'):
+        return CursoRealizado.objects.create(
+            perfil=self.perfil, nombre_curso='Django', total_horas=10,
+            fecha_inicio=datetime.date(2020, 1, 1), fecha_fin=datetime.date(2020, 1, 2),
+            descripcion_curso='c', entidad_patrocinadora='Universidad',
+            ruta_certificado=SimpleUploadedFile(nombre, contenido),
+        )
+
+    def referencias(self):
+        return dict(ArchivoContenido.objects.values_list('nombre', 'referencias'))
+
+    def limpiar(self, *args):
+        salida = StringIO()
+        call_command('limpiar_archivos_huerfanos', *args, stdout=salida)
+        return salida.getvalue()
+
+    def test_mismo_contenido_un_solo_archivo(self):
+        primero = self.curso(b'%PDF igual', 'uno.pdf')
+        segundo = self.curso(b'%PDF igual', 'dos.pdf')
+        nombre = primero.ruta_certificado.name
+        self.assertEqual(segundo.ruta_certificado.name, nombre)
+        self.assertTrue(contenido_storage.es_nombre_por_contenido(nombre))
+        self.assertEqual(self.referencias(), {nombre: 2})
+        self.assertEqual(contenido_storage.open(nombre).read(), b'%PDF igual')
+
+    def test_referencias_al_reemplazar_y_borrar(self):
+        primero = self.curso(b'%PDF viejo')
+        segundo = self.curso(b'%PDF viejo')
+        viejo = primero.ruta_certificado.name
+
+        primero.ruta_certificado = SimpleUploadedFile('nuevo.pdf', b'%PDF nuevo')
+        primero.save()
+        nuevo = primero.ruta_certificado.name
+        self.assertEqual(self.referencias(), {viejo: 1, nuevo: 1})
+
+        segundo.delete()
+        primero.delete()
+        self.assertEqual(self.referencias(), {viejo: 0, nuevo: 0})
+        # Sin referencias el archivo sigue en disco hasta la limpieza
+        self.assertTrue(contenido_storage.exists(viejo))
+
+    def test_limpieza_de_huerfanos(self):
+        usado = self.curso(b'%PDF usado').ruta_certificado.name
+        huerfano = self.curso(b'%PDF huerfano')
+        viejo = huerfano.ruta_certificado.name
+        huerfano.delete()
+        reciente = self.curso(b'%PDF reciente')
+        liberado = reciente.ruta_certificado.name
+        reciente.delete()
+        ArchivoContenido.objects.exclude(nombre=liberado).update(fecha_actualizacion=HACE_DOS_DIAS)
+
+        self.assertIn('Se borrarían 1', self.limpiar('--dry-run'))
+        self.assertTrue(contenido_storage.exists(viejo))
+
+        self.assertIn('Se borraron 1', self.limpiar())
+        self.assertFalse(contenido_storage.exists(viejo))
+        self.assertEqual(self.referencias(), {usado: 1, liberado: 0})
+        self.assertTrue(contenido_storage.exists(usado))
+        self.assertTrue(contenido_storage.exists(liberado))
+
+    def test_volver_a_subir_un_huerfano_viejo_lo_protege(self):
+        huerfano = self.curso(b'%PDF reutilizado')
+        nombre = huerfano.ruta_certificado.name
+        huerfano.delete()
+        ArchivoContenido.objects.update(
+            fecha_creacion=HACE_DOS_DIAS, fecha_actualizacion=HACE_DOS_DIAS
+        )
+
+        # La limpieza corre entre la subida y el post_save que suma la referencia
+        self.assertEqual(contenido_storage.save('otra.pdf', ContentFile(b'%PDF reutilizado')), nombre)
+        self.assertIn('Se borraron 0', self.limpiar())
+        self.assertTrue(contenido_storage.exists(nombre))
+
+        self.curso(b'%PDF reutilizado')
+        self.assertEqual(self.referencias(), {nombre: 1})
+        self.assertTrue(contenido_storage.exists(nombre))
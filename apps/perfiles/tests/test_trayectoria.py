@@ -0,0 +1,158 @@
+import datetime
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.perfiles import trayectoria
+from apps.perfiles.models import (
+    CursoRealizado, ExperienciaLaboral, ProductoLaboral, Reconocimiento,
+)
+
+from .base import PruebaBase, crear_perfil
+
+DIA = datetime.date(2020, 5, 1)
+
+
+class TrayectoriaBase(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def experiencia(self, fecha, visible=True):
+        return ExperienciaLaboral.objects.create(
+            perfil=self.perfil, cargo_desempenado='Analista', nombre_empresa='ACME',
+            lugar_empresa='Quito', fecha_inicio_gestion=fecha, descripcion_funciones='x',
+            activar_para_que_se_vea_en_front=visible,
+        )
+
+    def curso(self, fecha):
+        return CursoRealizado.objects.create(
+            perfil=self.perfil, nombre_curso='Django', fecha_inicio=fecha, fecha_fin=fecha,
+            total_horas=10, descripcion_curso='c', entidad_patrocinadora='Universidad',
+        )
+
+    def reconocimiento(self, fecha):
+        return Reconocimiento.objects.create(
+            perfil=self.perfil, tipo_reconocimiento=Reconocimiento.TIPO_CHOICES[0][0],
+            fecha_reconocimiento=fecha, descripcion_reconocimiento='r',
+            entidad_patrocinadora='Municipio',
+        )
+
+    def producto(self, fecha):
+        return ProductoLaboral.objects.create(
+            perfil=self.perfil, nombre_producto='Sistema', fecha_producto=fecha, descripcion='d',
+        )
+
+    async def recorrer(self, por_pagina):
+        """Todas las páginas: (eventos en orden, tamaños de página)"""
+        eventos, tamanos, token = [], [], None
+        # Un cursor que no avanza repetiría páginas para siempre
+        for _ in range(50):
+            pagina, token = await trayectoria.apagina(self.perfil, token, por_pagina)
+            eventos += [(e.fecha, e.tipo, e.pk) for e in pagina]
+            tamanos.append(len(pagina))
+            if token is None:
+                return eventos, tamanos
+        self.fail('la paginación no termina')
+
+
+class TrayectoriaTests(TrayectoriaBase):
+
+    def setUp(self):
+        super().setUp()
+        # Empates en la fecha entre tipos y dentro del mismo tipo
+        creados = []
+        for _ in range(3):
+            creados.append(('experiencia', self.experiencia(DIA)))
+            creados.append(('curso', self.curso(DIA)))
+        creados.append(('reconocimiento', self.reconocimiento(DIA)))
+        creados.append(('producto', self.producto(DIA)))
+        creados.append(('producto', self.producto(DIA - datetime.timedelta(days=1))))
+        creados.append(('experiencia', self.experiencia(DIA + datetime.timedelta(days=1))))
+        creados.append(('reconocimiento', self.reconocimiento(datetime.date(2010, 1, 1))))
+        self.oculta = self.experiencia(DIA, visible=False)
+        self.esperados = sorted(
+            ((self.fecha_de(tipo, objeto), tipo, objeto.pk) for tipo, objeto in creados),
+            reverse=True,
+        )
+
+    def fecha_de(self, tipo, objeto):
+        return getattr(objeto, trayectoria.FUENTES[tipo][1])
+
+    async def test_orden_completo_en_una_pagina(self):
+        eventos, tamanos = await self.recorrer(por_pagina=50)
+        self.assertEqual(eventos, self.esperados)
+        self.assertEqual(tamanos, [len(self.esperados)])
+
+    async def test_paginas_con_empates_sin_repetir_ni_saltar(self):
+        for por_pagina in (1, 2, 3, 4, 5):
+            with self.subTest(por_pagina=por_pagina):
+                eventos, tamanos = await self.recorrer(por_pagina)
+                self.assertEqual(eventos, self.esperados)
+                self.assertTrue(all(tamano == por_pagina for tamano in tamanos[:-1]))
+
+    async def test_mezcla_de_tipos(self):
+        pagina, _ = await trayectoria.apagina(self.perfil, None, 50)
+        self.assertEqual(
+            {evento.tipo for evento in pagina},
+            {'experiencia', 'curso', 'reconocimiento', 'producto'},
+        )
+        self.assertNotIn(('experiencia', self.oculta.pk), {(e.tipo, e.pk) for e in pagina})
+        reconocimiento = next(e for e in pagina if e.tipo == 'reconocimiento')
+        self.assertEqual(reconocimiento.titulo, Reconocimiento.TIPO_CHOICES[0][1])
+        producto = next(e for e in pagina if e.tipo == 'producto')
+        self.assertEqual(producto.detalle, '')
+
+    async def test_ultima_pagina_exacta(self):
+        # Con un múltiplo exacto, la última página llena no ofrece otra vacía
+        total = len(self.esperados)
+        primera, token = await trayectoria.apagina(self.perfil, None, total - 1)
+        self.assertIsNotNone(token)
+        ultima, token = await trayectoria.apagina(self.perfil, token, 1)
+        self.assertEqual(len(ultima), 1)
+        self.assertIsNone(token)
+
+        todo, token = await trayectoria.apagina(self.perfil, None, total)
+        self.assertEqual(len(todo), total)
+        self.assertIsNone(token)
+
+    async def test_token_invalido_empieza_desde_el_principio(self):
+        primera, _ = await trayectoria.apagina(self.perfil, None, 3)
+        otro_tipo = trayectoria.codificar_cursor(
+            trayectoria.Evento('ventas', 1, DIA, '', '')
+        )
+        for token in ('basura', '', '!!!', 'W10', otro_tipo):
+            with self.subTest(token=token):
+                self.assertIsNone(trayectoria.decodificar_cursor(token))
+                pagina, _ = await trayectoria.apagina(self.perfil, token, 3)
+                self.assertEqual(pagina, primera)
+
+    def test_vista_html_y_json(self):
+        response = self.client.get('/perfil/0102030405/trayectoria/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Trayectoria')
+
+        response = self.client.get(
+            '/perfil/0102030405/trayectoria/', {'formato': 'json', 'despues': 'basura'}
+        )
+        datos = response.json()
+        self.assertEqual(len(datos['eventos']), len(self.esperados))
+        self.assertEqual(datos['eventos'][0]['fecha'], self.esperados[0][0].isoformat())
+        self.assertIsNone(datos['siguiente'])
+
+        self.assertEqual(self.client.get('/perfil/9999999999/trayectoria/').status_code, 404)
+
+    @skipUnless(
+        connection.vendor == 'postgresql',
+        'el LIMIT por rama solo existe en PostgreSQL; para correrla: '
+        'DATABASE_URL=postgres://... python manage.py test -t . apps/perfiles/tests',
+    )
+    def test_limite_en_cada_rama(self):
+        with CaptureQueriesContext(connection) as consultas:
+            filas = list(trayectoria.consulta(self.perfil, None, 3))
+        self.assertEqual([(fecha, tipo, pk) for tipo, pk, fecha, *_ in filas], self.esperados[:3])
+        sql = consultas.captured_queries[0]['sql']
+        self.assertEqual(sql.count('UNION ALL'), 3)
+        self.assertEqual(sql.count('LIMIT 3'), 5)
@@ -0,0 +1,64 @@
+import datetime
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, override_settings
+
+from apps.perfiles import zip_streaming
+from apps.perfiles.models import CursoRealizado
+
+from .base import PruebaBase, crear_perfil
+
+
+class CertificadosZipTests(PruebaBase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        perfil = crear_perfil()
+        self.certificados = {}
+        for numero, nombre in enumerate(('Django', 'Python'), start=1):
+            # PDF: se guarda sin recomprimir y cada bloque leído sale del ZIP
+            contenido = f'%PDF {nombre} '.encode() * 1000
+            CursoRealizado.objects.create(
+                perfil=perfil, nombre_curso=nombre, total_horas=10,
+                fecha_inicio=datetime.date(2020, numero, 1),
+                fecha_fin=datetime.date(2020, numero, 2),
+                descripcion_curso='c', entidad_patrocinadora='Universidad',
+                ruta_certificado=SimpleUploadedFile(f'{nombre}.pdf', contenido),
+            )
+            self.certificados[f'cursos/{3 - numero:02d}_{nombre.lower()}.pdf'] = contenido
+
+    def leer_zip(self, contenido):
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            return {nombre: archivo.read(nombre) for nombre in archivo.namelist()}
+
+    def test_zip_en_wsgi(self):
+        response = self.client.get('/perfil/0102030405/certificados.zip')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        self.assertEqual(self.leer_zip(b''.join(response.streaming_content)), self.certificados)
+
+    async def test_zip_en_asgi_por_bloques(self):
+        with mock.patch.object(zip_streaming, 'TAMANO_BLOQUE', 1024):
+            response = await AsyncClient().get('/perfil/0102030405/certificados.zip')
+            self.assertEqual(response.status_code, 200)
+            # Un iterador asíncrono: Django no junta el cuerpo antes de enviarlo
+            self.assertTrue(response.is_async)
+            bloques = [bloque async for bloque in response.streaming_content]
+        self.assertGreater(len(bloques), 10)
+        self.assertEqual(self.leer_zip(b''.join(bloques)), self.certificados)
+
+    def test_sin_certificados(self):
+        CursoRealizado.objects.update(ruta_certificado='')
+        response = self.client.get('/perfil/0102030405/certificados.zip')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,141 @@
+"""
+Trayectoria de un perfil: experiencias, cursos, reconocimientos y productos
+laborales en una sola línea de tiempo, del más reciente al más antiguo.
+
+Las cuatro tablas se leen con una sola consulta `UNION ALL` que devuelve solo
+las columnas que muestra la línea de tiempo (tipo, id, fecha, título y
+detalle), ya ordenada por la base de datos. La paginación es por conjunto de
+claves como en el mercado: el token lleva (fecha, tipo, id) del último evento
+de la página y cada rama del UNION filtra desde esa posición, apoyada en los
+índices parciales `*_trayectoria` de cada modelo.
+
+En PostgreSQL cada rama lleva además su propio ORDER BY y LIMIT, así que una
+carrera larga no se lee entera para mostrar una página; SQLite no admite
+LIMIT dentro de un UNION y ordena el resultado combinado.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, F, Q, Value
+
+from .models import CursoRealizado, ExperienciaLaboral, ProductoLaboral, Reconocimiento
+
+# Tipo de evento -> (nombre del gestor en el perfil, campo de fecha, título, detalle)
+# El tipo también desempata los eventos del mismo día, en orden alfabético inverso
+FUENTES = {
+    'experiencia': ('experiencias', 'fecha_inicio_gestion', 'cargo_desempenado', 'nombre_empresa'),
+    'curso': ('cursos', 'fecha_inicio', 'nombre_curso', 'entidad_patrocinadora'),
+    'reconocimiento': ('reconocimientos', 'fecha_reconocimiento', 'tipo_reconocimiento', 'entidad_patrocinadora'),
+    'producto': ('productos_laborales', 'fecha_producto', 'nombre_producto', None),
+}
+
+ETIQUETAS = {
+    'experiencia': (ExperienciaLaboral._meta.verbose_name, 'bi-briefcase'),
+    'curso': (CursoRealizado._meta.verbose_name, 'bi-mortarboard'),
+    'reconocimiento': (Reconocimiento._meta.verbose_name, 'bi-award'),
+    'producto': (ProductoLaboral._meta.verbose_name, 'bi-box-seam'),
+}
+
+TIPOS_RECONOCIMIENTO = dict(Reconocimiento._meta.get_field('tipo_reconocimiento').flatchoices)
+
+COLUMNAS = ('tipo', 'clave', 'fecha', 'titulo', 'detalle')
+
+
+@dataclass(frozen=True, slots=True)
+class Evento:
+    tipo: str
+    pk: int
+    fecha: date
+    titulo: str
+    detalle: str
+
+    @property
+    def etiqueta(self):
+        return ETIQUETAS[self.tipo][0]
+
+    @property
+    def icono(self):
+        return ETIQUETAS[self.tipo][1]
+
+
+def evento_desde_fila(tipo, pk, fecha, titulo, detalle):
+    if tipo == 'reconocimiento':
+        titulo = TIPOS_RECONOCIMIENTO.get(titulo, titulo)
+    return Evento(tipo, pk, fecha, titulo, detalle or '')
+
+
+def codificar_cursor(evento):
+    """Token opaco con la posición del evento en la línea de tiempo"""
+    datos = json.dumps([evento.fecha.isoformat(), evento.tipo, evento.pk]).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """(fecha, tipo, id) del token, o None si no es válido"""
+    try:
+        relleno = '=' * (-len(token) % 4)
+        fecha, tipo, pk = json.loads(base64.urlsafe_b64decode(token + relleno))
+        if tipo not in FUENTES:
+            return None
+        return date.fromisoformat(fecha), tipo, int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def rama(perfil, tipo, cursor=None):
+    """Filas visibles de un tipo de evento que van después del cursor"""
+    gestor, campo_fecha, campo_titulo, campo_detalle = FUENTES[tipo]
+    queryset = getattr(perfil, gestor).filter(activar_para_que_se_vea_en_front=True)
+    if cursor is not None:
+        fecha, tipo_cursor, pk = cursor
+        # Orden descendente por (fecha, tipo, id): en la fecha del cursor solo
+        # siguen los tipos menores y, del mismo tipo, los ids menores
+        if tipo < tipo_cursor:
+            queryset = queryset.filter(**{f'{campo_fecha}__lte': fecha})
+        elif tipo == tipo_cursor:
+            queryset = queryset.filter(
+                Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'pk__lt': pk})
+            )
+        else:
+            queryset = queryset.filter(**{f'{campo_fecha}__lt': fecha})
+    # Todas las columnas como anotaciones para que las cuatro ramas las
+    # seleccionen en el mismo orden
+    return queryset.annotate(
+        tipo=Value(tipo, output_field=CharField()),
+        clave=F('pk'),
+        fecha=F(campo_fecha),
+        titulo=F(campo_titulo),
+        detalle=F(campo_detalle) if campo_detalle else Value('', output_field=CharField()),
+    ).values_list(*COLUMNAS)
+
+
+def consulta(perfil, cursor=None, limite=None):
+    """Queryset `UNION ALL` de las filas de la línea de tiempo, ya ordenado"""
+    ramas = [rama(perfil, tipo, cursor) for tipo in FUENTES]
+    if limite is not None and connections[ramas[0].db].features.supports_slicing_ordering_in_compound:
+        ramas = [r.order_by('-fecha', '-clave')[:limite] for r in ramas]
+    else:
+        ramas = [r.order_by() for r in ramas]
+    union = ramas[0].union(*ramas[1:], all=True).order_by('-fecha', '-tipo', '-clave')
+    return union[:limite] if limite is not None else union
+
+
+async def apagina(perfil, token=None, por_pagina=None):
+    """Eventos de la página y el token de la siguiente (None si es la última)"""
+    por_pagina = por_pagina or settings.TRAYECTORIA_POR_PAGINA
+    cursor = decodificar_cursor(token) if token else None
+    # Se pide un evento de más para saber si hay otra página
+    eventos = [
+        evento_desde_fila(*fila)
+        async for fila in consulta(perfil, cursor, por_pagina + 1)
+    ]
+    siguiente = None
+    if len(eventos) > por_pagina:
+        eventos = eventos[:por_pagina]
+        siguiente = codificar_cursor(eventos[-1])
+    return eventos, siguiente
@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import PerfilPublicoView, VentaGarageView, GenerarPDFView
+from .views import (
+    PerfilPublicoView, VentaGarageView, GenerarPDFView, CertificadosZipView,
+    MercadoGarageView, BuscarPerfilesView, TrayectoriaView
+)
 
 app_name = 'perfiles'
 
 urlpatterns = [
     path('', PerfilPublicoView.as_view(), name='perfil_publico'),
+    path('mercado/', MercadoGarageView.as_view(), name='mercado'),
+    path('buscar/', BuscarPerfilesView.as_view(), name='buscar'),
     path('<str:cedula>/', PerfilPublicoView.as_view(), name='perfil_por_cedula'),
     path('<str:cedula>/pdf/', GenerarPDFView.as_view(), name='generar_pdf'),
+    path('<str:cedula>/trayectoria/', TrayectoriaView.as_view(), name='trayectoria'),
     path('<str:cedula>/garage/', VentaGarageView.as_view(), name='venta_garage'),
+    path('<str:cedula>/certificados.zip', CertificadosZipView.as_view(), name='certificados_zip'),
 ]
@@ -1,95 +1,269 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
 from django.views import View
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from .busqueda import indice
+from .forms import FiltroMercadoForm
 from .models import DatosPersonales
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
+from .cache import (
+    aobtener_version_perfil, aobtener_versiones_secciones,
+    clave_fragmento, clave_pdf, render_cacheado
+)
+from .coalescencia import obtener_o_generar
+from .contadores import registrar_visita
+from .instantanea import aobtener_instantanea
+from .limites import (
+    ConcurrenciaAgotada, rechazo_por_concurrencia, renders_pdf,
+    verificar_limite_busqueda, verificar_limite_tasa,
+)
+from .mercado import afacetas, apagina
+from .pdf import construir_pdf, ejecutor_pdf
+from .streaming import cuerpo_streaming
+from .trayectoria import apagina as apagina_trayectoria
+from .zip_streaming import EntradaZip, generar_zip
+import os
+
+
+async def obtener_perfil(cedula=None):
+    """Perfil activo con esa cédula (404 si no existe) o el primero activo"""
+    perfiles = DatosPersonales.objects.filter(perfil_activo=True)
+    if cedula:
+        perfil = await perfiles.filter(numero_cedula=cedula).afirst()
+        if perfil is None:
+            raise Http404('No existe un perfil activo con esa cédula.')
+        return perfil
+    return await perfiles.afirst()
+
+
+def es_exportacion(request):
+    """
+    Petición interna de `exportar_estatico`: no cuenta como visita ni pasa
+    por el límite de tasa del PDF (el comando pide uno por perfil)
+    """
+    return getattr(request, 'exportacion_estatica', False)
 
 
 class PerfilPublicoView(View):
     """Vista del perfil público"""
     
-    def get(self, request, cedula=None):
-        if cedula:
-            perfil = get_object_or_404(
-                DatosPersonales,
-                numero_cedula=cedula,
-                perfil_activo=True
-            )
-        else:
-            # Obtener el primer perfil activo
-            perfil = DatosPersonales.objects.filter(perfil_activo=True).first()
-            if not perfil:
-                return render(request, 'perfiles/no_perfil.html')
-        
-        # Obtener datos relacionados activos
-        experiencias = perfil.experiencias.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_inicio_gestion')
-        
-        cursos = perfil.cursos.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_inicio')
-        
-        reconocimientos = perfil.reconocimientos.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_reconocimiento')
-        
-        productos_academicos = perfil.productos_academicos.filter(
-            activar_para_que_se_vea_en_front=True
-        )
-        
-        productos_laborales = perfil.productos_laborales.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_producto')
+    async def get(self, request, cedula=None):
+        perfil = await obtener_perfil(cedula)
+        if not perfil:
+            return render(request, 'perfiles/no_perfil.html')
+        if not es_exportacion(request):
+            registrar_visita(perfil.pk, 'perfil')
         
-        context = {
-            'perfil': perfil,
-            'experiencias': experiencias,
-            'cursos': cursos,
-            'reconocimientos': reconocimientos,
-            'productos_academicos': productos_academicos,
-            'productos_laborales': productos_laborales,
-        }
+        async def construir_contexto():
+            # Las secciones con su fragmento en caché no se consultan: se
+            # pasan sin evaluar por si el fragmento expira durante el render
+            versiones = await aobtener_versiones_secciones(perfil.pk)
+            claves = {
+                seccion: clave_fragmento(perfil.pk, seccion, version)
+                for seccion, version in versiones.items()
+            }
+            cacheadas = await cache.aget_many(claves.values())
+            
+            context = {
+                'perfil': perfil,
+                'versiones_secciones': versiones,
+                'cache_fragmentos_segundos': settings.CACHE_FRAGMENTOS_SEGUNDOS,
+            }
+            for seccion, queryset in perfil.secciones_visibles().items():
+                if claves[seccion] in cacheadas:
+                    context[seccion] = queryset
+                else:
+                    context[seccion] = [registro async for registro in queryset]
+            return context
         
-        return render(request, 'perfiles/perfil_publico.html', context)
+        return await render_cacheado(
+            request, 'perfil_publico', perfil,
+            'perfiles/perfil_publico.html', construir_contexto
+        )
 
 
 class VentaGarageView(View):
     """Vista de venta garage"""
     
-    def get(self, request, cedula=None):
-        if cedula:
-            perfil = get_object_or_404(
-                DatosPersonales,
-                numero_cedula=cedula,
-                perfil_activo=True
-            )
-        else:
-            perfil = DatosPersonales.objects.filter(perfil_activo=True).first()
-            if not perfil:
-                return render(request, 'perfiles/no_perfil.html')
-        
-        ventas = perfil.ventas_garage.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_creacion')
-        
-        context = {
-            'perfil': perfil,
-            'ventas': ventas,
-        }
-        
-        return render(request, 'perfiles/venta_garage.html', context)
+    async def get(self, request, cedula=None):
+        perfil = await obtener_perfil(cedula)
+        if not perfil:
+            return render(request, 'perfiles/no_perfil.html')
+        if not es_exportacion(request):
+            registrar_visita(perfil.pk, 'garage')
+        
+        async def construir_contexto():
+            ventas = perfil.ventas_garage.filter(
+                activar_para_que_se_vea_en_front=True
+            ).order_by('-fecha_creacion')
+            
+            return {
+                'perfil': perfil,
+                'ventas': [venta async for venta in ventas],
+            }
+        
+        return await render_cacheado(
+            request, 'venta_garage', perfil,
+            'perfiles/venta_garage.html', construir_contexto
+        )
+
+
+class TrayectoriaView(View):
+    """
+    Línea de tiempo del perfil con experiencias, cursos, reconocimientos y
+    productos laborales, paginada con `?despues=`. Con `?formato=json`
+    devuelve solo los eventos y el token de la siguiente página.
+    """
+    
+    async def get(self, request, cedula):
+        perfil = await obtener_perfil(cedula)
+        token = request.GET.get('despues')
+        
+        if request.GET.get('formato') == 'json':
+            eventos, siguiente = await apagina_trayectoria(perfil, token)
+            return JsonResponse({
+                'eventos': [
+                    {
+                        'tipo': evento.tipo,
+                        'fecha': evento.fecha.isoformat(),
+                        'titulo': evento.titulo,
+                        'detalle': evento.detalle,
+                    }
+                    for evento in eventos
+                ],
+                'siguiente': siguiente,
+            })
+        
+        async def construir_contexto():
+            eventos, siguiente = await apagina_trayectoria(perfil, token)
+            return {
+                'perfil': perfil,
+                'eventos': eventos,
+                'siguiente_url': f'?despues={siguiente}' if siguiente else None,
+                'primera_url': request.path if token else None,
+            }
+        
+        # Solo la primera página pasa por la caché de páginas públicas
+        if token:
+            return render(request, 'perfiles/trayectoria.html', await construir_contexto())
+        return await render_cacheado(
+            request, 'trayectoria', perfil,
+            'perfiles/trayectoria.html', construir_contexto
+        )
+
+
+class MercadoGarageView(View):
+    """Venta garage de todos los perfiles activos"""
+    
+    async def get(self, request):
+        form = FiltroMercadoForm(request.GET)
+        filtros = form.filtros()
+        articulos, siguiente = await apagina(filtros, request.GET.get('despues'))
+        
+        siguiente_url = None
+        if siguiente:
+            parametros = request.GET.copy()
+            parametros['despues'] = siguiente
+            siguiente_url = f'?{parametros.urlencode()}'
+        primera = request.GET.copy()
+        primera.pop('despues', None)
+        
+        return render(request, 'perfiles/mercado.html', {
+            'form': form,
+            'articulos': articulos,
+            'facetas': await afacetas(),
+            'siguiente_url': siguiente_url,
+            'primera_url': f'?{primera.urlencode()}' if 'despues' in request.GET else None,
+        })
+
+
+class BuscarPerfilesView(View):
+    """
+    Sugerencias de perfiles por nombre, apellido o cédula mientras se escribe.
+    El staff ve también los perfiles inactivos, con el enlace al admin, y
+    puede buscar por el comienzo de la cédula; el resto solo por la cédula
+    completa, con un límite de tasa por IP.
+    """
+    
+    def get(self, request):
+        rechazo = verificar_limite_busqueda(request)
+        if rechazo:
+            return rechazo
+        try:
+            limite = min(int(request.GET.get('limite', settings.BUSQUEDA_LIMITE)), 50)
+        except ValueError:
+            limite = settings.BUSQUEDA_LIMITE
+        staff = request.user.is_staff
+        resultados = []
+        perfiles = indice.buscar(
+            request.GET.get('q', ''), max(limite, 1), staff, cedula_completa=not staff
+        )
+        for perfil in perfiles:
+            resultado = {
+                'nombre': perfil.nombre,
+                'cedula': perfil.numero_cedula,
+                'descripcion': perfil.descripcion,
+                'url': reverse('perfiles:perfil_por_cedula', args=[perfil.numero_cedula]),
+            }
+            if staff:
+                resultado['activo'] = perfil.activo
+                resultado['admin_url'] = reverse(
+                    'admin:perfiles_datospersonales_change', args=[perfil.pk]
+                )
+            resultados.append(resultado)
+        return JsonResponse({'resultados': resultados})
 
 
 class GenerarPDFView(View):
     """Vista para generar PDF de la hoja de vida"""
     
+    async def get(self, request, cedula):
+        if not es_exportacion(request):
+            # Fuera del hilo compartido: los reintentos del candado duermen y
+            # no deben encolar al resto de las vistas síncronas
+            rechazo = await sync_to_async(verificar_limite_tasa, thread_sensitive=False)(request)
+            if rechazo:
+                return rechazo
+        
+        perfil = await obtener_perfil(cedula)
+        if not es_exportacion(request):
+            registrar_visita(perfil.pk, 'pdf')
+        
+        async def generar():
+            # Sin espacio para otro render se rechaza en lugar de encolar
+            if not renders_pdf.acquire(blocking=False):
+                raise ConcurrenciaAgotada()
+            try:
+                instantanea = await aobtener_instantanea(perfil)
+                
+                # El render del PDF se hace en el pool acotado de hilos
+                return await sync_to_async(
+                    construir_pdf, thread_sensitive=False, executor=ejecutor_pdf()
+                )(instantanea.perfil, instantanea.secciones())
+            finally:
+                renders_pdf.release()
+        
+        # Las peticiones simultáneas del mismo PDF comparten un único render
+        clave = clave_pdf(perfil.pk, await aobtener_version_perfil(perfil.pk))
+        try:
+            contenido = await obtener_o_generar(clave, generar, settings.CACHE_PDF_SEGUNDOS)
+        except ConcurrenciaAgotada:
+            return rechazo_por_concurrencia()
+        
+        # Preparar respuesta
+        response = HttpResponse(contenido, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="CV_{perfil.nombres}_{perfil.apellidos}.pdf"'
+        
+        return response
+
+
+class CertificadosZipView(View):
+    """Descarga en un ZIP todos los certificados visibles del perfil"""
+    
     def get(self, request, cedula):
         perfil = get_object_or_404(
             DatosPersonales,
@@ -97,141 +271,34 @@ class GenerarPDFView(View):
             perfil_activo=True
         )
         
-        # Crear el PDF en memoria
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # Estilos personalizados
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2C3E50'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#34495E'),
-            spaceAfter=12,
-            spaceBefore=12,
-        )
-        
-        # Título
-        story.append(Paragraph(f"{perfil.nombres} {perfil.apellidos}", title_style))
-        story.append(Paragraph(perfil.descripcion_perfil, styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Datos personales
-        story.append(Paragraph("DATOS PERSONALES", heading_style))
-        datos_personales = [
-            ['Cédula:', perfil.numero_cedula],
-            ['Fecha de Nacimiento:', perfil.fecha_nacimiento.strftime('%d/%m/%Y')],
-            ['Edad:', f"{perfil.get_edad()} años"],
-            ['Nacionalidad:', perfil.nacionalidad],
-            ['Estado Civil:', perfil.estado_civil],
-            ['Teléfono:', str(perfil.telefono_fijo or perfil.telefono_convencional or 'N/A')],
-            ['Dirección:', perfil.direccion_domiciliaria],
-        ]
-        if perfil.sitio_web:
-            datos_personales.append(['Sitio Web:', perfil.sitio_web])
-        
-        tabla = Table(datos_personales, colWidths=[2*inch, 4*inch])
-        tabla.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        story.append(tabla)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # Experiencia laboral
-        experiencias = perfil.experiencias.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_inicio_gestion')
-        
-        if experiencias:
-            story.append(Paragraph("EXPERIENCIA LABORAL", heading_style))
-            for exp in experiencias:
-                fecha_inicio = exp.fecha_inicio_gestion.strftime('%m/%Y')
-                fecha_fin = exp.fecha_fin_gestion.strftime('%m/%Y') if exp.fecha_fin_gestion else 'Actualidad'
-                
-                story.append(Paragraph(
-                    f"<b>{exp.cargo_desempenado}</b> - {exp.nombre_empresa}",
-                    styles['Normal']
-                ))
-                story.append(Paragraph(
-                    f"{fecha_inicio} - {fecha_fin} | {exp.lugar_empresa}",
-                    styles['Normal']
-                ))
-                story.append(Paragraph(exp.descripcion_funciones, styles['Normal']))
-                story.append(Spacer(1, 0.15*inch))
-        
-        # Cursos
-        cursos = perfil.cursos.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_inicio')
-        
-        if cursos:
-            story.append(Paragraph("CURSOS Y CAPACITACIONES", heading_style))
-            for curso in cursos:
-                periodo = f"{curso.fecha_inicio.strftime('%m/%Y')} - {curso.fecha_fin.strftime('%m/%Y')}"
-                story.append(Paragraph(
-                    f"<b>{curso.nombre_curso}</b> - {curso.entidad_patrocinadora}",
-                    styles['Normal']
-                ))
-                story.append(Paragraph(
-                    f"{periodo} | {curso.total_horas} horas",
-                    styles['Normal']
-                ))
-                story.append(Spacer(1, 0.1*inch))
-        
-        # Reconocimientos
-        reconocimientos = perfil.reconocimientos.filter(
-            activar_para_que_se_vea_en_front=True
-        ).order_by('-fecha_reconocimiento')
-        
-        if reconocimientos:
-            story.append(Paragraph("RECONOCIMIENTOS", heading_style))
-            for rec in reconocimientos:
-                story.append(Paragraph(
-                    f"<b>{rec.tipo_reconocimiento}</b> - {rec.entidad_patrocinadora}",
-                    styles['Normal']
-                ))
-                story.append(Paragraph(
-                    f"{rec.fecha_reconocimiento.strftime('%m/%Y')} - {rec.descripcion_reconocimiento}",
-                    styles['Normal']
-                ))
-                story.append(Spacer(1, 0.1*inch))
-        
-        # Productos académicos
-        productos_academicos = perfil.productos_academicos.filter(
-            activar_para_que_se_vea_en_front=True
+        secciones = (
+            ('experiencia', perfil.experiencias.order_by('-fecha_inicio_gestion'),
+             lambda exp: f"{exp.cargo_desempenado} {exp.nombre_empresa}"),
+            ('cursos', perfil.cursos.order_by('-fecha_inicio'),
+             lambda curso: curso.nombre_curso),
+            ('reconocimientos', perfil.reconocimientos.order_by('-fecha_reconocimiento'),
+             lambda rec: f"{rec.tipo_reconocimiento} {rec.entidad_patrocinadora}"),
         )
         
-        if productos_academicos:
-            story.append(Paragraph("PRODUCTOS ACADÉMICOS", heading_style))
-            for prod in productos_academicos:
-                story.append(Paragraph(
-                    f"<b>{prod.nombre_recurso}</b> ({prod.clasificador})",
-                    styles['Normal']
-                ))
-                story.append(Paragraph(prod.descripcion, styles['Normal']))
-                story.append(Spacer(1, 0.1*inch))
-        
-        # Construir PDF
-        doc.build(story)
+        entradas = []
+        for carpeta, queryset, titulo in secciones:
+            registros = queryset.filter(
+                activar_para_que_se_vea_en_front=True
+            ).exclude(ruta_certificado='').exclude(ruta_certificado__isnull=True)
+            
+            for indice, registro in enumerate(registros, start=1):
+                extension = os.path.splitext(registro.ruta_certificado.name)[1].lower()
+                nombre = f"{carpeta}/{indice:02d}_{slugify(titulo(registro))[:60]}{extension}"
+                fecha = timezone.localtime(registro.fecha_creacion).timetuple()[:6]
+                entradas.append(EntradaZip(nombre, registro.ruta_certificado, fecha))
         
-        # Preparar respuesta
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="CV_{perfil.nombres}_{perfil.apellidos}.pdf"'
+        if not entradas:
+            raise Http404('El perfil no tiene certificados publicados.')
         
+        response = StreamingHttpResponse(
+            cuerpo_streaming(request, generar_zip(entradas)), content_type='application/zip'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="Certificados_{perfil.nombres}_{perfil.apellidos}.zip"'
+        )
         return response
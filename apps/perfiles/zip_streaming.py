@@ -0,0 +1,86 @@
+"""
+Generación de archivos ZIP en streaming.
+
+El ZIP se escribe sobre un buffer que no admite `seek`, así `zipfile` usa
+descriptores de datos y cada bloque generado se entrega al cliente en cuanto
+está listo: no hay archivos temporales ni se carga ningún archivo completo en
+memoria.
+"""
+import os
+import zipfile
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Formatos que ya vienen comprimidos y se guardan sin recomprimir
+EXTENSIONES_COMPRIMIDAS = {
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip', '.gz', '.docx', '.xlsx',
+}
+
+
+class BufferSalida:
+    """Destino de escritura que acumula bloques hasta que se vacían"""
+
+    def __init__(self):
+        self.bloques = []
+        self.posicion = 0
+
+    def write(self, datos):
+        self.bloques.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.bloques)
+        self.bloques = []
+        return datos
+
+
+class EntradaZip:
+    """Archivo a incluir en el ZIP"""
+
+    def __init__(self, nombre, archivo, fecha=None):
+        self.nombre = nombre
+        self.archivo = archivo
+        self.fecha = fecha
+
+    def tipo_compresion(self):
+        extension = os.path.splitext(self.nombre)[1].lower()
+        if extension in EXTENSIONES_COMPRIMIDAS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+
+def generar_zip(entradas):
+    """Genera los bytes del ZIP con las `entradas` a medida que se escriben"""
+    buffer = BufferSalida()
+    with zipfile.ZipFile(buffer, mode='w', allowZip64=True) as zip_salida:
+        for entrada in entradas:
+            try:
+                entrada.archivo.open('rb')
+            except FileNotFoundError:
+                continue
+
+            info = zipfile.ZipInfo(entrada.nombre, date_time=entrada.fecha or (1980, 1, 1, 0, 0, 0))
+            info.compress_type = entrada.tipo_compresion()
+            info.file_size = entrada.archivo.size
+            try:
+                with zip_salida.open(info, mode='w') as destino:
+                    while True:
+                        bloque = entrada.archivo.read(TAMANO_BLOQUE)
+                        if not bloque:
+                            break
+                        destino.write(bloque)
+                        datos = buffer.vaciar()
+                        if datos:
+                            yield datos
+            finally:
+                entrada.archivo.close()
+            yield buffer.vaciar()
+    # Directorio central
+    yield buffer.vaciar()
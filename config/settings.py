@@ -35,12 +35,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricasMiddleware',
+    'apps.core.middleware.ConsultasLentasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.CompresionMiddleware',
+    'apps.core.middleware.PaginaPublicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,6 +69,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 DATABASES = {
@@ -73,6 +79,37 @@ DATABASES = {
     )
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='hoja-vida'),
+    }
+}
+
+# Caché SQLite compartida por los workers de la máquina (ver apps/core/cache_sqlite.py)
+if CACHES['default']['BACKEND'] == 'apps.core.cache_sqlite.SQLiteCache':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_BYTES': config('CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int),
+    }
+
+# Segundos que se guardan las páginas públicas renderizadas (0 desactiva)
+CACHE_PAGINAS_SEGUNDOS = config('CACHE_PAGINAS_SEGUNDOS', default=600, cast=int)
+
+# Segundos que se guardan los fragmentos de cada sección del CV
+CACHE_FRAGMENTOS_SEGUNDOS = config('CACHE_FRAGMENTOS_SEGUNDOS', default=86400, cast=int)
+
+# Espacios de nombres de URL servidos sin sesión a los anónimos, y segundos
+# que las caches compartidas pueden guardarlos (las visitas servidas desde
+# una caché compartida no llegan a los contadores)
+PAGINAS_PUBLICAS = ('core', 'perfiles')
+PAGINAS_PUBLICAS_MAX_AGE = config('PAGINAS_PUBLICAS_MAX_AGE', default=60, cast=int)
+
+# Compresión de respuestas dinámicas (Brotli si está instalado, si no gzip)
+COMPRESION_TAMANO_MINIMO = config('COMPRESION_TAMANO_MINIMO', default=200, cast=int)
+COMPRESION_BROTLI_CALIDAD = config('COMPRESION_BROTLI_CALIDAD', default=5, cast=int)
+COMPRESION_GZIP_NIVEL = config('COMPRESION_GZIP_NIVEL', default=6, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,6 +143,24 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Servicio de MEDIA desde Django (apps/perfiles/media.py). Los archivos
+# nombrados por contenido se cachean un año; el resto, MEDIA_MAX_AGE segundos.
+# MEDIA_DESCARGA delega la transferencia al servidor web: 'x-accel' (nginx,
+# con una location internal en MEDIA_ACCEL_PREFIJO) o 'sendfile' (Apache).
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=3600, cast=int)
+MEDIA_DESCARGA = config('MEDIA_DESCARGA', default='')
+MEDIA_ACCEL_PREFIJO = config('MEDIA_ACCEL_PREFIJO', default='/media-interna/')
+
+# Contadores de visitas: se acumulan en memoria y se vuelcan cada N segundos
+VISITAS_ACTIVAS = config('VISITAS_ACTIVAS', default=True, cast=bool)
+VISITAS_INTERVALO = config('VISITAS_INTERVALO', default=30, cast=int)
+
+# Directorio de salida de `manage.py exportar_estatico`
+EXPORTACION_ESTATICA_DIR = Path(config('EXPORTACION_ESTATICA_DIR', default=str(BASE_DIR / 'sitio_estatico')))
+
+# Guardar certificados e imágenes por hash de contenido (sin duplicados)
+ARCHIVOS_DEDUPLICADOS = config('ARCHIVOS_DEDUPLICADOS', default=True, cast=bool)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -118,9 +173,85 @@ LOGIN_URL = 'admin:login'
 LOGIN_REDIRECT_URL = 'admin:index'
 LOGOUT_REDIRECT_URL = 'core:home'
 
+# Motor de PDF: 'reportlab', 'weasyprint' o 'xhtml2pdf' (si las librerías del
+# elegido no se pueden importar, se usa 'reportlab')
+PDF_MOTOR = config('PDF_MOTOR', default='reportlab')
+
+# Hilos del pool donde las vistas asíncronas generan los PDF
+PDF_HILOS = config('PDF_HILOS', default=2, cast=int)
+
+# Límites del endpoint del PDF: token bucket por IP y global (capacidad en
+# solicitudes, tasa en solicitudes por segundo) y renders simultáneos por proceso
+PDF_LIMITE_IP_CAPACIDAD = config('PDF_LIMITE_IP_CAPACIDAD', default=10, cast=int)
+PDF_LIMITE_IP_TASA = config('PDF_LIMITE_IP_TASA', default=0.2, cast=float)
+PDF_LIMITE_GLOBAL_CAPACIDAD = config('PDF_LIMITE_GLOBAL_CAPACIDAD', default=60, cast=int)
+PDF_LIMITE_GLOBAL_TASA = config('PDF_LIMITE_GLOBAL_TASA', default=5.0, cast=float)
+PDF_MAX_CONCURRENTES = config('PDF_MAX_CONCURRENTES', default=4, cast=int)
+PDF_RETRY_AFTER = config('PDF_RETRY_AFTER', default=5, cast=int)
+
+# Proxies confiables delante de la aplicación (para leer X-Forwarded-For)
+NUM_PROXIES = config('NUM_PROXIES', default=0, cast=int)
+
+# Segundos máximos que una petición espera el render de otra del mismo PDF o
+# página (también es la expiración del candado entre workers)
+COALESCENCIA_ESPERA = config('COALESCENCIA_ESPERA', default=30, cast=float)
+
+# Artículos por página del mercado de la venta garage y segundos que se
+# guardan sus conteos por estado
+MERCADO_POR_PAGINA = config('MERCADO_POR_PAGINA', default=24, cast=int)
+MERCADO_FACETAS_SEGUNDOS = config('MERCADO_FACETAS_SEGUNDOS', default=3600, cast=int)
+
+# Sugerencias de la búsqueda de perfiles por defecto y segundos entre
+# revisiones de cambios hechos por otros workers
+BUSQUEDA_LIMITE = config('BUSQUEDA_LIMITE', default=10, cast=int)
+BUSQUEDA_REVISION = config('BUSQUEDA_REVISION', default=5, cast=float)
+# Token bucket por IP de la búsqueda pública (una petición por tecla)
+BUSQUEDA_LIMITE_IP_CAPACIDAD = config('BUSQUEDA_LIMITE_IP_CAPACIDAD', default=30, cast=int)
+BUSQUEDA_LIMITE_IP_TASA = config('BUSQUEDA_LIMITE_IP_TASA', default=2.0, cast=float)
+
+# Eventos por página de la línea de tiempo de cada perfil
+TRAYECTORIA_POR_PAGINA = config('TRAYECTORIA_POR_PAGINA', default=20, cast=int)
+
+# Segundos que se guarda la instantánea compacta de cada perfil (datos del CV)
+CACHE_INSTANTANEAS_SEGUNDOS = config('CACHE_INSTANTANEAS_SEGUNDOS', default=86400, cast=int)
+
+# Segundos que se guarda en caché cada PDF generado
+CACHE_PDF_SEGUNDOS = config('CACHE_PDF_SEGUNDOS', default=86400, cast=int)
+
+# Regenerar el PDF en segundo plano tras editar un perfil, agrupando los
+# cambios que lleguen dentro de la espera indicada
+PDF_PREGENERAR = config('PDF_PREGENERAR', default=False, cast=bool)
+PDF_PREGENERAR_ESPERA = config('PDF_PREGENERAR_ESPERA', default=2.0, cast=float)
+PDF_PREGENERAR_HILOS = config('PDF_PREGENERAR_HILOS', default=1, cast=int)
+
+# Métricas en formato Prometheus (/metrics). Cada worker vuelca lo suyo en
+# METRICAS_DIR cada METRICAS_INTERVALO segundos; vacío = solo el proceso que
+# atiende la petición (gunicorn.conf.py lo define para sus workers, así los
+# comandos de manage.py no escriben archivos). El endpoint exige
+# METRICAS_TOKEN como Bearer o una IP dentro de METRICAS_IPS (redes CIDR);
+# sin ninguno de los dos responde 404.
+METRICAS_DIR = config('METRICAS_DIR', default='')
+METRICAS_INTERVALO = config('METRICAS_INTERVALO', default=10, cast=float)
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+METRICAS_IPS = config('METRICAS_IPS', default='', cast=Csv())
+
+# Perfilado de peticiones a pedido del staff (?perfilar=1 o X-Perfilar: 1):
+# intervalo del muestreo de pilas, marcos que guarda tracemalloc por
+# asignación, filas de cada tabla del resumen y capturas que se conservan
+PERFILADO_ACTIVO = config('PERFILADO_ACTIVO', default=True, cast=bool)
+PERFILADO_INTERVALO = config('PERFILADO_INTERVALO', default=0.005, cast=float)
+PERFILADO_MARCOS = config('PERFILADO_MARCOS', default=10, cast=int)
+PERFILADO_TOP = config('PERFILADO_TOP', default=25, cast=int)
+PERFILADO_CONSERVAR = config('PERFILADO_CONSERVAR', default=200, cast=int)
+
+# Consultas SQL que tardan al menos estos milisegundos se registran en el
+# admin con su plan de ejecución (0 desactiva el registro)
+DB_CONSULTAS_LENTAS_MS = config('DB_CONSULTAS_LENTAS_MS', default=200, cast=float)
+DB_CONSULTAS_LENTAS_INTERVALO = config('DB_CONSULTAS_LENTAS_INTERVALO', default=30, cast=int)
+
 # Security settings for production
 if not DEBUG:
-    SECURE_SSL_REDIRECT = True
+    SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -6,10 +6,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from apps.core.views import MetricasView
+from apps.perfiles.media import MediaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', MetricasView.as_view(), name='metricas'),
     path('', include('apps.core.urls')),
     path('perfil/', include('apps.perfiles.urls')),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:ruta>', MediaView.as_view(), name='media'),
 ]
 
 # Configuración del admin
@@ -18,5 +23,4 @@ admin.site.site_title = "Panel Administrativo"
 admin.site.index_title = "Gestión de Hojas de Vida"
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
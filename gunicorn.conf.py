@@ -0,0 +1,43 @@
+"""
+Configuración de gunicorn (se carga sola desde el directorio del proyecto).
+
+Con `preload_app` la aplicación se importa una vez en el proceso maestro y
+los workers la heredan al hacer fork, compartiendo esa memoria por
+copy-on-write en lugar de importar Django cada uno por su cuenta.
+"""
+import gc
+import os
+import tempfile
+
+
+def _activado(nombre, defecto):
+    return os.environ.get(nombre, defecto).lower() in ('1', 'true', 'yes', 'on')
+
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = _activado('GUNICORN_PRELOAD', 'True')
+
+# Con preload también se pueden dejar cargadas las librerías de PDF en el
+# maestro, a cambio de que todos los workers las tengan en memoria
+precargar_pdf = _activado('GUNICORN_PRECARGAR_PDF', 'False')
+
+# Directorio donde los workers comparten sus métricas (ver apps/core/metricas.py);
+# fuera de gunicorn solo se usa si se configura explícitamente
+os.environ.setdefault('METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'hoja-vida-metricas'))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    if precargar_pdf:
+        from apps.perfiles.pdf import cargar_librerias
+        cargar_librerias()
+
+    # No heredar conexiones abiertas en el maestro
+    from django.db import connections
+    connections.close_all()
+
+    # Mover los objetos ya creados a la generación permanente evita que el
+    # recolector de basura de cada worker toque esas páginas y las copie
+    gc.freeze()